@@ -34,26 +34,84 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, re, codecs
+import os, re, codecs, time
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin import config, caching, user, util, wikiutil
 from MoinMoin.logfile import eventlog
+from MoinMoin.util.lru import LRUCache
+from MoinMoin.util.nameindex import NameIndex
 
 def is_cache_exception(e):
     args = e.args
     return not (len(args) != 1 or args[0] != 'CacheNeedsUpdate')
 
 
+def get_code_cache(request):
+    """ Return the process wide cache of compiled page code objects or None
+        (if disabled by cfg.page_code_cache_size).
+
+        It maps (cache arena dir, cache key) of the page's formatting cache
+        to (uid of the cache entry, (code object, link targets)), so loadCache
+        can skip reading and unmarshalling the cache while the cache entry is
+        unchanged.
+    """
+    size = request.cfg.page_code_cache_size
+    if not size:
+        return None
+    cache = request.cfg.cache
+    try:
+        return cache.page_code
+    except AttributeError:
+        cache.page_code = LRUCache(max_entries=100000, max_size=size)
+        return cache.page_code
+
+
+def get_pagelist_index(request):
+    """ Return the PageListIndex (kept in request.cfg.cache.pagelists) """
+    index = request.cfg.cache.pagelists.getItem(request, 'all', None)
+    if index is None:
+        index = PageListIndex(request)
+        request.cfg.cache.pagelists.putItem(request, 'all', None, index)
+    return index
+
+
+def resolve_exists(request, pagenames):
+    """ Find out which of some pages exist, in one go
+
+        Page.exists() of the current revision needs a chain of stats per page,
+        so this looks up all the pages in the PageListIndex instead and
+        remembers the results in request.stat_cache.memo, where Page.exists()
+        finds them. Page.execute calls this for the link targets of a page
+        before running its cached code.
+
+        @param request: the request object
+        @param pagenames: page names (unicode)
+    """
+    memo = request.stat_cache.memo
+    pages = get_pagelist_index(request).pages
+    for pagename in pagenames:
+        status = pages.get(pagename)
+        memo[('exists', pagename)] = status is not None and status[1]
+
+
 class ItemCache:
     """ Cache some page item related data, as meta data or pagelist
 
         We only cache this to RAM in request.cfg (this is the only kind of
         server object we have), because it might be too big for pickling it
         in and out.
+
+        To notice changes made by other processes, we compare the edit-log
+        generation counter (see editlog.generation) with the value we saw
+        last time. Only if it changed (or if we did not look at the edit-log
+        for CHECK_INTERVAL seconds, just in case the counter got lost), we
+        read the new edit-log entries.
     """
+    CHECK_INTERVAL = 10.0 # seconds
+
     def __init__(self, name):
         """ Initialize ItemCache object.
             @param name: name of the object, used for display in logging and
@@ -61,8 +119,10 @@ class ItemCache:
         """
         self.name = name
         self.cache = {}
-        self.log_pos = None # TODO: initialize this to EOF pos of log
-                            # to avoid reading in the whole log on first request
+        self.log_pos = None # the first refresh() seeds this with the EOF pos
+                            # of the edit-log, without reading the log
+        self.log_generation = None # edit-log generation seen at log_pos
+        self.log_checked = 0 # time of last edit-log check
         self.requests = 0
         self.hits = 0
         self.loglevel = logging.NOTSET
@@ -86,7 +146,7 @@ class ItemCache:
         """
         self.refresh(request)
         try:
-            data = self.cache[name][key]
+            data = self._lookup(name, key)
             self.hits += 1
             hit_str = 'hit'
         except KeyError:
@@ -102,30 +162,306 @@ class ItemCache:
         ))
         return data
 
+    def _lookup(self, name, key):
+        """ Return the data stored for item name under key, raise KeyError if
+            there is none.
+        """
+        return self.cache[name][key]
+
     def refresh(self, request):
         """ Refresh the cache - if anything has changed in the wiki, we see it
             in the edit-log and either delete cached data for the changed items
-            (for 'meta') or the complete cache ('pagelists').
+            (for 'meta') or the complete cache ('pagelists'), see also AclCache.
             @param request: the request object
         """
         from MoinMoin.logfile import editlog
+        generation = editlog.generation(request).get()
+        now = time.time()
+        if (self.log_pos is not None and generation is not None and
+            generation == self.log_generation and
+            now - self.log_checked < self.CHECK_INTERVAL):
+            return # nothing changed
         elog = editlog.EditLog(request)
         old_pos = self.log_pos
         new_pos, items = elog.news(old_pos)
         if items:
-            if self.name == 'meta':
-                for item in items:
-                    logging.log(self.loglevel, "cache: removing %r" % item)
-                    try:
-                        del self.cache[item]
-                    except:
-                        pass
-            elif self.name == 'pagelists':
-                logging.log(self.loglevel, "cache: clearing pagelist cache")
-                self.cache = {}
+            self._changed(request, items, new_pos)
+        self.log_generation = generation
+        self.log_checked = now
         self.log_pos = new_pos # important to do this at the end -
                                # avoids threading race conditions
 
+    def _changed(self, request, items, new_pos):
+        """ Forget (or patch) the cached data of changed items
+
+            @param items: names of the items changed in the edit-log
+            @param new_pos: edit-log position after those changes
+        """
+        if self.name == 'meta':
+            for item in items:
+                logging.log(self.loglevel, "cache: removing %r" % item)
+                try:
+                    del self.cache[item]
+                except:
+                    pass
+        elif self.name == 'pagelists':
+            index = self.cache.get('all', {}).get(None)
+            if index is not None:
+                logging.log(self.loglevel, "cache: patching pagelist index")
+                index.update(request, items, new_pos)
+            else:
+                logging.log(self.loglevel, "cache: clearing pagelist cache")
+                self.cache = {}
+
+
+class AclCache(ItemCache):
+    """ Cache the effective ACLs of pages (see security._hierarchic_acl)
+
+        A page's effective ACL depends on its parent pages in hierarchic mode,
+        so a change of a page outdates the cached data of its subpages, too.
+        Instead of looking at all cached pages when pages change, we count the
+        changes of every changed page and store the total change count of a
+        page and its parent pages with its data. The counts only grow, so data
+        stored with a lower total than the current one is outdated.
+
+        Only the MAX_ENTRIES most recently used items are kept.
+    """
+    MAX_ENTRIES = 10000
+    MAX_CHANGED = 10000 # start from scratch if that many pages changed
+
+    def __init__(self, name='acl'):
+        ItemCache.__init__(self, name)
+        self.cache = LRUCache(self.MAX_ENTRIES)
+        self.changes = {} # page name -> number of changes seen
+
+    def _stamp(self, name):
+        """ Return the total change count of page name and its parent pages """
+        changes = self.changes
+        if not changes:
+            return 0
+        parts = name.split('/')
+        return sum([changes.get('/'.join(parts[:i]), 0) for i in range(1, len(parts) + 1)])
+
+    def putItem(self, request, name, key, data):
+        self.cache.set((name, key), (self._stamp(name), data))
+
+    def _lookup(self, name, key):
+        entry = self.cache.get((name, key))
+        if entry is None or entry[0] != self._stamp(name):
+            raise KeyError(name)
+        return entry[1]
+
+    def _changed(self, request, items, new_pos):
+        changes = self.changes
+        if len(changes) + len(items) > self.MAX_CHANGED:
+            logging.log(self.loglevel, "cache: clearing acl cache")
+            self.cache = LRUCache(self.MAX_ENTRIES)
+            self.changes = {}
+            return
+        for item in items:
+            changes[item] = changes.get(item, 0) + 1
+
+
+class PageListIndex:
+    """ Persistent index of all page names (standard and underlay pages)
+
+        For every page name (unicode) we remember a tuple
+        (underlay, exists, rev, acl), using the same semantics as
+        Page.getPageStatus()[0], Page.exists(), Page.current_rev() and
+        Page.getACL().acl_lines (as a tuple, only for existing pages).
+
+        The index is stored (pickled) in the 'pagelists' wiki cache arena,
+        together with the edit-log position it is valid for. When loading it,
+        we just replay the edit-log entries added after that position, so we
+        do not need to list and stat all the page directories again. Only if
+        the index is missing, unreadable or does not match the current edit-log
+        or underlay directory, it is rebuilt from the filesystem.
+
+        For looking up page names similar to some name (e.g. for LikePages),
+        names() returns a NameIndex of the existing pages, which is built on
+        first use and then patched together with the index.
+
+        Note: changes done to the page directories without going through the
+        edit-log (e.g. manually removing a page directory) are not noticed, use
+        "moin maint cleancache" after doing such things.
+    """
+    VERSION = 2
+    SAVE_INTERVAL = 100 # write the index to disk after patching that many items
+
+    def __init__(self, request):
+        self.pages = {}
+        self.log_pos = 0
+        self.unsaved = 0
+        self._names = None
+        self.load(request)
+
+    def names(self):
+        """ Return a NameIndex of the names of the existing pages """
+        if self._names is None:
+            self._names = NameIndex([pagename for pagename, status in self.pages.iteritems()
+                                     if status[1]])
+        return self._names
+
+    def _cache(self, request):
+        return caching.CacheEntry(request, 'pagelists', 'index', scope='wiki', use_pickle=True)
+
+    def _underlay_stamp(self, request):
+        """ Return something that changes when the underlay gets replaced """
+        if request.cfg.data_underlay_dir is None:
+            return None
+        try:
+            return os.path.getmtime(os.path.join(request.cfg.data_underlay_dir, 'pages'))
+        except os.error:
+            return None
+
+    def load(self, request):
+        """ Load the index from disk and bring it up-to-date with the edit-log,
+            rebuild it if that is not possible.
+        """
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        try:
+            data = self._cache(request).content()
+            if (data['version'] != self.VERSION or
+                data['underlay'] != self._underlay_stamp(request) or
+                data['log_pos'] > elog.size()):
+                raise ValueError('pagelist index is outdated')
+            self.pages = data['pages']
+            self.log_pos = data['log_pos']
+            self._names = None
+        except (caching.CacheError, KeyError, TypeError, ValueError), err:
+            logging.debug("pagelist index: rebuilding (%s)" % str(err))
+            self.rebuild(request)
+            return
+        new_pos, items = elog.news(self.log_pos)
+        if items:
+            self.update(request, items, new_pos)
+        else:
+            self.log_pos = new_pos
+
+    def save(self, request):
+        """ Write the index to disk """
+        data = {
+            'version': self.VERSION,
+            'underlay': self._underlay_stamp(request),
+            'log_pos': self.log_pos,
+            'pages': self.pages,
+        }
+        try:
+            self._cache(request).update(data)
+            self.unsaved = 0
+        except caching.CacheError, err:
+            logging.warning("pagelist index: could not save (%s)" % str(err))
+
+    def rebuild(self, request):
+        """ Build the index from scratch by listing and checking all page dirs """
+        from MoinMoin.logfile import editlog
+        # remember the log position *before* we look at the filesystem, so
+        # concurrent changes will get replayed (again) later:
+        log_pos = editlog.EditLog(request).size()
+        pages = {}
+        for name in request.rootpage._listPages():
+            pagename = wikiutil.unquoteWikiname(name)
+            # Filter those annoying editor backups - current moin does not create
+            # those pages any more, but users have them already in data/pages
+            # until we remove them by a mig script...
+            if pagename.endswith(u'/MoinEditorBackup'):
+                continue
+            status = self.pageStatus(request, pagename)
+            if status is not None:
+                pages[pagename] = status
+        self.pages = pages
+        self._names = None
+        self.log_pos = log_pos
+        self.save(request)
+
+    def update(self, request, pagenames, log_pos):
+        """ Re-check the given pages and patch the index
+
+            We do not modify self.pages in place, because other threads might
+            iterate over it at the same time.
+        """
+        pages = self.pages.copy()
+        names = self._names
+        for pagename in dict.fromkeys(pagenames):
+            if not pagename or pagename.endswith(u'/MoinEditorBackup'):
+                continue
+            status = self.pageStatus(request, pagename)
+            if status is None:
+                pages.pop(pagename, None)
+            else:
+                pages[pagename] = status
+            if names is not None:
+                if status is not None and status[1]:
+                    names.add(pagename)
+                else:
+                    names.remove(pagename)
+            self.unsaved += 1
+        self.pages = pages
+        self.log_pos = log_pos
+        if self.unsaved >= self.SAVE_INTERVAL:
+            self.save(request)
+
+    def _layerStatus(self, pagedir):
+        """ Return (pagedir exists, current rev, current rev exists) of a layer """
+        try:
+            f = file(os.path.join(pagedir, 'current'))
+        except IOError:
+            return os.path.isdir(pagedir), 99999999, False
+        try:
+            try:
+                rev = int(f.read().strip())
+            except ValueError:
+                return True, 99999999, False
+        finally:
+            f.close()
+        return True, rev, os.path.exists(os.path.join(pagedir, 'revisions', '%08d' % rev))
+
+    def _aclLines(self, pagedir, rev):
+        """ Return the #acl lines of a page revision (tuple) or None if it has
+            no #acl (same as AccessControlList.acl_lines).
+            Only the processing instructions at the top of the file are read.
+        """
+        head = []
+        try:
+            f = codecs.open(os.path.join(pagedir, 'revisions', '%08d' % rev), 'rb', config.charset)
+            try:
+                for line in f:
+                    if not line.startswith(u'#'):
+                        break
+                    head.append(line.replace(u'\r', u''))
+            finally:
+                f.close()
+        except (IOError, UnicodeError):
+            return None
+        meta, body = wikiutil.get_processing_instructions(u''.join(head))
+        acl = tuple([args for verb, args in meta if verb == 'acl'])
+        return acl or None
+
+    def pageStatus(self, request, pagename):
+        """ Check a page on disk (uncached)
+
+        @param pagename: name of the page, unicode
+        @return: (underlay, exists, rev, acl lines) or None if there is no
+                 such pagedir (acl lines are only read for existing pages)
+        """
+        cfg = request.cfg
+        qpagename = wikiutil.quoteWikinameFS(pagename)
+        std_path = os.path.join(cfg.data_dir, 'pages', qpagename)
+        std_dir, std_rev, std_exists = self._layerStatus(std_path)
+        if std_exists:
+            return 0, True, std_rev, self._aclLines(std_path, std_rev)
+        if cfg.data_underlay_dir is not None:
+            und_path = os.path.join(cfg.data_underlay_dir, 'pages', qpagename)
+            und_dir, und_rev, und_exists = self._layerStatus(und_path)
+            if und_exists:
+                return 1, True, und_rev, self._aclLines(und_path, und_rev)
+            if not std_dir and und_dir:
+                return 0, False, und_rev, None
+        if std_dir:
+            return 0, False, std_rev, None
+        return None
+
 
 class Page(object):
     """ Page - Manage an (immutable) page associated with a WikiName.
@@ -325,7 +661,7 @@ class Page(object):
         revstr = '%08d' % rev
         pagefile = os.path.join(pagedir, 'revisions', revstr)
         if rev != 99999999:
-            exists = os.path.exists(pagefile)
+            exists = self.request.stat_cache.exists(pagefile)
             if exists:
                 self._setRealPageName(pagedir)
         else:
@@ -489,11 +825,7 @@ class Page(object):
                 dirname, filename = os.path.split(fullpath)
             else:
                 dirname = fullpath
-            try:
-                os.makedirs(dirname)
-            except OSError, err:
-                if not os.path.exists(dirname):
-                    raise
+            self.request.stat_cache.makedirs(dirname)
         return underlay, fullpath
 
     def getPagePath(self, *args, **kw):
@@ -529,10 +861,10 @@ class Page(object):
             from MoinMoin.logfile import editlog
             wanted_rev = "%08d" % self.get_real_rev()
             edit_log = editlog.EditLog(request, rootpagename=self.page_name)
-            for entry in edit_log.reverse():
-                if entry.rev == wanted_rev:
-                    break
-            else:
+            edit_log.set_filter(rev=wanted_rev)
+            try:
+                entry = edit_log.reverse().next()
+            except StopIteration:
                 entry = () # don't use None
             if use_cache:
                 request.cfg.cache.meta.putItem(request, cache_name, cache_key, entry)
@@ -652,7 +984,7 @@ class Page(object):
                 checklist = [domain == 'underlay']
             for use_underlay in checklist:
                 pagedir = self.getPagePath(use_underlay=use_underlay, check_create=0)
-                if os.path.exists(pagedir):
+                if self.request.stat_cache.exists(pagedir):
                     return True
             return False
         else:
@@ -660,6 +992,13 @@ class Page(object):
             if not rev and self.rev:
                 rev = self.rev
 
+            if not rev and domain is None and self._text_filename_force is None:
+                # maybe resolve_exists() already found out
+                try:
+                    return self.request.stat_cache.memo[('exists', self.page_name)]
+                except KeyError:
+                    pass
+
             if domain is None:
                 use_underlay = -1
             else:
@@ -900,30 +1239,7 @@ class Page(object):
         # add current page name for list matching
         pageList.append(self.page_name)
 
-        scope, arena, key = 'userdir', 'users', 'pagesubscriptions'
-
-        # get or create cache file
-        cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True)
-        if cache.exists():
-            page_sub = cache.content()
-        else:
-            # build a cache if it doesn't exist
-            cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True, do_locking=False)
-            # lock to stop anybody else interfering with the data while we're working
-            cache.lock('w')
-            userlist = user.getUserList(request)
-            page_sub = {}
-            for uid in userlist:
-                subscriber = user.User(request, uid)
-                # we don't care about storing entries for users without any page subscriptions
-                if subscriber.subscribed_pages:
-                    page_sub[subscriber.id] = {
-                        'name': subscriber.name,
-                        'email': subscriber.email,
-                        'subscribed_pages': subscriber.subscribed_pages,
-                    }
-            cache.update(page_sub)
-            cache.unlock()
+        index = user.getSubscriptionIndex(request)
 
         if self.cfg.SecurityPolicy:
             UserPerms = self.cfg.SecurityPolicy
@@ -933,56 +1249,38 @@ class Page(object):
         # get email addresses of all wiki users which have a profile stored;
         # add the address only if the user has subscribed to the page and
         # the user is not the current editor
-        userlist = page_sub
         subscriber_list = {}
 
         pages = pageList[:]
         if request.cfg.interwikiname:
             pages += ["%s:%s" % (request.cfg.interwikiname, pagename) for pagename in pageList]
-        # Create text for regular expression search
-        text = '\n'.join(pages)
 
-        for uid in userlist:
+        for uid in index.subscribers(pages):
             if uid == request.user.id and not include_self:
                 continue # no self notification
 
             # This is a bit wrong if return_users=1 (which implies that the caller will process
             # user attributes and may, for example choose to send an SMS)
             # So it _should_ be "not (subscriber.email and return_users)" but that breaks at the moment.
-            if not userlist[uid]['email']:
+            if not index.users[uid]['email']:
                 continue # skip empty email addresses
 
-            # now check patterns for actual match
-            isSubscribed = False
-            for pattern in userlist[uid]['subscribed_pages']:
-                if pattern in pages:
-                    isSubscribed = True
-                    break
-                try:
-                    pattern = re.compile(r'^%s$' % pattern, re.M)
-                except re.error:
-                    continue
-                if pattern.search(text):
-                    isSubscribed = True
-                    break
-
             # only if subscribed, create a User object from the profile
-            if isSubscribed:
-                subscriber = user.User(request, uid)
+            subscriber = user.User(request, uid)
 
-                if not subscriber.valid:
-                    continue
+            if not subscriber.valid:
+                continue
 
-                if not UserPerms(subscriber).read(self.page_name):
-                    continue
+            if not UserPerms(subscriber).read(self.page_name):
+                continue
 
-                lang = subscriber.language or request.cfg.language_default
-                if not lang in subscriber_list:
-                    subscriber_list[lang] = []
-                if return_users:
-                    subscriber_list[lang].append(subscriber)
-                else:
-                    subscriber_list[lang].append(subscriber.email)
+            lang = subscriber.language or request.cfg.language_default
+            if not lang in subscriber_list:
+                subscriber_list[lang] = []
+            if return_users:
+                subscriber_list[lang].append(subscriber)
+            else:
+                subscriber_list[lang].append(subscriber.email)
 
         request.clock.stop('getSubscribers')
         return subscriber_list
@@ -1422,14 +1720,14 @@ class Page(object):
             self.format(parser)
         else:
             try:
-                code = self.loadCache(request)
-                self.execute(request, parser, code)
+                code, link_targets = self.loadCache(request)
+                self.execute(request, parser, code, link_targets)
             except Exception, e:
                 if not is_cache_exception(e):
                     raise
                 try:
-                    code = self.makeCache(request, parser)
-                    self.execute(request, parser, code)
+                    code, link_targets = self.makeCache(request, parser)
+                    self.execute(request, parser, code, link_targets)
                 except Exception, e:
                     if not is_cache_exception(e):
                         raise
@@ -1442,11 +1740,17 @@ class Page(object):
         """ Format and write page content without caching """
         parser.format(self.formatter)
 
-    def execute(self, request, parser, code):
-        """ Write page content by executing cache code """
+    def execute(self, request, parser, code, link_targets=()):
+        """ Write page content by executing cache code
+
+        @param link_targets: names of the pages the code links to, their
+                             existence is looked up in one go before
+        """
         formatter = self.formatter
         request.clock.start("Page.execute")
         try:
+            if link_targets:
+                resolve_exists(request, link_targets)
             from MoinMoin.macro import Macro
             macro_obj = Macro(parser)
             # Fix __file__ when running from a zip package
@@ -1461,15 +1765,26 @@ class Page(object):
             request.clock.stop("Page.execute")
 
     def loadCache(self, request):
-        """ Return page content cache or raises 'CacheNeedsUpdate' """
+        """ Return page content cache (code, link targets) or raises 'CacheNeedsUpdate' """
         cache = caching.CacheEntry(request, self, self.getFormatterName(), scope='item')
         attachmentsPath = self.getPagePath('attachments', check_create=0)
         if cache.needsUpdate(self._text_filename(), attachmentsPath):
             raise Exception('CacheNeedsUpdate')
 
+        code_cache = get_code_cache(request)
+        if code_cache is not None:
+            uid = cache.uid()
+            cached = code_cache.get((cache.arena_dir, cache.key))
+            if cached is not None and uid is not None and cached[0] == uid:
+                return cached[1]
+
         import marshal
         try:
-            return marshal.loads(cache.content())
+            data = cache.content()
+            code, link_targets = marshal.loads(data)
+            if code_cache is not None and uid is not None:
+                code_cache.set((cache.arena_dir, cache.key), (uid, (code, link_targets)), len(data))
+            return code, link_targets
         except (EOFError, ValueError, TypeError):
             # Bad marshal data, must update the cache.
             # See http://docs.python.org/lib/module-marshal.html
@@ -1480,7 +1795,7 @@ class Page(object):
             raise Exception('CacheNeedsUpdate')
 
     def makeCache(self, request, parser):
-        """ Format content into code, update cache and return code """
+        """ Format content into code, update cache and return (code, link targets) """
         import marshal
         from MoinMoin.formatter.text_python import Formatter
         formatter = Formatter(request, ["page"], self.formatter)
@@ -1495,9 +1810,16 @@ class Page(object):
         src = formatter.assemble_code(text)
         code = compile(src.encode(config.charset),
                        self.page_name.encode(config.charset), 'exec')
+        link_targets = tuple(sorted(formatter.link_targets))
         cache = caching.CacheEntry(request, self, self.getFormatterName(), scope='item')
-        cache.update(marshal.dumps(code))
-        return code
+        data = marshal.dumps((code, link_targets))
+        cache.update(data)
+        code_cache = get_code_cache(request)
+        if code_cache is not None:
+            uid = cache.uid()
+            if uid is not None:
+                code_cache.set((cache.arena_dir, cache.key), (uid, (code, link_targets)), len(data))
+        return code, link_targets
 
     def _specialPageText(self, request, special_type):
         """ Output the default page content for new pages.
@@ -1863,47 +2185,36 @@ class RootPage(Page):
             user = request.user
 
         # Get pages cache or create it
-        cachedlist = request.cfg.cache.pagelists.getItem(request, 'all', None)
-        if cachedlist is None:
-            cachedlist = {}
-            for name in self._listPages():
-                # Unquote file system names
-                pagename = wikiutil.unquoteWikiname(name)
-
-                # Filter those annoying editor backups - current moin does not create
-                # those pages any more, but users have them already in data/pages
-                # until we remove them by a mig script...
-                if pagename.endswith(u'/MoinEditorBackup'):
-                    continue
-
-                cachedlist[pagename] = None
-            request.cfg.cache.pagelists.putItem(request, 'all', None, cachedlist)
+        cachedlist = get_pagelist_index(request).pages
 
         if user or exists or filter or not include_underlay or return_objects:
-            # Filter names
+            # Filter names - underlay status and existence are taken from the
+            # index and ACLs are checked in batch mode, so we do not need
+            # a Page object per page.
+            if user:
+                from MoinMoin import security
+                may_read = security.batch_checker(request, user, 'read', cachedlist)
             pages = []
-            for name in cachedlist:
-                # First, custom filter - exists and acl check are very
+            for name, (underlay, page_exists, rev, acl) in cachedlist.iteritems():
+                # First, custom filter - exists and acl check are
                 # expensive!
                 if filter and not filter(name):
                     continue
 
-                page = Page(request, name)
-
                 # Filter underlay pages
-                if not include_underlay and page.getPageStatus()[0]: # is an underlay page
+                if not include_underlay and underlay:
                     continue
 
                 # Filter deleted pages
-                if exists and not page.exists():
+                if exists and not page_exists:
                     continue
 
                 # Filter out page user may not read.
-                if user and not user.may.read(name):
+                if user and not may_read(name):
                     continue
 
                 if return_objects:
-                    pages.append(page)
+                    pages.append(Page(request, name))
                 else:
                     pages.append(name)
         else:
@@ -1999,7 +2310,7 @@ class RootPage(Page):
             # WARNING: SLOW
             pages = self.getPageList(user='')
         else:
-            pages = self._listPages()
+            pages = self.getPageList(user='', exists=0)
         count = len(pages)
         self.request.clock.stop('getPageCount')
 
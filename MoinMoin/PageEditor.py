@@ -19,7 +19,7 @@
 import os, time, codecs, errno
 
 
-from MoinMoin import caching, config, wikiutil, error
+from MoinMoin import caching, config, wikiutil, error, linkgraph, diffcache
 from MoinMoin.Page import Page
 from MoinMoin.widget import html
 from MoinMoin.widget.dialog import Status
@@ -576,6 +576,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
         # NOTE: might fail if another process created newpagename just
         try:
             filesys.copytree(oldpath, newpath)
+            request.stat_cache.clear()
             self.error = None
             savetext = u"## page was copied from %s\n%s" % (self.page_name, savetext)
             Page.__init__(self, request, newpagename)
@@ -638,6 +639,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
         # See http://docs.python.org/lib/os-file-dir.html
         try:
             os.rename(oldpath, newpath)
+            request.stat_cache.clear()
             self.error = None
             # Save page text with a comment about the old name
             savetext = u"## page was renamed from %s\n%s" % (self.page_name, savetext)
@@ -907,6 +909,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
                 pass
             if not os.path.exists(dst):
                 filesys.copytree(src, dst)
+                self.request.stat_cache.clear()
                 self.reset() # reinit stuff
 
     def _write_file(self, text, action='SAVE', comment=u'', extra=u'', deleted=False):
@@ -986,6 +989,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
             except ValueError, err:
                 raise self.SaveError(_("Unable to determine current page revision from the 'current' file. The page %s is damaged and cannot be edited right now.") % self.page_name)
 
+            old_rev = rev
             if not was_deprecated:
                 if self.do_revision_backup or rev == 0:
                     rev += 1
@@ -1027,6 +1031,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
                 self.set_raw_body(None)
 
             # reset page object
+            request.stat_cache.clear()
             self.reset()
 
             # write the editlog entry
@@ -1042,6 +1047,14 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
             if got_lock:
                 filesys.rename(clfn, cfn)
 
+        changed = [self.page_name]
+        if action == 'SAVE/RENAME':
+            changed.append(extra) # the old page name
+        linkgraph.pages_changed(request, changed)
+        if rev == old_rev:
+            # we have overwritten a revision, its diffs are wrong now
+            diffcache.remove_diffs(request, self)
+
         # add event log entry
         elog = eventlog.EventLog(request)
         elog.add(request, 'SAVEPAGE', {'pagename': self.page_name}, 1, mtime_usecs)
@@ -1154,6 +1167,8 @@ Please review the page and save then. Do not save this page as it is!""")
             # write the page file
             mtime_usecs, rev = self._write_file(newtext, action, comment, extra, deleted=deleted)
             self._save_draft(None, None) # everything fine, kill the draft for this page
+            if not deleted:
+                diffcache.revision_saved(request, self.page_name, rev)
 
             if notify:
                 # send notifications
@@ -16,6 +16,7 @@ from MoinMoin.PageEditor import PageEditor
 from MoinMoin.util import random_string
 from MoinMoin import caching, user
 from MoinMoin.action import AttachFile
+from MoinMoin.logfile.segments import SegmentManifest
 
 # Promoting the test user -------------------------------------------
 # Usually the tests run as anonymous user, but for some stuff, you
@@ -55,11 +56,9 @@ def become_superuser(request):
 
 def nuke_user(request, username):
     """ completely delete a user """
-    user_dir = request.cfg.user_dir
     user_id = user.getUserId(request, username)
     # really get rid of the user
-    fpath = os.path.join(user_dir, user_id)
-    os.remove(fpath)
+    user.User(request, user_id).remove()
     user.clearLookupCaches(request)
 
 # Creating and destroying test pages --------------------------------
@@ -84,10 +83,11 @@ def append_page(request, pagename, content, do_editor_backup=False):
     return page
 
 def nuke_eventlog(request):
-    """ removes event-log file """
+    """ removes event-log file (and its rotated segments) """
     fpath = request.rootpage.getPagePath('event-log', isfile=1)
     if os.path.exists(fpath):
         os.remove(fpath)
+    SegmentManifest(fpath).remove()
 
 def nuke_page(request, pagename):
     """ completely delete a page, everything in the pagedir """
@@ -99,6 +99,7 @@ def nuke_page(request, pagename):
     # really get rid of everything there:
     fpath = page.getPagePath(check_create=0)
     shutil.rmtree(fpath, True)
+    request.stat_cache.clear()
 
 def create_random_string_list(length=14, count=10):
     """ creates a list of random strings """
@@ -6,9 +6,16 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import time
+
 import py
 
-from MoinMoin.Page import Page
+from MoinMoin import caching
+from MoinMoin.Page import Page, ItemCache, AclCache, PageListIndex, get_pagelist_index
+from MoinMoin.logfile import editlog
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin.util.lru import LRUCache
+from MoinMoin._tests import become_trusted, create_page, nuke_page
 
 class TestPage:
     def testMeta(self):
@@ -72,6 +79,163 @@ class TestRootPage:
         assert u'FrontPage' in pagelist
         assert u'' not in pagelist
 
+class TestItemCache:
+    def testRefreshUsesGeneration(self):
+        request = self.request
+        cache = ItemCache('meta')
+        cache.refresh(request) # seeds log_pos and generation
+        assert cache.log_pos == editlog.EditLog(request).size()
+        generation = editlog.generation(request)
+        assert cache.log_generation == generation.get()
+        # unchanged generation: edit-log is not looked at
+        cache.log_pos = -1
+        cache.refresh(request)
+        assert cache.log_pos == -1
+        # changed generation (e.g. by another process): edit-log is read
+        cache.log_pos = None
+        generation.set(generation.get() + 1)
+        cache.refresh(request)
+        assert cache.log_generation == generation.get()
+        assert cache.log_pos == editlog.EditLog(request).size()
+
+
+class TestAclCache:
+    def testChanges(self):
+        request = self.request
+        cache = AclCache()
+        cache.refresh(request)
+        cache.log_checked = time.time() # do not look at the edit-log
+        for name in (u'A', u'A/B', u'A/B/C', u'AB', u'X/A'):
+            cache.putItem(request, name, 'effective', name)
+        cache._changed(request, [u'A/B'], 0)
+        assert cache.getItem(request, u'A', 'effective') == u'A'
+        assert cache.getItem(request, u'A/B', 'effective') is None
+        assert cache.getItem(request, u'A/B/C', 'effective') is None
+        assert cache.getItem(request, u'AB', 'effective') == u'AB'
+        assert cache.getItem(request, u'X/A', 'effective') == u'X/A'
+        cache.putItem(request, u'A/B/C', 'effective', u'new')
+        assert cache.getItem(request, u'A/B/C', 'effective') == u'new'
+        cache._changed(request, [u'A'], 0)
+        assert cache.getItem(request, u'A/B/C', 'effective') is None
+
+    def testBounded(self):
+        request = self.request
+        cache = AclCache()
+        cache.cache = LRUCache(3)
+        cache.refresh(request)
+        for i in range(5):
+            cache.putItem(request, u'Page%d' % i, 'effective', i)
+        assert len(cache.cache) == 3
+        assert cache.getItem(request, u'Page0', 'effective') is None
+        assert cache.getItem(request, u'Page4', 'effective') == 4
+
+
+class TestPageListIndex:
+    pagename = u'PageListIndexTestPage'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def testIndexPatchedFromEditLog(self):
+        rootpage = self.request.rootpage
+        assert self.pagename not in rootpage.getPageList(user='')
+        create_page(self.request, self.pagename, u'Foo')
+        assert self.pagename in rootpage.getPageList(user='')
+        index = self.request.cfg.cache.pagelists.getItem(self.request, 'all', None)
+        assert index.pages[self.pagename] == (0, True, 1, None)
+
+    def testIndexPersistence(self):
+        create_page(self.request, self.pagename, u'Foo')
+        self.request.rootpage.getPageList(user='')
+        index = self.request.cfg.cache.pagelists.getItem(self.request, 'all', None)
+        index.save(self.request)
+        # a fresh process loads the index from disk, not from the filesystem:
+        loaded = PageListIndex(self.request)
+        assert loaded.pages == index.pages
+        assert loaded.log_pos == index.log_pos
+
+    def testNamesPatchedFromEditLog(self):
+        names = get_pagelist_index(self.request).names()
+        assert self.pagename not in names
+        create_page(self.request, self.pagename, u'Foo')
+        names = get_pagelist_index(self.request).names()
+        assert self.pagename in names.startswith(u'PageListIndexTest')
+        assert self.pagename in names.close_matches(u'PageListIndexTestPaeg')
+        PageEditor(self.request, self.pagename, do_editor_backup=False).deletePage()
+        assert self.pagename not in get_pagelist_index(self.request).names()
+
+    def testPageStatus(self):
+        index = PageListIndex(self.request)
+        assert index.pageStatus(self.request, u'ThisPageDoesNotExist') is None
+        create_page(self.request, self.pagename, u'Foo')
+        PageEditor(self.request, self.pagename, do_editor_backup=False).deletePage()
+        assert index.pageStatus(self.request, self.pagename) == (0, False, 2, None)
+
+
+class TestPageCodeCache:
+    pagename = u'PageCodeCacheTestPage'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def testCodeReused(self):
+        import marshal, StringIO
+        request = self.request
+        page = create_page(request, self.pagename, u'Foo')
+        out = StringIO.StringIO()
+        request.redirect(out)
+        page.send_page(emit_headers=False) # creates the formatting cache
+        request.redirect()
+        code, link_targets = page.loadCache(request)
+        assert page.loadCache(request)[0] is code # not unmarshalled again
+        # a changed cache entry (e.g. written by another process) is loaded
+        cache = caching.CacheEntry(request, page, page.getFormatterName(), scope='item')
+        cache.update(marshal.dumps((compile('foo = 1', 'foo', 'exec'), ())))
+        code, link_targets = page.loadCache(request)
+        assert code.co_names == ('foo', )
+        assert page.loadCache(request)[0] is code
+
+    def testLinkTargetsResolved(self):
+        import StringIO
+        request = self.request
+        target = self.pagename + u'/Target'
+        missing = self.pagename + u'/Missing'
+        page = create_page(request, self.pagename, u'[[%s]] [[%s]]' % (target, missing))
+        create_page(request, target, u'Foo')
+        try:
+            out = StringIO.StringIO()
+            request.redirect(out)
+            page.send_page(emit_headers=False) # creates the formatting cache
+            request.redirect()
+            code, link_targets = page.loadCache(request)
+            assert sorted(link_targets) == [missing, target]
+            request.stat_cache.clear()
+            out = StringIO.StringIO()
+            request.redirect(out)
+            page.send_page(emit_headers=False) # uses the cache
+            request.redirect()
+            memo = request.stat_cache.memo
+            assert memo[('exists', target)] is True
+            assert memo[('exists', missing)] is False
+            assert Page(request, target).exists()
+            assert not Page(request, missing).exists()
+        finally:
+            nuke_page(request, target)
+
+    def testStatCacheInvalidatedBySave(self):
+        request = self.request
+        assert not Page(request, self.pagename).exists(includeDeleted=True) # cached now
+        create_page(request, self.pagename, u'Foo')
+        page = Page(request, self.pagename)
+        assert page.exists(includeDeleted=True)
+        assert page.exists()
+
 
 coverage_modules = ['MoinMoin.Page']
 
@@ -298,6 +298,7 @@ class TestCopyPage(object):
             import shutil
             shutil.rmtree(Page(self.request, self.pagename).getPagePath(), True)
             shutil.rmtree(Page(self.request, self.copy_pagename).getPagePath(), True)
+            self.request.stat_cache.clear()
 
     def test_copy_page(self):
         """
@@ -8,10 +8,11 @@
 
 import py
 
-import time
+import os, time, threading, SocketServer
 
 from MoinMoin import caching
 from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import wikiconfig
 
 
 class TestCaching(object):
@@ -95,5 +96,165 @@ class TestCaching(object):
 
         assert data == rdata
 
+
+class TestCachingLRUBackend(TestCaching):
+    """ Tests the caching module using a cache backend """
+    class Config(wikiconfig.Config):
+        cache_backend = caching.LRUCacheBackend()
+        cache_backend_arenas = ['test_arena', 'somethingfunny', 'test_key', ]
+
+    def test_no_file(self):
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_backend', 'wiki')
+        cache.update('12345abcde')
+        assert cache.exists()
+        assert not os.path.exists(cache._fname)
+        assert cache.size() == 10
+        uid = cache.uid()
+        cache.update('12345abcdf')
+        assert cache.uid() != uid
+        cache.remove()
+        assert not cache.exists()
+        py.test.raises(caching.CacheError, cache.content)
+
+
+class TestLRUCacheBackend(object):
+    """ Tests the in-process LRU cache backend """
+
+    def test_max_entries(self):
+        backend = caching.LRUCacheBackend(max_entries=3)
+        for key in 'abc':
+            backend.set(key, 1.0, key)
+        assert backend.get('a') == (1.0, 'a') # now b is the least recently used
+        backend.set('d', 2.0, 'd')
+        assert backend.get('b') is None
+        assert [backend.get(key) for key in 'acd'] == [(1.0, 'a'), (1.0, 'c'), (2.0, 'd')]
+        backend.delete('c')
+        backend.delete('x')
+        assert backend.get('c') is None
+
+    def test_max_bytes(self):
+        backend = caching.LRUCacheBackend(max_bytes=10)
+        backend.set('a', 1.0, '12345')
+        backend.set('b', 1.0, '1234')
+        backend.set('a', 2.0, '123') # replaces old a
+        backend.set('c', 1.0, '1234') # b is evicted
+        assert backend.get('b') is None
+        assert backend.get('a') == (2.0, '123')
+        backend.set('d', 1.0, 'x' * 11) # too big for the cache
+        assert backend.get('d') is None
+        assert backend.get('c') == (1.0, '1234')
+
+
+class MemcachedStandIn(SocketServer.StreamRequestHandler):
+    """ handles get/set/delete of the memcached text protocol """
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            args = line.split()
+            if args[0] == 'get':
+                if args[1] in store:
+                    value = store[args[1]]
+                    self.wfile.write('VALUE %s 0 %d\r\n%s\r\n' % (args[1], len(value), value))
+                self.wfile.write('END\r\n')
+            elif args[0] == 'set':
+                value = self.rfile.read(int(args[4]) + 2)[:-2]
+                if len(value) > self.server.max_size:
+                    self.wfile.write('SERVER_ERROR object too large for cache\r\n')
+                else:
+                    store[args[1]] = value
+                    self.wfile.write('STORED\r\n')
+            elif args[0] == 'delete':
+                self.wfile.write(store.pop(args[1], None) is None and 'NOT_FOUND\r\n' or 'DELETED\r\n')
+            else:
+                self.wfile.write('ERROR\r\n')
+
+
+class TestMemcachedCacheBackend(object):
+    """ Tests the memcached cache backend against a local stand-in server """
+
+    def setup_class(self):
+        SocketServer.ThreadingTCPServer.allow_reuse_address = True
+        self.server = SocketServer.ThreadingTCPServer(('127.0.0.1', 0), MemcachedStandIn)
+        self.server.daemon_threads = True
+        self.server.store = {}
+        self.server.max_size = 100
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        self.address = '127.0.0.1:%d' % self.server.server_address[1]
+
+    def teardown_class(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_set_delete(self):
+        backend = caching.MemcachedCacheBackend(self.address, prefix='test')
+        assert backend.get(u'/some/file') is None
+        backend.set(u'/some/file', 1.5, 'data\r\nEND\r\n')
+        assert backend.get(u'/some/file') == (1.5, 'data\r\nEND\r\n')
+        assert backend.get(u'/other/file') is None
+        backend.delete(u'/some/file')
+        assert backend.get(u'/some/file') is None
+
+    def test_too_large(self):
+        backend = caching.MemcachedCacheBackend(self.address, prefix='test')
+        backend.set('/some/file', 1.0, 'small')
+        backend.set('/some/file', 2.0, 'x' * 100)
+        # the old content must not survive a failed update
+        assert backend.get('/some/file') is None
+
+    def test_unreachable(self):
+        backend = caching.MemcachedCacheBackend('127.0.0.1:1', timeout=0.5)
+        backend.set('/some/file', 1.0, 'data')
+        assert backend.get('/some/file') is None
+
+    def test_cache_entry(self):
+        cfg = self.request.cfg
+        saved = cfg.cache_backend, cfg.cache_backend_arenas
+        cfg.cache_backend = caching.MemcachedCacheBackend(self.address, prefix='test')
+        cfg.cache_backend_arenas = ['test_arena', ]
+        try:
+            test_data = {1: 2, 2: 3, 3: [4, 5, ], }
+            cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki', use_pickle=True)
+            cache.update(test_data)
+            assert not os.path.exists(cache._fname)
+            cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki', use_pickle=True)
+            assert cache.content() == test_data
+            assert time.time() - 2 <= cache.mtime() <= time.time()
+            cache.remove()
+            assert not cache.exists()
+        finally:
+            cfg.cache_backend, cfg.cache_backend_arenas = saved
+
+    def test_fetch_once(self):
+        """ caching: a cache entry gets the value from the backend only once """
+        cfg = self.request.cfg
+        saved = cfg.cache_backend, cfg.cache_backend_arenas
+        backend = cfg.cache_backend = caching.MemcachedCacheBackend(self.address, prefix='test')
+        cfg.cache_backend_arenas = ['test_arena', ]
+        gets = []
+        backend_get = backend.get
+        backend.get = lambda key: gets.append(key) or backend_get(key)
+        try:
+            caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki').update('data')
+            assert gets == []
+            cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki')
+            assert cache.exists()
+            assert cache.mtime() > 0
+            assert cache.size() == 4
+            assert cache.uid() is not None
+            assert cache.content() == 'data'
+            assert len(gets) == 1
+            cache.update('other')
+            assert cache.content() == 'other'
+            cache.remove()
+            assert not cache.exists()
+            assert len(gets) == 1
+        finally:
+            cfg.cache_backend, cfg.cache_backend_arenas = saved
+
 coverage_modules = ['MoinMoin.caching']
 
@@ -0,0 +1,96 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.diffcache Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching, diffcache, wikiutil
+from MoinMoin.Page import Page
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import become_trusted, create_page, nuke_page
+
+
+class TestDiffCache:
+    """ diffcache: cached revision diffs """
+    pagename = u'DiffCacheTestPage'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+        create_page(self.request, self.pagename, u'one\ntwo\nthree\n')
+        self.save(u'one\n2\nthree\n')
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def save(self, text, **kw):
+        PageEditor(self.request, self.pagename, **kw).saveText(text, 0)
+
+    def cached(self):
+        return sorted([key for mtime, size, key in
+                       diffcache._cached_diffs(self.request, Page(self.request, self.pagename))])
+
+    def testSaved(self):
+        """ diffcache: the diffs against the previous revision are made when saving """
+        request = self.request
+        text_key = diffcache.cache_key(1, 2, 'text')
+        assert text_key in self.cached()
+        assert diffcache.cache_key(1, 2, 'html-%s' % request.lang) in self.cached()
+        expected = ['  one', '- two', '+ 2', '  three', '  ']
+        assert wikiutil.pagediff(request, self.pagename, 1, self.pagename, 2) == expected
+        # the cached diff is used
+        page = Page(request, self.pagename)
+        caching.CacheEntry(request, page, text_key, scope='item', use_pickle=True).update(['cached'])
+        assert wikiutil.pagediff(request, self.pagename, 1, self.pagename, 2) == ['cached']
+        assert diffcache.get_diff(request, self.pagename, 1, 2, 'text', ignorews=1) == expected
+
+    def testDiffAction(self):
+        """ diffcache: the diff action shows the cached diff """
+        url = '/%s?action=diff&rev1=1&rev2=2' % self.pagename
+        appiter, status, headers = self.client.get(url)
+        output = ''.join(appiter)
+        assert '<td class="diff-removed"><span>two</span></td>' in output
+        page = Page(self.request, self.pagename)
+        key = diffcache.cache_key(1, 2, 'html-en')
+        caching.CacheEntry(self.request, page, key, scope='item', use_pickle=True).update(
+            '<tr><td>cached diff</td></tr>')
+        appiter, status, headers = self.client.get(url)
+        output = ''.join(appiter)
+        assert status[:3] == '200'
+        assert '<tr><td>cached diff</td></tr>' in output
+
+    def testNotCached(self):
+        """ diffcache: diffs with revisions that do not exist yet are not cached """
+        request = self.request
+        before = self.cached()
+        diffcache.get_diff(request, self.pagename, 2, 3, 'text')
+        assert self.cached() == before
+        request.cfg.diff_cache_max_entries = 0
+        try:
+            diffcache.get_diff(request, self.pagename, 2, 1, 'text')
+        finally:
+            request.cfg.diff_cache_max_entries = 20
+        assert self.cached() == before
+
+    def testEvict(self):
+        """ diffcache: only the newest diffs are kept """
+        request = self.request
+        for i in range(3):
+            self.save(u'one\n%d\nthree\n' % i)
+        request.cfg.diff_cache_max_entries = 3
+        try:
+            diffcache.get_diff(request, self.pagename, 1, 5, 'text')
+        finally:
+            request.cfg.diff_cache_max_entries = 20
+        cached = self.cached()
+        assert len(cached) == 3
+        assert diffcache.cache_key(1, 5, 'text') in cached
+
+    def testOverwritten(self):
+        """ diffcache: overwriting a revision removes its cached diffs """
+        self.save(u'one\nthree\n', do_revision_backup=0)
+        assert wikiutil.pagediff(self.request, self.pagename, 1, self.pagename, 2) == [
+            '  one', '- two', '  three', '  ']
+
+coverage_modules = ['MoinMoin.diffcache']
@@ -0,0 +1,116 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.linkgraph Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import linkgraph
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import become_trusted, create_page, nuke_page
+
+
+class TestLinkGraph:
+    """ linkgraph: link graph index """
+    pagename = u'LinkGraphTestPage'
+    target = u'LinkGraphTestWanted'
+    renamed = u'LinkGraphTestRenamed'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+        nuke_page(self.request, self.renamed)
+
+    def linking(self, graph, pagename):
+        return graph.linking_to(self.request, lambda name: name == pagename)
+
+    def testSaveDelete(self):
+        request = self.request
+        graph = linkgraph.get_linkgraph(request)
+        create_page(request, self.pagename, u'%s FrontPage' % self.target)
+        assert graph.links_from(request, self.pagename) == (self.target, u'FrontPage')
+        assert self.linking(graph, self.target) == set([self.pagename])
+        assert self.pagename in self.linking(graph, u'FrontPage')
+        pages = [self.pagename, u'FrontPage']
+        assert graph.wanted(request, pages) == {self.target: [self.pagename]}
+        assert graph.wanted(request, pages, [u'FrontPage']) == {}
+        assert graph.orphaned(request, pages) == [self.pagename]
+
+        PageEditor(request, self.pagename).saveText(u'FrontPage', 0)
+        assert graph.links_from(request, self.pagename) == (u'FrontPage', )
+        assert self.linking(graph, self.target) == set()
+
+        PageEditor(request, self.pagename, do_editor_backup=False).deletePage()
+        assert graph.links_from(request, self.pagename) == ()
+        assert self.pagename not in self.linking(graph, u'FrontPage')
+
+    def testRename(self):
+        request = self.request
+        graph = linkgraph.get_linkgraph(request)
+        create_page(request, self.pagename, self.target)
+        assert self.linking(graph, self.target) == set([self.pagename])
+        PageEditor(request, self.pagename).renamePage(self.renamed)
+        assert self.linking(graph, self.target) == set([self.renamed])
+        assert graph.links_from(request, self.pagename) == ()
+
+    def testOtherProcess(self):
+        request = self.request
+        graph = linkgraph.get_linkgraph(request)
+        graph.refresh(request)
+        other = linkgraph.LinkGraph()
+        other.refresh(request) # loaded from disk
+        assert other.links == graph.links
+        assert other.backlinks == graph.backlinks
+        create_page(request, self.pagename, self.target) # only graph is told
+        assert self.linking(other, self.target) == set([self.pagename])
+
+    def testNotBuilt(self):
+        """ linkgraph: queries about some pages do not build the graph """
+        request = self.request
+        create_page(request, self.pagename, u'%s FrontPage' % self.target)
+        linkgraph.get_linkgraph(request).refresh(request)
+        cache = linkgraph.LinkGraph()._cache(request)
+        cache.remove()
+        graph = linkgraph.LinkGraph()
+        assert graph.links_from(request, self.pagename) == (self.target, u'FrontPage')
+        assert graph.linking_to(request, lambda name: True) is None
+        assert graph.log_pos is None
+        assert not cache.exists()
+        graph.refresh(request) # builds and saves it
+        assert cache.exists()
+        assert self.linking(graph, self.target) == set([self.pagename])
+
+    def testNotSaved(self):
+        """ linkgraph: changes are not saved, other processes replay them """
+        request = self.request
+        graph = linkgraph.get_linkgraph(request)
+        graph.refresh(request)
+        cache = graph._cache(request)
+        uid = cache.uid()
+        create_page(request, self.pagename, self.target)
+        assert self.linking(graph, self.target) == set([self.pagename])
+        assert cache.uid() == uid
+        assert self.linking(linkgraph.LinkGraph(), self.target) == set([self.pagename])
+
+    def testLinkSearch(self):
+        """ linkgraph: linkto: searches use the backlinks """
+        from MoinMoin.search import searchPages
+        request = self.request
+        create_page(request, self.pagename, self.target)
+        graph = linkgraph.get_linkgraph(request)
+        graph.refresh(request)
+        result = searchPages(request, u'linkto:%s' % self.target)
+        assert [hit.page_name for hit in result.hits] == [self.pagename]
+        linkgraph.LinkGraph()._cache(request).remove()
+        request.cfg.cache.linkgraph = linkgraph.LinkGraph() # not built yet
+        try:
+            result = searchPages(request, u'linkto:%s' % self.target)
+            assert [hit.page_name for hit in result.hits] == [self.pagename]
+        finally:
+            request.cfg.cache.linkgraph = graph
+            graph.save(request)
+
+coverage_modules = ['MoinMoin.linkgraph']
@@ -71,6 +71,10 @@ class TestLoginWithPassword(object):
                 os.remove(path)
             except OSError:
                 pass
+            try:
+                os.remove(path + '.bookmarks')
+            except OSError:
+                pass
             del self.user
 
         # Restore original user
@@ -240,6 +244,80 @@ class TestLoginWithPassword(object):
         theUser.subscribe(pagename)
         assert not theUser.isSubscribedTo([testPagename]) # list(!) of pages to check
 
+    def testSaveAtomic(self):
+        """ user: save writes a temp file and renames it """
+        name = u'__Some Name__'
+        self.createUser(name, name)
+        user_dir = self.request.cfg.user_dir
+        assert not [fn for fn in os.listdir(user_dir) if fn.startswith(self.user.id + '.')]
+        theUser = user.User(self.request, self.user.id)
+        assert theUser.valid
+        assert theUser.last_saved == self.user.last_saved
+
+    def testSaveUpdatesCachesOnlyIfNeeded(self):
+        """ user: save only rewrites the lookup cache if a cached attribute changed """
+        name = u'__Some Name__'
+        self.createUser(name, name)
+        assert user.getUserId(self.request, name) == self.user.id # make sure the lookup cache exists
+        lookup = caching.CacheEntry(self.request, 'users', 'lookup', scope='userdir')
+        uid = lookup.uid()
+        theUser = user.User(self.request, self.user.id)
+        theUser.show_nonexist_qm = 1
+        theUser.save()
+        assert lookup.uid() == uid
+        theUser.email = u'some.name@example.org'
+        theUser.save()
+        assert lookup.uid() != uid
+        assert user.get_by_email_address(self.request, u'some.name@example.org').id == self.user.id
+
+    def testBookmarks(self):
+        """ user: bookmarks are stored without rewriting the profile """
+        name = u'__Some Name__'
+        self.createUser(name, name)
+        theUser = user.User(self.request, self.user.id)
+        theUser.setBookmark(1234)
+        assert theUser.getBookmark() == 1234
+        theUser = user.User(self.request, self.user.id)
+        assert theUser.getBookmark() == 1234
+        assert theUser.last_saved == self.user.last_saved
+        theUser.delBookmark()
+        theUser = user.User(self.request, self.user.id)
+        assert theUser.getBookmark() is None
+        for tm in range(1000):
+            theUser.setBookmark(tm)
+        assert os.path.getsize(self.user._User__filename() + '.bookmarks') <= user.User.BOOKMARKS_MAX_SIZE
+        theUser = user.User(self.request, self.user.id)
+        assert theUser.getBookmark() == 999
+
+    def testBookmarksCompactKeepsOtherChanges(self):
+        """ user: compacting the bookmarks keeps changes appended by others """
+        name = u'__Some Name__'
+        self.createUser(name, name)
+        theUser = user.User(self.request, self.user.id)
+        otherUser = user.User(self.request, self.user.id)
+        otherUser.bookmarks[u'OtherWiki'] = u'42'
+        otherUser._saveBookmark(u'OtherWiki', u'42')
+        assert u'OtherWiki' not in theUser.bookmarks
+        for tm in range(1000):
+            theUser.setBookmark(tm)
+        assert theUser.bookmarks[u'OtherWiki'] == u'42'
+        theUser = user.User(self.request, self.user.id)
+        assert theUser.getBookmark() == 999
+        assert theUser.bookmarks[u'OtherWiki'] == u'42'
+
+    def testSaveLocked(self):
+        """ user: save and bookmark changes leave no lock behind """
+        name = u'__Some Name__'
+        self.createUser(name, name)
+        theUser = user.User(self.request, self.user.id)
+        theUser.setBookmark(1234)
+        wlock = theUser._lock()
+        assert wlock is not None
+        wlock.release()
+        theUser.save()
+        user_dir = self.request.cfg.user_dir
+        assert os.listdir(os.path.join(user_dir, '__lock__', self.user.id)) == []
+
     def testRenameUser(self):
         """ create user and then rename user and check whether
         the old username is removed (and the lookup cache behaves well)
@@ -307,6 +385,61 @@ class TestLoginWithPassword(object):
             py.test.skip("Can't create test user")
 
 
+class TestSubscriptionIndex(object):
+    """ user: page subscription index """
+
+    def entry(self, *patterns):
+        return {'name': u'', 'email': 'x@example.org', 'subscribed_pages': list(patterns)}
+
+    def testMatches(self):
+        index = user.SubscriptionIndex({
+            '1': self.entry(u'FrontPage'),
+            '2': self.entry(u'Help.*', u'FrontPage'),
+            '3': self.entry(u'Some.Page', u'[invalid'),
+            '4': self.entry(u'(\\w+)/\\1'),
+            '5': self.entry(u'Foo|Bar'),
+        })
+        assert index.subscribers([u'FrontPage']) == set(['1', '2'])
+        assert index.subscribers([u'HelpContents', u'CategoryFoo']) == set(['2'])
+        assert index.subscribers([u'Some.Page']) == set(['3'])
+        assert index.subscribers([u'SomeXPage']) == set(['3'])
+        assert index.subscribers([u'[invalid']) == set(['3'])
+        assert index.subscribers([u'Same/Same']) == set(['4'])
+        assert index.subscribers([u'Same/Other']) == set()
+        # same semantics as isSubscribedTo: ^Foo|Bar$
+        assert index.subscribers([u'FooPage']) == set(['5'])
+        assert index.subscribers([u'OtherPage']) == set()
+
+    def testUpdate(self):
+        index = user.SubscriptionIndex({'1': self.entry(u'Help.*')})
+        assert index.subscribers([u'HelpContents']) == set(['1'])
+        entry = self.entry(u'Help.*', u'FrontPage')
+        index.add('2', entry)
+        entry['subscribed_pages'].remove(u'Help.*') # index keeps its own copy
+        assert index.subscribers([u'HelpContents']) == set(['1', '2'])
+        index.add('1', self.entry(u'FrontPage'))
+        assert index.subscribers([u'HelpContents']) == set(['2'])
+        index.remove('2')
+        assert index.subscribers([u'HelpContents']) == set()
+        assert index.subscribers([u'FrontPage']) == set(['1'])
+        assert not index.patterns
+
+    def testCopyOnWrite(self):
+        index = user.SubscriptionIndex({'1': self.entry(u'FrontPage', u'Help.*')})
+        exact, pattern = index.exact[u'FrontPage'], index.patterns[u'Help.*']
+        index.add('2', self.entry(u'FrontPage', u'Help.*'))
+        index.remove('1')
+        # sets a concurrent lookup might be iterating over are not changed
+        assert exact == set(['1']) and pattern == set(['1'])
+        assert index.subscribers([u'FrontPage', u'HelpContents']) == set(['2'])
+
+    def testManyGroups(self):
+        page_sub = dict([(str(i), self.entry(u'(Page)(%d)' % i)) for i in range(200)])
+        index = user.SubscriptionIndex(page_sub)
+        assert index.subscribers([u'Page123']) == set(['123'])
+        assert len(index._matchers) > 1
+
+
 class TestGroupName(object):
 
     def testGroupNames(self):
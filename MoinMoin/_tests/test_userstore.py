@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+    MoinMoin - MoinMoin.userstore Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import tempfile
+
+import py
+
+from MoinMoin import user, userstore
+
+if userstore.sqlite3 is None:
+    py.test.skip("sqlite3 module not available")
+
+
+class TestSQLiteUserStore(object):
+    """ userstore: sqlite user store """
+
+    def setup_method(self, method):
+        self.fname = tempfile.mktemp()
+        self.store = userstore.SQLiteUserStore(self.fname)
+
+    def teardown_method(self, method):
+        os.remove(self.fname)
+
+    def testSaveLoad(self):
+        data = {'name': u'Jürgen', 'last_saved': '1.0', 'quicklinks': [u'FrontPage'], 'bookmarks': {u'': u'1'}}
+        assert not self.store.exists(self.request, '1.1')
+        self.store.save(self.request, '1.1', data)
+        assert self.store.exists(self.request, '1.1')
+        loaded = self.store.load(self.request, '1.1')
+        assert loaded == data
+        loaded['quicklinks'].append(u'RecentChanges') # does not modify the cached data
+        assert self.store.load(self.request, '1.1') == data
+        assert self.store.userids(self.request) == ['1.1']
+        self.store.remove(self.request, '1.1')
+        assert self.store.load(self.request, '1.1') is None
+        assert self.store.userids(self.request) == []
+
+    def testChangedByOtherProcess(self):
+        self.store.save(self.request, '1.1', {'name': u'Foo', 'last_saved': '1.0'})
+        assert self.store.load(self.request, '1.1')['name'] == u'Foo'
+        other = userstore.SQLiteUserStore(self.fname)
+        other.save(self.request, '1.1', {'name': u'Bar', 'last_saved': '2.0'})
+        assert self.store.load(self.request, '1.1')['name'] == u'Bar'
+
+    def testLookup(self):
+        self.store.save(self.request, '1.1', {'name': u'Foo', 'email': u'Foo@example.org',
+                                              'openids': [u'http://foo.example.org/']})
+        self.store.save(self.request, '1.2', {'name': u'Bar', 'disabled': 1})
+        assert self.store.lookup(self.request, 'name', u'Foo') == '1.1'
+        assert self.store.lookup(self.request, 'name', u'foo') is None
+        assert self.store.lookup(self.request, 'email', u'foo@EXAMPLE.org', case=False) == '1.1'
+        assert self.store.lookup(self.request, 'openids', u'http://foo.example.org/') == '1.1'
+        assert self.store.lookup(self.request, 'name', u'Bar') is None # disabled
+        self.store.save(self.request, '1.1', {'name': u'Baz'})
+        assert self.store.lookup(self.request, 'name', u'Foo') is None
+        assert self.store.lookup(self.request, 'name', u'Baz') == '1.1'
+
+
+STORE_FNAME = tempfile.mktemp()
+
+
+class TestUserWithSQLiteUserStore(object):
+    """ userstore: users stored in a sqlite user store """
+
+    from MoinMoin._tests import wikiconfig
+    class Config(wikiconfig.Config):
+        user_store = userstore.SQLiteUserStore(STORE_FNAME)
+
+    def teardown_class(self):
+        os.remove(STORE_FNAME)
+
+    def testCreateLogin(self):
+        name = u'__UserStoreTestUser__'
+        password = u'secret'
+        theuser = user.User(self.request)
+        theuser.name = name
+        theuser.email = u'userstore@example.org'
+        theuser.enc_password = user.encodePassword(self.request.cfg, password)
+        theuser.save()
+        assert not os.path.exists(os.path.join(self.request.cfg.user_dir, theuser.id))
+        assert user.getUserId(self.request, name) == theuser.id
+        assert theuser.id in user.getUserList(self.request)
+
+        theuser = user.User(self.request, name=name, password=password)
+        assert theuser.valid
+        assert theuser.email == u'userstore@example.org'
+        assert user.get_by_email_address(self.request, u'USERSTORE@example.org').id == theuser.id
+
+        theuser.remove()
+        assert not theuser.exists()
+        assert user.getUserId(self.request, name) is None
+
+coverage_modules = ['MoinMoin.userstore']
@@ -31,7 +31,7 @@ import os, time, zipfile, errno, datetime
 from StringIO import StringIO
 import tarfile
 
-from werkzeug.http import http_date
+from werkzeug.http import http_date, quote_etag, is_resource_modified
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
@@ -361,6 +361,9 @@ def _addLogEntry(request, action, pagename, filename):
     t = wikiutil.timestamp2version(time.time())
     fname = wikiutil.url_quote(filename)
 
+    # the attachment dir changed, forget what we know about it
+    request.stat_cache.clear()
+
     # Write to global log
     log = editlog.EditLog(request)
     log.add(request, t, 99999999, action, pagename, request.remote_addr, fname)
@@ -1021,6 +1024,30 @@ def _do_box(pagename, request):
         request.send_file(ci.get(filename))
 
 
+def _send_file_offload(request, fpath):
+    """ Let the front end web server send the file, if configured to do so
+        (see cfg.send_file_header)
+
+    @param fpath: path of the file (str)
+    @return: True if the web server will send the file, False if we must
+    """
+    header = request.cfg.send_file_header
+    if not header:
+        return False
+    fpath = os.path.abspath(fpath)
+    if header.lower() == 'x-accel-redirect':
+        for prefix, url in request.cfg.send_file_accel_map:
+            if fpath.startswith(prefix):
+                value = url + wikiutil.url_quote(fpath[len(prefix):])
+                break
+        else:
+            return False
+    else:
+        value = fpath
+    request.headers[header] = value
+    return True
+
+
 def _do_get(pagename, request):
     _ = request.getText
 
@@ -1031,9 +1058,13 @@ def _do_get(pagename, request):
         request.status_code = 404
         return # error msg already sent in _access_file
 
-    timestamp = datetime.datetime.fromtimestamp(os.path.getmtime(fpath))
-    if_modified = request.if_modified_since
-    if if_modified and if_modified >= timestamp:
+    st = os.stat(fpath)
+    timestamp = datetime.datetime.utcfromtimestamp(int(st.st_mtime))
+    # changes whenever the file gets replaced or modified
+    etag = '%x-%x-%x' % (st.st_ino, st.st_size, int(st.st_mtime))
+    request.headers['ETag'] = quote_etag(etag)
+    request.headers['Last-Modified'] = http_date(timestamp)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=timestamp):
         request.status_code = 304
     else:
         mt = wikiutil.MimeType(filename=filename)
@@ -1053,14 +1084,39 @@ def _do_get(pagename, request):
         now = time.time()
         request.headers['Date'] = http_date(now)
         request.headers['Content-Type'] = content_type
-        request.headers['Last-Modified'] = http_date(timestamp)
         request.headers['Expires'] = http_date(now - 365 * 24 * 3600)
-        request.headers['Content-Length'] = os.path.getsize(fpath)
         content_dispo_string = '%s; filename="%s"' % (content_dispo, filename_enc)
         request.headers['Content-Disposition'] = content_dispo_string
 
+        if _send_file_offload(request, fpath):
+            # the web server also deals with Range requests
+            return
+
+        request.headers['Accept-Ranges'] = 'bytes'
+        size = st.st_size
+        offset, length = 0, None
+        # ranges only apply to the version of the file If-Range names
+        if_range = request.if_range
+        if request.range is not None and len(request.range.ranges) == 1 and (
+           (if_range.etag is None or if_range.etag == etag) and
+           (if_range.date is None or if_range.date == timestamp)):
+            byte_range = request.range.range_for_length(size)
+            if byte_range is None:
+                request.status_code = 416
+                request.headers['Content-Range'] = 'bytes */%d' % size
+                return
+            offset, end = byte_range
+            length = end - offset
+            request.status_code = 206
+            request.headers['Content-Range'] = 'bytes %d-%d/%d' % (offset, end - 1, size)
+            request.headers['Content-Length'] = length
+        else:
+            request.headers['Content-Length'] = size
+
         # send data
-        request.send_file(open(fpath, 'rb'))
+        f = open(fpath, 'rb')
+        f.seek(offset)
+        request.send_file(f, length=length)
 
 
 def _do_install(pagename, request):
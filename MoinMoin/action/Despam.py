@@ -42,9 +42,9 @@ def show_editors(request, pagename, timestamp):
     log = editlog.EditLog(request)
     editors = {}
     pages = {}
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
+    lines = list(log.since(timestamp))
+    lines.reverse()
+    for line in lines:
 
         if not request.user.may.read(line.pagename):
             continue
@@ -91,9 +91,9 @@ def show_pages(request, pagename, editor, timestamp):
     macro.formatter = request.html_formatter
 
     request.write("<table>")
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
+    lines = list(log.since(timestamp))
+    lines.reverse()
+    for line in lines:
 
         if not request.user.may.read(line.pagename):
             continue
@@ -164,9 +164,9 @@ def revert_pages(request, editor, timestamp):
     log = editlog.EditLog(request)
     pages = {}
     revertpages = []
-    for line in log.reverse():
-        if line.ed_time_usecs < timestamp:
-            break
+    lines = list(log.since(timestamp))
+    lines.reverse()
+    for line in lines:
 
         if not request.user.may.read(line.pagename):
             continue
@@ -15,7 +15,7 @@ import re
 import difflib
 
 from MoinMoin import config, wikiutil
-from MoinMoin.Page import Page
+from MoinMoin.Page import Page, get_pagelist_index
 
 
 def execute(pagename, request):
@@ -67,26 +67,20 @@ def findMatches(pagename, request, s_re=None, e_re=None):
     @rtype: tuple
     @return: start word, end word, matches dict
     """
-    # Get full list of pages, with no filtering - very fast. We will
-    # first search for like pages, then filter the results.
-    pages = request.rootpage.getPageList(user='', exists='')
-
-    # Remove current page
-    try:
-        pages.remove(pagename)
-    except ValueError:
-        pass
+    # Look up the names of all pages in the page name index - very fast.
+    # We will first search for like pages, then filter the results.
+    names = get_pagelist_index(request).names()
 
     # Get matches using wiki way, start and end of word
-    start, end, matches = wikiMatches(pagename, pages, start_re=s_re,
-                                      end_re=e_re)
+    start, end, matches = indexMatches(pagename, names, start_re=s_re,
+                                       end_re=e_re)
 
     # Get the best 10 close matches
     close_matches = {}
     found = 0
-    for name in closeMatches(pagename, pages):
-        # Skip names already in matches
-        if name in matches:
+    for name in names.close_matches(pagename):
+        # Skip names already in matches and the current page
+        if name in matches or name == pagename:
             continue
 
         # Filter deleted pages or pages the user can't read
@@ -111,22 +105,15 @@ def findMatches(pagename, request, s_re=None, e_re=None):
     return start, end, matches
 
 
-def wikiMatches(pagename, pages, start_re=None, end_re=None):
+def wikiWords(pagename, start_re=None, end_re=None):
     """
-    Get pages that starts or ends with same word as this page
-
-    Matches are ranked like this:
-        4 - page is subpage of pagename
-        3 - match both start and end
-        2 - match end
-        1 - match start
+    Get the start and end word of a page name
 
-    @param pagename: page name to match
-    @param pages: list of page names
+    @param pagename: page name
     @param start_re: start word re (compile regex)
     @param end_re: end word re (compile regex)
     @rtype: tuple
-    @return: start, end, matches dict
+    @return: start, end
     """
     if start_re is None:
         start_re = re.compile('([%s][%s]+)' % (config.chars_upper,
@@ -150,6 +137,28 @@ def wikiMatches(pagename, pages, start_re=None, end_re=None):
     else:
         end = words[-1]
 
+    return start, end
+
+
+def wikiMatches(pagename, pages, start_re=None, end_re=None):
+    """
+    Get pages that starts or ends with same word as this page
+
+    Matches are ranked like this:
+        4 - page is subpage of pagename
+        3 - match both start and end
+        2 - match end
+        1 - match start
+
+    @param pagename: page name to match
+    @param pages: list of page names
+    @param start_re: start word re (compile regex)
+    @param end_re: end word re (compile regex)
+    @rtype: tuple
+    @return: start, end, matches dict
+    """
+    start, end = wikiWords(pagename, start_re, end_re)
+
     matches = {}
     subpage = pagename + '/'
 
@@ -166,6 +175,33 @@ def wikiMatches(pagename, pages, start_re=None, end_re=None):
     return start, end, matches
 
 
+def indexMatches(pagename, names, start_re=None, end_re=None):
+    """
+    Get pages that starts or ends with same word as this page, like
+    wikiMatches, but using a NameIndex (the current page is not included)
+
+    @param pagename: page name to match
+    @param names: NameIndex of page names
+    @param start_re: start word re (compile regex)
+    @param end_re: end word re (compile regex)
+    @rtype: tuple
+    @return: start, end, matches dict
+    """
+    start, end = wikiWords(pagename, start_re, end_re)
+
+    matches = {}
+    subpage = pagename + '/'
+    for name in names.startswith(start):
+        matches[name] = 1
+    for name in names.endswith(end):
+        matches[name] = matches.get(name, 0) + 2
+    for name in names.startswith(subpage):
+        matches[name] = 4
+    matches.pop(pagename, None)
+
+    return start, end, matches
+
+
 def closeMatches(pagename, pages):
     """ Get close matches.
 
@@ -23,7 +23,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import wikiutil
+from MoinMoin import linkgraph, wikiutil
 from MoinMoin.Page import Page
 
 class MaxNodesReachedException(Exception):
@@ -87,6 +87,7 @@ class PageTreeBuilder:
         self.children = {}
         self.numnodes = 0
         self.maxnodes = 35
+        self.graph = linkgraph.get_linkgraph(request)
 
     def mark_child(self, name):
         self.children[name] = 1
@@ -106,7 +107,7 @@ class PageTreeBuilder:
     def new_kids(self, name):
         # does not recurse
         kids = []
-        for child in Page(self.request, name).getPageLinks(self.request):
+        for child in self.graph.links_from(self.request, name):
             if self.is_ok(child):
                 kids.append(child)
         return kids
@@ -438,7 +438,7 @@ class ActionClass(object):
                     merged_text_raw = merged_text.encode("utf-8")
 
                 # generate binary diff
-                diff = textdiff(remote_contents, merged_text_raw)
+                diff = textdiff(remote_contents, merged_text_raw, self.request.cfg.diff_engine)
                 if debug:
                     self.log_status(ActionClass.INFO, raw_suffix="Diff against %r" % remote_contents)
 
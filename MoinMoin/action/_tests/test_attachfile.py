@@ -9,7 +9,7 @@
 import os, StringIO
 from MoinMoin.action import AttachFile
 from MoinMoin.PageEditor import PageEditor
-from MoinMoin._tests import become_trusted, create_page, nuke_page
+from MoinMoin._tests import become_trusted, create_page, nuke_page, wikiconfig
 
 class TestAttachFile:
     """ testing action AttachFile"""
@@ -66,4 +66,80 @@ class TestAttachFile:
 
         assert file_exists
 
+
+class GetAttachmentBase:
+    """ helpers for testing AttachFile do=get """
+    pagename = u"AutoCreatedSillyPageToTestAttachmentDownloads"
+    filename = "download.txt"
+    data = "0123456789" * 10
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+        create_page(self.request, self.pagename, u"Foo!")
+        AttachFile.add_attachment(self.request, self.pagename, self.filename, self.data, True)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def get(self, *headers):
+        appiter, status, headers = self.client.get(
+            '/%s?action=AttachFile&do=get&target=%s' % (self.pagename, self.filename),
+            headers=list(headers))
+        return ''.join(appiter), int(status[:3]), dict(headers)
+
+
+class TestGetAttachment(GetAttachmentBase):
+    """ testing conditional and ranged downloads of AttachFile do=get """
+
+    def test_get(self):
+        data, status, headers = self.get()
+        assert status == 200
+        assert data == self.data
+        assert headers['Content-Length'] == str(len(self.data))
+        assert headers['Accept-Ranges'] == 'bytes'
+        etag = headers['ETag']
+        data, status, headers = self.get(('If-None-Match', etag))
+        assert status == 304
+        assert data == ''
+        data, status, headers = self.get(('If-None-Match', '"other"'))
+        assert status == 200
+
+    def test_range(self):
+        data, status, headers = self.get(('Range', 'bytes=10-19'))
+        assert status == 206
+        assert data == self.data[10:20]
+        assert headers['Content-Range'] == 'bytes 10-19/100'
+        assert headers['Content-Length'] == '10'
+        data, status, headers = self.get(('Range', 'bytes=-5'))
+        assert status == 206
+        assert data == self.data[-5:]
+        data, status, headers = self.get(('Range', 'bytes=200-'))
+        assert status == 416
+        assert headers['Content-Range'] == 'bytes */100'
+
+    def test_if_range(self):
+        etag = self.get()[2]['ETag']
+        data, status, headers = self.get(('Range', 'bytes=0-4'), ('If-Range', etag))
+        assert status == 206
+        assert data == self.data[:5]
+        # the file changed, we get all of it
+        data, status, headers = self.get(('Range', 'bytes=0-4'), ('If-Range', '"other"'))
+        assert status == 200
+        assert data == self.data
+
+
+class TestGetAttachmentAccelRedirect(GetAttachmentBase):
+    """ testing AttachFile do=get sending files by the web server """
+
+    class Config(wikiconfig.Config):
+        send_file_header = 'X-Accel-Redirect'
+        send_file_accel_map = [(os.path.abspath(wikiconfig.Config.data_dir), '/files')]
+
+    def test_get(self):
+        data, status, headers = self.get()
+        assert status == 200
+        assert data == ''
+        assert headers['X-Accel-Redirect'].startswith('/files/pages/')
+        assert headers['X-Accel-Redirect'].endswith('/attachments/%s' % self.filename)
+
 coverage_modules = ['MoinMoin.action.AttachFile']
@@ -11,7 +11,7 @@
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
-from MoinMoin import wikiutil
+from MoinMoin import wikiutil, diffcache
 from MoinMoin.logfile import editlog
 from MoinMoin.Page import Page
 
@@ -63,8 +63,9 @@ def execute(pagename, request):
     if date: # this is how we get called from RecentChanges
         rev1 = 0
         log = editlog.EditLog(request, rootpagename=pagename)
+        log.set_filter(until=date + 1)
         for line in log.reverse():
-            if date >= line.ed_time_usecs and int(line.rev) != 99999999:
+            if int(line.rev) != 99999999:
                 rev1 = int(line.rev)
                 break
         else:
@@ -229,13 +230,13 @@ def execute(pagename, request):
 
     if request.user.show_fancy_diff:
         from MoinMoin.util import diff_html
-        request.write(f.rawHTML(diff_html.diff(request, oldpage.get_raw_body(), newpage.get_raw_body(), old_top=rev_info_old_html, new_top=rev_info_new_html, old_top_class="diff-info", new_top_class="diff-info")))
+        rows = diffcache.get_diff(request, pagename, oldrev, newrev, 'html')
+        request.write(f.rawHTML(diff_html.diff_table(rows, old_top=rev_info_old_html, new_top=rev_info_new_html, old_top_class="diff-info", new_top_class="diff-info")))
         newpage.send_page(count_hit=0, content_only=1, content_id="content-below-diff")
     else:
         request.write(f.rawHTML('<table class="diff"><tr><td class="diff-info">%s</td><td class="diff-info">%s</td></tr></table>' % (rev_info_old_html, rev_info_new_html)))
 
-        from MoinMoin.util import diff_text
-        lines = diff_text.diff(oldpage.getlines(), newpage.getlines())
+        lines = diffcache.get_diff(request, pagename, oldrev, newrev, 'text', ignorews)
         if not lines:
             msg = f.text(" - " + _("No differences found!"))
             if edit_count > 1:
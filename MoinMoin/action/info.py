@@ -247,14 +247,12 @@ def execute(pagename, request):
         may_write = request.user.may.write(pagename)
         may_delete = request.user.may.delete(pagename)
 
-        count = 0
+        # the entries of the pages before are passed over without parsing them
+        count = paging and offset or 0
         pgactioncount = 0
-        for line in log.reverse():
+        for line in log.reverse(count):
             count += 1
 
-            if paging and count <= offset:
-                continue
-
             rev = int(line.rev)
             actions = []
             if line.action in ('SAVE', 'SAVENEW', 'SAVE/REVERT', 'SAVE/RENAME', ):
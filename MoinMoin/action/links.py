@@ -7,7 +7,7 @@
     @copyright: 2001 Juergen Hermann <jh@web.de>
     @license: GNU GPL, see COPYING for details.
 """
-from MoinMoin import config, wikiutil
+from MoinMoin import config, linkgraph, wikiutil
 
 def execute(pagename, request):
     _ = request.getText
@@ -23,13 +23,15 @@ def execute(pagename, request):
     pages = request.rootpage.getPageDict()
     pagelist = pages.keys()
     pagelist.sort()
+    graph = linkgraph.get_linkgraph(request)
+    graph.refresh(request) # we need the links of all pages, build the graph
 
     for name in pagelist:
         if mimetype == "text/html":
             request.write(pages[name].link_to(request))
         else:
             _emit(request, name)
-        for link in pages[name].getPageLinks(request):
+        for link in graph.links_from(request, name):
             request.write(" ")
             if mimetype == "text/html":
                 if link in pages:
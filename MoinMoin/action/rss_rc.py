@@ -110,6 +110,8 @@ def execute(pagename, request):
     # NOT recently changed and the global edit-log is rather big.
     kw = dict(rootpagename=page_pattern) if is_single_page_match(page_pattern) else {}
     log = editlog.EditLog(request, **kw)
+    if not show_att:
+        log.set_filter(action=editlog.SAVE_ACTIONS)
     logdata = []
     counter = 0
     pages = {}
@@ -117,8 +119,7 @@ def execute(pagename, request):
     for line in log.reverse():
         if not request.user.may.read(line.pagename):
             continue
-        if ((not show_att and not line.action.startswith('SAVE')) or
-            ((line.pagename in pages) and unique) or
+        if (((line.pagename in pages) and unique) or
             not match_page(line.pagename, page_pattern)):
             continue
         line.editor = line.getInterwikiEditorData(request)
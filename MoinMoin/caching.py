@@ -2,21 +2,37 @@
 """
     MoinMoin caching module
 
+    CacheEntry objects store their content in files below the cache
+    directory. Alternatively, a cache backend object (cfg.cache_backend) can
+    be configured for some hot cache arenas (cfg.cache_backend_arenas), so
+    their content is read and written without filesystem locks, see
+    LRUCacheBackend and MemcachedCacheBackend. A CacheEntry fetches the
+    value from the backend only once (for all of exists, mtime, size, uid
+    and content), so create a new CacheEntry to see later changes.
+
     @copyright: 2001-2004 by Juergen Hermann <jh@web.de>,
                 2006-2009 MoinMoin:ThomasWaldmann,
-                2008 MoinMoin:ThomasPfaff
+                2008 MoinMoin:ThomasPfaff,
+                2026 MoinMoin contributors
     @license: GNU GPL, see COPYING for details.
 """
 
 import os
 import shutil
 import tempfile
+import time
+import socket
+import struct
+import hashlib
+import threading
+from cStringIO import StringIO
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin import config
 from MoinMoin.util import filesys, lock, pickle, PICKLE_PROTOCOL
+from MoinMoin.util.lru import LRUCache
 
 
 class CacheError(Exception):
@@ -48,6 +64,176 @@ def get_cache_list(request, arena, scope):
         return []
 
 
+def get_backend(request, arena, key, scope):
+    """ Return the cache backend to use for some cache entry or None (if the
+        entry shall be stored in a file).
+
+        For scope 'item', the key (e.g. 'text_html', 'pagelinks') is looked
+        up in cfg.cache_backend_arenas, for other scopes the arena name.
+        Entries with scope 'dir' are always stored in files.
+    """
+    backend = request.cfg.cache_backend
+    if backend is None or scope == 'dir':
+        return None
+    if scope == 'item':
+        name = key
+    else:
+        name = arena
+    if name in request.cfg.cache_backend_arenas:
+        return backend
+    return None
+
+
+class CacheBackend:
+    """ Base class of cache backends
+
+    A cache backend stores (mtime, data) tuples under some key (the file name
+    the cache entry would have without a backend). Backends must be thread
+    safe and must not raise on errors (but log them and act as if the key
+    was not there).
+    """
+    def get(self, key):
+        """ Return the (mtime, data) tuple stored under key or None """
+        raise NotImplementedError
+
+    def set(self, key, mtime, data):
+        """ Store (mtime, data) under key """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """ Remove key (if it is there) """
+        raise NotImplementedError
+
+
+class LRUCacheBackend(CacheBackend):
+    """ In-process cache backend, discarding the least recently used entries
+
+    Note: as the content is only kept in the memory of one process, this is
+          only usable if there is only one moin process (it may use multiple
+          threads) or for cache entries that are only a function of files the
+          cache entry gets checked against (see CacheEntry.needsUpdate), like
+          page formatting caches.
+    """
+    def __init__(self, max_entries=1000, max_bytes=64*1024*1024):
+        """
+        @param max_entries: maximum number of cache entries to keep
+        @param max_bytes: maximum total size of the cached data
+        """
+        self._cache = LRUCache(max_entries, max_bytes)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, mtime, data):
+        self._cache.set(key, (mtime, data), len(data))
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+
+class MemcachedCacheBackend(CacheBackend):
+    """ Cache backend using a (local) server speaking the memcached text protocol
+
+    As the server is shared by all moin processes, this can be used for all
+    kinds of caches. If the server is not reachable, cache entries just act
+    as if they were not there (and get recomputed by the callers).
+    """
+    _MTIME = struct.Struct('<d')
+
+    def __init__(self, server='127.0.0.1:11211', prefix='moin', timeout=3.0, expire=0):
+        """
+        @param server: 'host:port' or 'unix:/path/to/socket'
+        @param prefix: prefix for the memcached keys (use different prefixes
+                       for different wiki farms sharing a server)
+        @param timeout: socket timeout [s]
+        @param expire: expiration time [s] of stored entries (0 = never)
+        """
+        self.server = server
+        self.prefix = prefix
+        self.timeout = timeout
+        self.expire = expire
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _key(self, key):
+        if isinstance(key, unicode):
+            key = key.encode(config.charset)
+        return '%s:%s' % (self.prefix, hashlib.md5(key).hexdigest())
+
+    def _connect(self):
+        if self.server.startswith('unix:'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.server[5:]
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            host, port = self.server.rsplit(':', 1)
+            address = (host, int(port))
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except socket.error:
+            sock.close()
+            raise
+        self._sock = sock
+        self._file = sock.makefile('rb')
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except socket.error:
+                pass
+            self._sock = self._file = None
+
+    def _call(self, command, data=None):
+        """ Send a command (and data), return the first line of the reply """
+        if data is not None:
+            command = '%s\r\n%s' % (command, data)
+        self._lock.acquire()
+        try:
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(command + '\r\n')
+                line = self._file.readline()
+                if not line.endswith('\r\n'):
+                    raise EOFError('connection closed')
+                if line.startswith('VALUE '):
+                    # VALUE <key> <flags> <bytes>\r\n<data>\r\nEND\r\n
+                    size = int(line.split()[3])
+                    value = self._file.read(size + 2)[:size]
+                    if self._file.readline() != 'END\r\n' or len(value) != size:
+                        raise EOFError('bad reply')
+                    return value
+                return line[:-2]
+            except (socket.error, EOFError, ValueError, IndexError), err:
+                logging.warning("memcached cache backend %r: %s" % (self.server, str(err)))
+                self._disconnect()
+                return None
+        finally:
+            self._lock.release()
+
+    def get(self, key):
+        value = self._call('get %s' % self._key(key))
+        if value is None or value == 'END' or len(value) < self._MTIME.size:
+            return None
+        return self._MTIME.unpack_from(value)[0], value[self._MTIME.size:]
+
+    def set(self, key, mtime, data):
+        key = self._key(key)
+        value = self._MTIME.pack(mtime) + data
+        reply = self._call('set %s 0 %d %d' % (key, self.expire, len(value)), value)
+        if reply != 'STORED':
+            logging.warning("memcached cache backend %r: storing failed (%r)" % (self.server, reply))
+            # at least do not let the old content survive:
+            self._call('delete %s' % key)
+
+    def delete(self, key):
+        self._call('delete %s' % self._key(key))
+
+
 class CacheEntry:
     def __init__(self, request, arena, key, scope='wiki', do_locking=True,
                  use_pickle=False, use_encode=False):
@@ -71,9 +257,11 @@ class CacheEntry:
         self.use_pickle = use_pickle
         self.use_encode = use_encode
         self.arena_dir = get_arena_dir(request, arena, scope)
-        if not os.path.exists(self.arena_dir):
-            os.makedirs(self.arena_dir)
+        request.stat_cache.makedirs(self.arena_dir)
         self._fname = os.path.join(self.arena_dir, key)
+        self._backend = get_backend(request, arena, key, scope)
+        self._entry = None # (mtime, data) tuple fetched from the backend
+        self._fetched = False # did we fetch self._entry already?
 
         # used by file-like api:
         self._lock = None  # either a read or a write lock
@@ -86,18 +274,33 @@ class CacheEntry:
         # DEPRECATED - please use file-like api
         return self._fname
 
+    def _backend_entry(self):
+        """ Return the (mtime, data) tuple stored in the backend or None """
+        if not self._fetched:
+            self._entry = self._backend.get(self._fname)
+            self._fetched = True
+        return self._entry
+
     def exists(self):
+        if self._backend is not None:
+            return self._backend_entry() is not None
         return os.path.exists(self._fname)
 
     def mtime(self):
         # DEPRECATED for checking a changed on-disk cache, please use
         # self.uid() for this, see below
+        if self._backend is not None:
+            entry = self._backend_entry()
+            return entry and entry[0] or 0
         try:
             return os.path.getmtime(self._fname)
         except (IOError, OSError):
             return 0
 
     def size(self):
+        if self._backend is not None:
+            entry = self._backend_entry()
+            return entry and len(entry[1]) or 0
         try:
             return os.path.getsize(self._fname)
         except (IOError, OSError):
@@ -108,6 +311,9 @@ class CacheEntry:
 
             See docstring of MoinMoin.util.filesys.fuid for details.
         """
+        if self._backend is not None:
+            entry = self._backend_entry()
+            return entry and (entry[0], len(entry[1])) or None
         return filesys.fuid(self._fname)
 
     def needsUpdate(self, filename, attachdir=None):
@@ -115,9 +321,13 @@ class CacheEntry:
         #if not self.exists():
         #    return 1
 
+        stat_cache = self.request.stat_cache
         try:
-            ctime = os.path.getmtime(self._fname)
-            ftime = os.path.getmtime(filename)
+            if self._backend is not None:
+                ctime = self.mtime() # 0 if not there
+            else:
+                ctime = stat_cache.getmtime(self._fname)
+            ftime = stat_cache.getmtime(filename)
         except os.error:
             return 1
 
@@ -126,7 +336,7 @@ class CacheEntry:
         # if a page depends on the attachment dir, we check this, too:
         if not needsupdate and attachdir:
             try:
-                ftime2 = os.path.getmtime(attachdir)
+                ftime2 = stat_cache.getmtime(attachdir)
             except os.error:
                 ftime2 = 0
             needsupdate = ftime2 > ctime
@@ -147,7 +357,11 @@ class CacheEntry:
         if 'r' in mode:
             _lock = lock.LazyReadLock(lock_dir, 60.0)
         elif 'w' in mode:
-            _lock = lock.LazyWriteLock(lock_dir, 60.0)
+            if self.request.cfg.lock_mode == 'flock' and lock.fcntl is not None:
+                # cheap enough to really lock (LazyWriteLock does not on POSIX)
+                _lock = lock.FlockWriteLock(lock_dir, 60.0)
+            else:
+                _lock = lock.LazyWriteLock(lock_dir, 60.0)
         acquired = _lock.acquire(timeout)
         if acquired:
             self._lock = _lock
@@ -193,6 +407,17 @@ class CacheEntry:
             mode += 'b'  # we want to use binary mode, ever!
         self._mode = mode  # for self.close()
 
+        if self._backend is not None:
+            # backends store/return complete values atomically, no locks needed
+            if 'r' in mode:
+                entry = self._backend_entry()
+                if entry is None:
+                    raise CacheError("%s: not in cache backend" % self._fname)
+                self._fileobj = StringIO(entry[1])
+            else:
+                self._fileobj = StringIO()
+            return
+
         if self.locking:
             self.lock(mode)
         try:
@@ -233,12 +458,20 @@ class CacheEntry:
         """ close cache file (and release lock, if any) """
         try:
             if self._fileobj:
+                if self._backend is not None:
+                    if 'w' in self._mode:
+                        self._entry = (time.time(), self._fileobj.getvalue())
+                        self._fetched = True
+                        self._backend.set(self._fname, *self._entry)
+                    self._fileobj = None
+                    return
                 self._fileobj.close()
                 self._fileobj = None
                 if 'w' in self._mode:
                     filesys.chmod(self._tmp_fname, 0666 & config.umask) # fix mode that mkstemp chose
                     # this is either atomic or happening with real locks set:
                     filesys.rename(self._tmp_fname, self._fname)
+                    self.request.stat_cache.invalidate(self._fname)
         finally:
             if self.locking:
                 self.unlock()
@@ -287,6 +520,10 @@ class CacheEntry:
             raise CacheError(str(err))
 
     def remove(self):
+        if self._backend is not None:
+            self._backend.delete(self._fname)
+            self._entry, self._fetched = None, True
+            return
         if self.locking:
             self.lock('w')
         try:
@@ -294,6 +531,7 @@ class CacheEntry:
                 os.remove(self._fname)
             except OSError:
                 pass
+            self.request.stat_cache.invalidate(self._fname)
         finally:
             if self.locking:
                 self.unlock()
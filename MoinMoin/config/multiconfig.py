@@ -236,9 +236,10 @@ class ConfigFunctionality(object):
         self.siteid = siteid
         self.cache = CacheClass()
 
-        from MoinMoin.Page import ItemCache
+        from MoinMoin.Page import ItemCache, AclCache
         self.cache.meta = ItemCache('meta')
         self.cache.pagelists = ItemCache('pagelists')
+        self.cache.acl = AclCache()
 
         if self.config_check_enabled:
             self._config_check()
@@ -468,7 +469,7 @@ class ConfigFunctionality(object):
     def load_meta_dict(self):
         """ The meta_dict contains meta data about the wiki instance. """
         if self._meta_dict is None:
-            self._meta_dict = wikiutil.MetaDict(os.path.join(self.data_dir, 'meta'), self.cache_dir)
+            self._meta_dict = wikiutil.MetaDict(os.path.join(self.data_dir, 'meta'), self.cache_dir, self.lock_mode)
         return self._meta_dict
     meta_dict = property(load_meta_dict)
 
@@ -784,6 +785,19 @@ options_no_group_name = {
      'Session lifetime [h] of (anonymous, logged-in) users (see HelpOnSessions for details).'),
   )),
   # ==========================================================================
+  'caching': ('Cache settings', None, (
+    ('cache_backend', None,
+     "Cache backend object for the cache arenas listed in cache_backend_arenas, e.g. caching.LRUCacheBackend() or caching.MemcachedCacheBackend('127.0.0.1:11211') (None = store all caches in files below cache_dir)."),
+    ('cache_backend_arenas', ['text_html', 'pagelinks', 'pagegroups', 'pagedicts', ],
+     "Cache arenas (for page local caches: cache keys) stored in cache_backend. With an in-process backend like caching.LRUCacheBackend, only list caches that just depend on the files they are checked against (like the page formatting caches), but not e.g. 'charts' or 'hitcounts', which have to be shared by all processes."),
+    ('diff_cache_max_entries', 20,
+     "Maximum number of revision diffs cached per page (0 = do not cache diffs), see MoinMoin.diffcache."),
+    ('diff_cache_max_size', 1024 * 1024,
+     "Maximum total size [bytes] of the revision diffs cached per page."),
+    ('page_code_cache_size', 16 * 1024 * 1024,
+     "Maximum total size [bytes] of the compiled page formatting caches kept in memory by each process (0 = disabled)."),
+  )),
+  # ==========================================================================
   'auth': ('Authentication / Authorization / Security settings', None, (
     ('superuser', [],
      "List of trusted user names with wiki system administration super powers (not to be confused with ACL admin rights!). Used for e.g. software installation, language installation via SystemPagesSetup and more. See also HelpOnSuperUser."),
@@ -1032,6 +1046,7 @@ options_no_group_name = {
     ('cache_dir', None, "Directory for caching, by default computed from `data_dir`/cache."),
     ('session_dir', None, "Directory for session storage, by default computed to be `cache_dir`/__session__."),
     ('user_dir', None, "Directory for user storage, by default computed to be `data_dir`/user."),
+    ('user_store', None, "User profile store object, e.g. userstore.SQLiteUserStore() (None = one profile file per user in `user_dir`)."),
     ('plugin_dir', None, "Plugin directory, by default computed to be `data_dir`/plugin."),
     ('plugin_dirs', [], "Additional plugin directories."),
 
@@ -1115,6 +1130,9 @@ options_no_group_name = {
 
     ('default_markup', 'wiki', 'Default page parser / format (name of module in `MoinMoin.parser`)'),
 
+    ('diff_engine', 'patience',
+     "Line diff algorithm used for page diffs: 'patience' (fast, see MoinMoin.util.diff_engine) or 'difflib' (Python's difflib, slow for big pages)."),
+
     ('html_head', '', "Additional <HEAD> tags, see HelpOnThemes."),
     ('html_head_queries', '<meta name="robots" content="noindex,nofollow">\n',
      "Additional <HEAD> tags for requests with query strings, like actions."),
@@ -1128,6 +1146,9 @@ options_no_group_name = {
     ('language_default', 'en', "Default language for user interface and page content, see HelpOnLanguages."),
     ('language_ignore_browser', False, "if True, ignore user's browser language settings, see HelpOnLanguages."),
 
+    ('lock_mode', 'dir',
+     "Locking implementation: 'dir' (portable, uses lock directories and polling) or 'flock' (POSIX only, uses fcntl.flock with blocking waits, locks of crashed processes are released automatically). All processes using the same wiki data must use the same lock_mode."),
+
     ('log_remote_addr', True,
      "if True, log the remote IP address (and maybe hostname)."),
     ('log_reverse_dns_lookups', False,
@@ -1136,6 +1157,16 @@ options_no_group_name = {
      "if True, add timing infos to the log output to analyse load conditions"),
     ('log_events_format', 1,
      "0 = no events logging, 1 = standard format (like <= 1.9.7) [default], 2 = extended format"),
+    ('log_events_buffer_size', 0,
+     "if not 0, events are buffered in memory and written to the event-log by a background thread, in batches of up to this many events."),
+    ('log_events_buffer_time', 1000,
+     "if log_events_buffer_size is set, buffered events are written at most this many milliseconds after they happened."),
+    ('log_events_rotate_size', 0,
+     "if not 0, the event-log is rotated into a compressed segment when it reaches this size (bytes)."),
+    ('log_events_rotate_interval', 0,
+     "if not 0, the event-log is rotated into a compressed segment when its first entry is older than this (seconds)."),
+    ('log_events_compression', 'gz',
+     "compression of rotated event-log segments: 'gz' or 'bz2'."),
 
     # some dangerous mimetypes (we don't use "content-disposition: inline" for them when a user
     # downloads such attachments, because the browser might execute e.g. Javascript contained
@@ -1177,6 +1208,11 @@ options_no_group_name = {
 
     ('search_results_per_page', 25, "Number of hits shown per page in the search results"),
 
+    ('send_file_header', None,
+     "None = attachments are sent by moin, 'X-Sendfile' (apache mod_xsendfile, lighttpd) or 'X-Accel-Redirect' (nginx) = let the front end web server send them."),
+    ('send_file_accel_map', [],
+     "for X-Accel-Redirect: list of (filesystem path prefix, internal URL prefix) tuples, e.g. [('/srv/wiki/data/pages/', '/moin-files/')]. Files not matching any prefix are sent by moin."),
+
     ('siteid', 'default', None),
     ('xmlrpc_overwrite_user', True, "Overwrite authenticated user at start of xmlrpc code"),
   )),
@@ -0,0 +1,138 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - Revision diff cache
+
+    Page revisions never change once they are written, so the diff of two
+    revisions of a page stays valid forever. The diff action, change
+    notifications and RSS feeds get their diffs from here, they are kept in
+    the page's cache directory (item scope) under keys made from the
+    revision numbers, the diff format (and for HTML, the user interface
+    language) and the ignorews option.
+
+    If a page has more than cfg.diff_cache_max_entries cached diffs or if
+    they are bigger than cfg.diff_cache_max_size bytes in total, the oldest
+    ones are removed when adding a new one.
+
+    When a page is saved, the diffs of the new revision against the previous
+    one (that's what notifications and RecentChanges show) are made right
+    away.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.Page import Page
+from MoinMoin.util import diff_html, diff_text
+
+KEY_PREFIX = 'diff_'
+
+
+def cache_key(old_rev, new_rev, format, ignorews=0):
+    """ Return the cache key of a diff """
+    return '%s%s_%08d_%08d_%d' % (KEY_PREFIX, format, old_rev, new_rev, ignorews and 1 or 0)
+
+
+def make_diff(request, pagename, old_rev, new_rev, format, ignorews=0):
+    """ Compute the diff of two revisions of a page
+
+    @param format: 'text' (list of lines, see diff_text.diff) or 'html'
+                   (table rows, see diff_html.diff_rows)
+    """
+    old = Page(request, pagename, rev=old_rev)
+    new = Page(request, pagename, rev=new_rev)
+    if format == 'text':
+        return diff_text.diff(old.getlines(), new.getlines(), ignorews=ignorews,
+                              engine=request.cfg.diff_engine)
+    elif format == 'html':
+        return diff_html.diff_rows(request, old.get_raw_body(), new.get_raw_body())
+    raise ValueError("unknown diff format %r" % format)
+
+
+def get_diff(request, pagename, old_rev, new_rev, format, ignorews=0):
+    """ Return the diff of two revisions of a page (see make_diff), from the
+        cache if possible.
+
+    @param pagename: name of the page
+    @param old_rev: old revision number
+    @param new_rev: new revision number
+    @param format: 'text' or 'html'
+    @param ignorews: ignore whitespace (only used for 'text')
+    """
+    cfg = request.cfg
+    page = Page(request, pagename)
+    if not (cfg.diff_cache_max_entries and old_rev > 0 and
+            new_rev > 0 and max(old_rev, new_rev) <= page.current_rev()):
+        # a revision that does not exist yet might still get written
+        return make_diff(request, pagename, old_rev, new_rev, format, ignorews)
+    if format == 'html':
+        key = cache_key(old_rev, new_rev, 'html-%s' % request.lang)
+    else:
+        key = cache_key(old_rev, new_rev, format, ignorews)
+    cache = caching.CacheEntry(request, page, key, scope='item', use_pickle=True)
+    if cache.exists():
+        try:
+            return cache.content()
+        except caching.CacheError:
+            pass
+    diff = make_diff(request, pagename, old_rev, new_rev, format, ignorews)
+    try:
+        cache.update(diff)
+    except caching.CacheError, err:
+        logging.warning("could not cache diff %r of page %r (%s)" % (key, pagename, str(err)))
+    else:
+        evict(request, page, key)
+    return diff
+
+
+def _cached_diffs(request, page):
+    """ Return list of (mtime, size, key) of the cached diffs of a page """
+    arena_dir = caching.get_arena_dir(request, page, 'item')
+    diffs = []
+    for key in caching.get_cache_list(request, page, 'item'):
+        if key.startswith(KEY_PREFIX):
+            try:
+                st = os.stat(os.path.join(arena_dir, key))
+            except OSError:
+                continue
+            diffs.append((st.st_mtime, st.st_size, key))
+    return diffs
+
+
+def evict(request, page, keep=None):
+    """ Remove the oldest cached diffs of a page, keeping at most
+        cfg.diff_cache_max_entries diffs of cfg.diff_cache_max_size bytes
+
+    @param keep: key of a diff not to remove (e.g. the one just added)
+    """
+    cfg = request.cfg
+    diffs = _cached_diffs(request, page)
+    diffs.sort(key=lambda (mtime, size, key): (key == keep, mtime), reverse=True)
+    count = total = 0
+    for mtime, size, key in diffs:
+        count += 1
+        total += size
+        if count > cfg.diff_cache_max_entries or total > cfg.diff_cache_max_size:
+            caching.CacheEntry(request, page, key, scope='item').remove()
+
+
+def remove_diffs(request, page):
+    """ Remove all cached diffs of a page (e.g. after overwriting a revision) """
+    for mtime, size, key in _cached_diffs(request, page):
+        caching.CacheEntry(request, page, key, scope='item').remove()
+
+
+def revision_saved(request, pagename, rev):
+    """ Make the diffs of a new revision against the previous one """
+    if not request.cfg.diff_cache_max_entries:
+        return
+    revisions = Page(request, pagename).getRevList()
+    if len(revisions) < 2 or revisions[0] != rev:
+        return
+    for format in ('text', 'html', ):
+        get_diff(request, pagename, revisions[1], rev, format)
@@ -31,6 +31,7 @@ class Formatter:
             self.formatter = Formatter(request, store_pagelinks=1)
         self.static = static
         self.code_fragments = []
+        self.link_targets = set() # names of the pages we emitted pagelink code for
         self.__formatter = "formatter"
         self.__parser = "parser"
         self.request = request
@@ -134,6 +135,7 @@ if moincode_timestamp > %d or cfg_mtime is None or cfg_mtime > %d:
 
     def pagelink(self, on, pagename='', page=None, **kw):
         if on:
+            self.link_targets.add(pagename)
             return self.__insert_code('page=Page(request, %r, formatter=%s);'
                                       'request.write(%s.pagelink(%r, page=page, **%r))' %
                                       (pagename, self.__formatter,
@@ -2,9 +2,10 @@
 """
     MoinMoin - internationalization (aka i18n)
 
-    We use Python's gettext module for loading <language>.<domain>.mo files.
-    Domain is "MoinMoin" for MoinMoin distribution code and something else for
-    extension translations.
+    The <language>.<domain>.po files are compiled into catalog files (see
+    MoinMoin.i18n.catalog) in the wiki's cache directory, which get memory
+    mapped when a language is used. Domain is "MoinMoin" for MoinMoin
+    distribution code and something else for extension translations.
 
     Public attributes:
         languages -- dict of languages that MoinMoin knows metadata about
@@ -25,14 +26,14 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, gettext, glob
+import os, glob
 from StringIO import StringIO
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin import caching
-from MoinMoin.i18n import strings
+from MoinMoin.i18n import catalog, strings
 
 # This is a global for a reason: in persistent environments all languages in
 # use will be cached; Note: you have to restart if you update language data.
@@ -56,11 +57,45 @@ def po_filename(request, language, domain, i18n_dir='i18n'):
     """
     return os.path.join(request.cfg.moinmoin_dir, i18n_dir, "%s.%s.po" % (language, domain))
 
+def load_catalog(request, language, domain='MoinMoin', i18n_dir='i18n'):
+    """ Return the compiled catalog of a .po file (see po_filename), compile
+        it first if the .po file is newer than the catalog.
+
+    @rtype: MoinMoin.i18n.catalog.Catalog (or a dict, if the catalog can't be
+            written or read)
+    """
+    # see comment about per-wiki scope in i18n_init. The catalogs always are
+    # files (scope 'dir', no cache backend), because they get memory mapped.
+    arena_dir = caching.get_arena_dir(request, 'i18n', 'wiki')
+    key = '%s.%s.catalog' % (language, domain)
+    cache = caching.CacheEntry(request, arena_dir, key, scope='dir')
+    langfilename = po_filename(request, language, domain, i18n_dir=i18n_dir)
+    messages = None
+    if cache.needsUpdate(langfilename):
+        logging.debug("compiling %s" % langfilename)
+        f = file(langfilename)
+        messages = catalog.read_po(f.readlines())
+        f.close()
+        try:
+            cache.update(catalog.make_catalog(messages))
+        except caching.CacheError, err:
+            logging.warning("could not write catalog %s (%s)" % (key, str(err)))
+            return messages
+    try:
+        return catalog.Catalog(os.path.join(arena_dir, key))
+    except (EnvironmentError, ValueError, catalog.CatalogError), err:
+        logging.warning("could not read catalog %s (%s)" % (key, str(err)))
+        if messages is None:
+            f = file(langfilename)
+            messages = catalog.read_po(f.readlines())
+            f.close()
+        return messages
+
 def i18n_init(request):
     """ this is called early from request initialization and makes sure we
         have metadata (like what languages are available, direction of language)
         loaded into the global "languages".
-        The very first time, this will be slow as it will load all languages,
+        The very first time, this will be slow as it will compile all languages,
         but next time it will be fast due to caching.
     """
     global languages
@@ -80,22 +115,12 @@ def i18n_init(request):
                 _system_pages[pagename] = ('en', pagename)
             for lang_file in glob.glob(po_filename(request, language='*', domain='MoinMoin')): # XXX only MoinMoin domain for now
                 language, domain, ext = os.path.basename(lang_file).split('.')
-                t = Translation(language, domain)
-                f = file(lang_file)
-                t.load_po(f)
-                f.close()
                 logging.debug("loading translation %r" % language)
-                encoding = 'utf-8'
-                _languages[language] = {}
-                for key, value in t.info.items():
-                    #logging.debug("meta key %s value %r" % (key, value))
-                    _languages[language][key] = value.decode(encoding)
+                messages = load_catalog(request, language, domain)
+                _languages[language] = catalog.parse_info(messages.get(u'', u''))
                 for pagename in strings.all_pages:
-                    try:
-                        pagename_translated = t.translation._catalog[pagename]
-                    except KeyError:
-                        pass
-                    else:
+                    pagename_translated = messages.get(pagename)
+                    if pagename_translated is not None:
                         _system_pages[pagename_translated] = (language, pagename)
             logging.debug("dumping language metadata to disk cache")
             try:
@@ -130,9 +155,6 @@ def bot_translations(request):
     for lang_file in glob.glob(po_filename(request, i18n_dir=po_dir, language='*', domain='JabberBot')):
         language, domain, ext = os.path.basename(lang_file).split('.')
         t = Translation(language, domain)
-        f = file(lang_file)
-        t.load_po(f)
-        f.close()
         t.loadLanguage(request, trans_dir=po_dir)
         translations[language] = {}
 
@@ -153,33 +175,6 @@ class Translation(object):
         self.language = language
         self.domain = domain
 
-    def load_po(self, f):
-        """ load the po file """
-        from MoinMoin.i18n.msgfmt import MsgFmt
-        mf = MsgFmt()
-        mf.read_po(f.readlines())
-        mo_data = mf.generate_mo()
-        f = StringIO(mo_data)
-        self.load_mo(f)
-        f.close()
-
-    def load_mo(self, f):
-        """ load the mo file, setup some attributes from metadata """
-        # binary files have to be opened in the binary file mode!
-        self.translation = gettext.GNUTranslations(f)
-        self.info = info = self.translation.info()
-        try:
-            self.name = info['x-language']
-            self.ename = info['x-language-in-english']
-            self.direction = info['x-direction']
-            self.maintainer = info['last-translator']
-        except KeyError, err:
-            logging.warning("metadata problem in %r: %s" % (self.language, str(err)))
-        try:
-            assert self.direction in ('ltr', 'rtl', )
-        except (AttributeError, AssertionError), err:
-            logging.warning("direction problem in %r: %s" % (self.language, str(err)))
-
     def formatMarkup(self, request, text, percent):
         """ Formats the text using the wiki parser/formatter.
 
@@ -221,35 +216,23 @@ class Translation(object):
         return text
 
     def loadLanguage(self, request, trans_dir="i18n"):
+        """ Map the compiled catalog of this translation (see load_catalog) """
         request.clock.start('loadLanguage')
-        # see comment about per-wiki scope above
-        cache = caching.CacheEntry(request, arena='i18n', key=self.language, scope='wiki', use_pickle=True)
-        langfilename = po_filename(request, self.language, self.domain, i18n_dir=trans_dir)
-        needsupdate = cache.needsUpdate(langfilename)
-        if not needsupdate:
-            try:
-                unformatted = cache.content()
-                logging.debug("pickle %s load success" % self.language)
-            except caching.CacheError:
-                logging.debug("pickle %s load failed" % self.language)
-                needsupdate = 1
-
-        if needsupdate:
-            logging.debug("langfilename %s needs update" % langfilename)
-            f = file(langfilename)
-            self.load_po(f)
-            f.close()
-            trans = self.translation
-            unformatted = trans._catalog
-            self.has_wikimarkup = self.info.get('x-haswikimarkup', 'False') == 'True'
-            logging.debug("dumping lang %s" % self.language)
-            try:
-                cache.update(unformatted)
-            except caching.CacheError:
-                pass
-
+        self.raw = load_catalog(request, self.language, self.domain, i18n_dir=trans_dir)
+        self.info = info = catalog.parse_info(self.raw.get(u'', u''))
+        try:
+            self.name = info['x-language']
+            self.ename = info['x-language-in-english']
+            self.direction = info['x-direction']
+            self.maintainer = info['last-translator']
+        except KeyError, err:
+            logging.warning("metadata problem in %r: %s" % (self.language, str(err)))
+        try:
+            assert self.direction in ('ltr', 'rtl', )
+        except (AttributeError, AssertionError), err:
+            logging.warning("direction problem in %r: %s" % (self.language, str(err)))
+        self.has_wikimarkup = info.get('x-haswikimarkup', 'False') == 'True'
         self.formatted = {}
-        self.raw = unformatted
         request.clock.stop('loadLanguage')
 
 
@@ -0,0 +1,102 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.i18n.catalog Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, shutil, tempfile
+
+import py
+
+from MoinMoin import i18n
+from MoinMoin.i18n import catalog
+
+PO = '''\
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=iso-8859-1\\n"
+"X-Language: Deutsch\\n"
+"X-Direction: ltr\\n"
+
+msgid "Edit"
+msgstr "Bearbeiten"
+
+#, fuzzy
+msgid "Save"
+msgstr "Speichern"
+
+msgid "Delete"
+msgstr ""
+
+msgid "Size"
+msgstr "Gr\xf6\xdfe"
+'''
+
+
+class TestCatalog:
+    """ i18n.catalog: compiled translation catalogs """
+
+    def setup_method(self, method):
+        self.dir = tempfile.mkdtemp()
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.dir)
+
+    def make(self, messages):
+        filename = os.path.join(self.dir, 'catalog')
+        f = open(filename, 'wb')
+        f.write(catalog.make_catalog(messages))
+        f.close()
+        return catalog.Catalog(filename)
+
+    def testReadPo(self):
+        """ i18n.catalog: .po files are decoded, fuzzy and empty translations are left out """
+        messages = catalog.read_po(PO.splitlines(True))
+        assert sorted(messages.keys()) == [u'', u'Edit', u'Size']
+        assert messages[u'Size'] == u'Gr\xf6\xdfe'
+        c = self.make(messages)
+        assert c.info() == {'content-type': u'text/plain; charset=iso-8859-1',
+                            'x-language': u'Deutsch', 'x-direction': u'ltr'}
+
+    def testLookup(self):
+        """ i18n.catalog: texts are found in the hash table """
+        messages = dict([(u'text %d' % i, u'Text %d \u20ac' % i) for i in range(100)])
+        c = self.make(messages)
+        assert len(c) == 100
+        for original, translated in messages.items():
+            assert original in c
+            assert c[original] == translated
+            assert c.get(original.encode('utf-8')) == translated
+        assert u'text 100' not in c
+        assert c.get(u'text 100', u'x') == u'x'
+        py.test.raises(KeyError, c.__getitem__, u'text 100')
+        assert dict(c.items()) == messages
+        assert len(self.make({})) == 0
+
+    def testBroken(self):
+        """ i18n.catalog: other files are no catalogs """
+        filename = os.path.join(self.dir, 'broken')
+        open(filename, 'wb').write('not a catalog')
+        py.test.raises(catalog.CatalogError, catalog.Catalog, filename)
+
+
+class TestLoadCatalog:
+    """ i18n: languages are loaded from compiled catalogs """
+
+    def testLoadLanguage(self):
+        """ i18n: a translation uses the catalog compiled from its .po file """
+        request = self.request
+        t = i18n.Translation('de')
+        t.loadLanguage(request)
+        assert isinstance(t.raw, catalog.Catalog)
+        assert t.raw[u'Edit'] == u'Editieren'
+        assert t.info['x-language-in-english'] == u'German'
+        assert (t.name, t.ename, t.direction) == (u'Deutsch', u'German', u'ltr')
+        arena_dir = os.path.join(request.cfg.cache_dir, request.cfg.siteid, 'i18n')
+        assert os.path.exists(os.path.join(arena_dir, 'de.MoinMoin.catalog'))
+        assert i18n.languages['de']['x-direction'] == u'ltr'
+        assert i18n.system_pages[u'StartSeite'] == ('de', u'FrontPage')
+
+coverage_modules = ['MoinMoin.i18n.catalog']
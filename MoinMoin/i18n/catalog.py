@@ -0,0 +1,193 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - compiled translation catalogs
+
+    Parsing the .po files is slow, so they are compiled into catalog files
+    once and these are memory mapped when a translation is needed. Looking up
+    a text then only needs some hashing and reading the strings it finds, the
+    catalog is never loaded completely (and its pages are shared between all
+    processes mapping the same file).
+
+    A catalog file has this (little-endian) format:
+
+        header: magic (8 bytes), number of entries, size of hash table
+        hash table: entries of 5 32-bit unsigned integers: hash of the
+                    original text, offset and length of the original text,
+                    offset and length of the translated text
+                    (empty entries have an original text offset of 0)
+        strings: all texts, utf-8 encoded
+
+    The hash table uses open addressing with linear probing, its size is a
+    power of 2 and at least twice the number of entries.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import mmap, struct, zlib
+
+MAGIC = 'MoinCat1'
+HEADER = '<8sII'
+HEADER_SIZE = struct.calcsize(HEADER)
+ENTRY = '<IIIII'
+ENTRY_SIZE = struct.calcsize(ENTRY)
+
+
+class CatalogError(Exception):
+    """ raised if a catalog file is broken """
+    pass
+
+
+def _hash(text):
+    return zlib.crc32(text) & 0xffffffff
+
+
+def po_charset(header):
+    """ Return the charset from the header (msgstr of the empty msgid) of a
+        .po file, default is utf-8
+    """
+    for line in header.split('\n'):
+        if line.lower().startswith('content-type:') and 'charset=' in line:
+            return line.split('charset=')[1].strip()
+    return 'utf-8'
+
+
+def parse_info(header):
+    """ Return the metadata dict from a (unicode) catalog header, like
+        gettext.GNUTranslations.info() does
+    """
+    info = {}
+    lastk = None
+    for line in header.split(u'\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if u':' in line:
+            k, v = line.split(u':', 1)
+            lastk = k = k.strip().lower()
+            info[k] = v.strip()
+        elif lastk:
+            info[lastk] += u'\n' + line
+    return info
+
+
+def make_catalog(messages):
+    """ Return the catalog file data for some translations
+
+    @param messages: dict original text -> translated text (unicode), the
+                     empty original text maps to the header with the metadata
+    @rtype: str
+    """
+    items = [(original.encode('utf-8'), translated.encode('utf-8'))
+             for original, translated in messages.items()]
+    size = 8
+    while size < 2 * len(items):
+        size *= 2
+    table = [(0, 0, 0, 0, 0)] * size
+    strings = []
+    offset = HEADER_SIZE + size * ENTRY_SIZE
+    for original, translated in items:
+        h = _hash(original)
+        slot = h & (size - 1)
+        while table[slot][1]:
+            slot = (slot + 1) & (size - 1)
+        table[slot] = (h, offset, len(original), offset + len(original), len(translated))
+        strings.append(original)
+        strings.append(translated)
+        offset += len(original) + len(translated)
+    data = [struct.pack(HEADER, MAGIC, len(items), size)]
+    data.extend([struct.pack(ENTRY, *entry) for entry in table])
+    data.extend(strings)
+    return ''.join(data)
+
+
+def read_po(lines):
+    """ Return dict original text -> translated text (unicode) for the lines
+        of a .po file (fuzzy and untranslated texts are left out)
+    """
+    from MoinMoin.i18n.msgfmt import MsgFmt
+    mf = MsgFmt()
+    mf.read_po(lines)
+    charset = po_charset(mf.messages.get('', ''))
+    messages = {}
+    for original, translated in mf.messages.items():
+        messages[original.decode(charset)] = translated.decode(charset)
+    return messages
+
+
+class Catalog(object):
+    """ A memory mapped catalog file, used like a read-only dict of original
+        texts -> translated texts (unicode)
+    """
+    def __init__(self, filename):
+        f = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        try:
+            magic, self._count, self._size = struct.unpack_from(HEADER, self._map)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or len(self._map) < HEADER_SIZE + self._size * ENTRY_SIZE:
+            self._map.close()
+            raise CatalogError("%s is no catalog file" % filename)
+        # texts looked up so far (None if not in the catalog)
+        self._lookups = {}
+
+    def _entry(self, slot):
+        return struct.unpack_from(ENTRY, self._map, HEADER_SIZE + slot * ENTRY_SIZE)
+
+    def _find(self, original):
+        if isinstance(original, unicode):
+            original = original.encode('utf-8')
+        h = _hash(original)
+        mask = self._size - 1
+        slot = h & mask
+        while True:
+            entry_hash, koffset, klength, voffset, vlength = self._entry(slot)
+            if not koffset:
+                return None
+            if (entry_hash == h and klength == len(original) and
+                self._map[koffset:koffset + klength] == original):
+                return self._map[voffset:voffset + vlength].decode('utf-8')
+            slot = (slot + 1) & mask
+
+    def get(self, original, default=None):
+        try:
+            translated = self._lookups[original]
+        except KeyError:
+            translated = self._lookups[original] = self._find(original)
+        if translated is None:
+            return default
+        return translated
+
+    def __getitem__(self, original):
+        translated = self.get(original)
+        if translated is None:
+            raise KeyError(original)
+        return translated
+
+    def __contains__(self, original):
+        return self.get(original) is not None
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """ Return list of all (original, translated) texts """
+        items = []
+        for slot in xrange(self._size):
+            entry_hash, koffset, klength, voffset, vlength = self._entry(slot)
+            if koffset:
+                items.append((self._map[koffset:koffset + klength].decode('utf-8'),
+                              self._map[voffset:voffset + vlength].decode('utf-8')))
+        return items
+
+    def keys(self):
+        return [original for original, translated in self.items()]
+
+    def info(self):
+        """ Return the metadata (see parse_info) """
+        return parse_info(self.get(u'', u''))
+
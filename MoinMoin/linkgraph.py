@@ -0,0 +1,279 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - Link graph index
+
+    The OrphanedPages and WantedPages macros, the links and LocalSiteMap
+    actions and linkto: searches all need to know which pages link to which.
+    Instead of getting the links of every page of the wiki again for each of
+    them, LinkGraph keeps the links of all existing pages (forward) and the
+    pages linking to each page name (reverse).
+
+    The forward links are stored (pickled) in the 'pagelists' wiki cache
+    arena, together with the edit-log position they are valid for, the
+    reverse links are computed when loading. PageEditor tells the link graph
+    about saved, renamed and deleted pages, changes made by other processes
+    are found in the edit-log. Changed pages are only marked and their links
+    are fetched (see Page.getPageLinks) when the graph is queried next time.
+
+    The graph is only written to disk when it is built from scratch, i.e. by
+    "moin maint makecache" or by the first query needing the links of all
+    pages (OrphanedPages, WantedPages, the links action). Changes made
+    later are replayed from the edit-log (and the pagelinks caches of the
+    changed pages) by every process loading the graph, so running makecache
+    now and then keeps that short. Queries about some pages only (links_from,
+    linking_to) do not build the graph, they fetch the links of the pages
+    they look at until the graph exists.
+
+    Note: like with the PageListIndex, changes done to the page directories
+    without going through the edit-log are not noticed, use
+    "moin maint cleancache" after doing such things.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import time
+import threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.Page import Page, get_pagelist_index
+
+
+class LinkGraph:
+    """ Forward and reverse links of all existing pages """
+    VERSION = 1
+    CHECK_INTERVAL = 10.0 # seconds, see ItemCache
+
+    def __init__(self):
+        self.links = {} # pagename -> tuple of linked page names
+        self.backlinks = {} # pagename -> set of names of pages linking to it
+        self.dirty = set() # pages whose links need to be fetched again
+        self.log_pos = None # edit-log position we have seen
+        self.log_generation = None # edit-log generation seen at log_pos
+        self.log_checked = 0 # time of last edit-log check
+        self.load_failed = None # time we last found no graph on disk
+        self._lock = threading.Lock()
+
+    def _cache(self, request):
+        return caching.CacheEntry(request, 'pagelists', 'linkgraph', scope='wiki', use_pickle=True)
+
+    def _page_links(self, request, pagename):
+        """ Get the links of a page (see Page.getPageLinks) """
+        # we are not getting the links of any page right now (see refresh), but
+        # maybe we did so for an older revision of this page in this request:
+        request.parsePageLinks_running.pop(pagename, None)
+        return tuple(Page(request, pagename).getPageLinks(request))
+
+    def _set_links(self, links):
+        backlinks = {}
+        for pagename, targets in links.iteritems():
+            for target in targets:
+                sources = backlinks.get(target)
+                if sources is None:
+                    sources = backlinks[target] = set()
+                sources.add(pagename)
+        self.links = links
+        self.backlinks = backlinks
+
+    def load(self, request, build=True):
+        """ Load the graph from disk, rebuild it if that is not possible
+
+        @param build: rebuild the graph if it can't be loaded (else leave it
+                      unloaded)
+        @return: True if the graph is loaded now
+        """
+        from MoinMoin.logfile import editlog
+        if not build and self.load_failed is not None and time.time() - self.load_failed < self.CHECK_INTERVAL:
+            return False
+        elog = editlog.EditLog(request)
+        try:
+            data = self._cache(request).content()
+            if data['version'] != self.VERSION or data['log_pos'] > elog.size():
+                raise ValueError('link graph is outdated')
+            self._set_links(data['links'])
+            self.log_pos = data['log_pos']
+        except (caching.CacheError, KeyError, TypeError, ValueError), err:
+            if not build:
+                logging.debug("link graph: not available (%s)" % str(err))
+                self.load_failed = time.time()
+                return False
+            logging.debug("link graph: rebuilding (%s)" % str(err))
+            self.rebuild(request)
+        self.load_failed = None
+        return True
+
+    def save(self, request):
+        """ Write the graph to disk """
+        data = {
+            'version': self.VERSION,
+            'log_pos': self.log_pos,
+            'links': self.links,
+        }
+        try:
+            self._cache(request).update(data)
+        except caching.CacheError, err:
+            logging.warning("link graph: could not save (%s)" % str(err))
+
+    def rebuild(self, request):
+        """ Build the graph from scratch by getting the links of all pages """
+        from MoinMoin.logfile import editlog
+        # remember the log position *before* we look at the pages, so
+        # concurrent changes will get replayed (again) later:
+        log_pos = editlog.EditLog(request).size()
+        links = {}
+        for pagename, status in get_pagelist_index(request).pages.items():
+            if status[1]:
+                links[pagename] = self._page_links(request, pagename)
+        self._set_links(links)
+        self.dirty = set()
+        self.log_pos = log_pos
+        self.save(request)
+
+    def changed(self, pagenames):
+        """ Mark pages as changed (saved, renamed, deleted)
+
+        @param pagenames: names of the changed pages
+        """
+        self._lock.acquire()
+        try:
+            self.dirty.update([pagename for pagename in pagenames if pagename])
+        finally:
+            self._lock.release()
+
+    def refresh(self, request, build=True):
+        """ Bring the graph up-to-date: mark the pages changed by other
+            processes and fetch the links of all changed pages.
+
+        @param build: build the graph if it does not exist yet
+        @return: True if the graph is available
+        """
+        from MoinMoin.logfile import editlog
+        if request.mode_getpagelinks:
+            # we are getting the links of some page and it renders something
+            # querying the graph, just use what we have (nobody will see it)
+            return True
+        self._lock.acquire()
+        try:
+            if self.log_pos is None and not self.load(request, build):
+                return False
+            generation = editlog.generation(request).get()
+            now = time.time()
+            if (generation is None or generation != self.log_generation or
+                now - self.log_checked >= self.CHECK_INTERVAL):
+                new_pos, items = editlog.EditLog(request).news(self.log_pos)
+                self.dirty.update([item for item in items if item])
+                self.log_pos = new_pos
+                self.log_generation = generation
+                self.log_checked = now
+            if self.dirty:
+                self._update(request)
+            return True
+        finally:
+            self._lock.release()
+
+    def _update(self, request):
+        """ Fetch the links of the changed pages and patch the graph
+
+            We do not modify the dicts in place, because other threads might
+            iterate over them at the same time.
+        """
+        dirty, self.dirty = self.dirty, set()
+        pages = get_pagelist_index(request).pages
+        links = self.links.copy()
+        backlinks = self.backlinks.copy()
+        for pagename in dirty:
+            old_targets = links.pop(pagename, ())
+            status = pages.get(pagename)
+            if status is not None and status[1]:
+                new_targets = links[pagename] = self._page_links(request, pagename)
+            else:
+                new_targets = ()
+            for target in set(old_targets) - set(new_targets):
+                sources = backlinks[target] - set([pagename])
+                if sources:
+                    backlinks[target] = sources
+                else:
+                    del backlinks[target]
+            for target in set(new_targets) - set(old_targets):
+                backlinks[target] = backlinks.get(target, set()) | set([pagename])
+        self.links = links
+        self.backlinks = backlinks
+
+    def links_from(self, request, pagename):
+        """ Return the names of the pages a page links to (tuple), fetch
+            them if the graph does not exist yet
+        """
+        if not self.refresh(request, build=False):
+            return self._page_links(request, pagename)
+        return self.links.get(pagename, ())
+
+    def linking_to(self, request, match):
+        """ Return the names of the existing pages linking to some page
+
+        @param match: function pagename -> bool, selecting the linked pages
+        @return: set of page names or None if the graph does not exist yet
+        """
+        if not self.refresh(request, build=False):
+            return None
+        sources = set()
+        for target, linking in self.backlinks.items():
+            if match(target):
+                sources.update(linking)
+        return sources
+
+    def orphaned(self, request, pagenames):
+        """ Return the pages not linked from any of the given pages
+
+        @param pagenames: the pages to look at (e.g. all pages readable by
+                          the current user), a dict or set
+        @return: list of orphaned page names (unsorted)
+        """
+        self.refresh(request)
+        backlinks = self.backlinks
+        return [pagename for pagename in pagenames
+                if not [source for source in backlinks.get(pagename, ()) if source in pagenames]]
+
+    def wanted(self, request, pagenames, linking=None):
+        """ Return the pages linked from the given pages, but not among them
+
+        @param pagenames: the pages to look at (e.g. all pages readable by
+                          the current user), a dict or set
+        @param linking: only count links from these pages (a dict or set,
+                        default: pagenames)
+        @return: dict {wanted page name: list of pages linking to it}
+        """
+        if linking is None:
+            linking = pagenames
+        self.refresh(request)
+        wanted = {}
+        for target, sources in self.backlinks.items():
+            if target in pagenames:
+                continue
+            sources = [source for source in sources if source in linking]
+            if sources:
+                wanted[target] = sources
+        return wanted
+
+
+def get_linkgraph(request):
+    """ Return the LinkGraph of this wiki (kept in request.cfg.cache) """
+    cache = request.cfg.cache
+    try:
+        return cache.linkgraph
+    except AttributeError:
+        cache.linkgraph = LinkGraph()
+        return cache.linkgraph
+
+
+def pages_changed(request, pagenames):
+    """ Tell the link graph of this process (if it is loaded) about changed
+        pages, called by PageEditor. Other processes find them in the edit-log.
+
+        @param pagenames: names of the saved, renamed or deleted pages
+    """
+    graph = getattr(request.cfg.cache, 'linkgraph', None)
+    if graph is not None:
+        graph.changed(pagenames)
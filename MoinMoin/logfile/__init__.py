@@ -11,8 +11,10 @@
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
-import os, codecs, errno
+import os, time, codecs, errno
 from MoinMoin import config, wikiutil
+from MoinMoin.logfile.index import LogIndex
+from MoinMoin.logfile.segments import SegmentManifest
 
 class LogError(Exception):
     """ Base class for log errors """
@@ -84,8 +86,20 @@ class LogFile:
     """
     .filter: function that gets the values from .parser.
              must return True to keep it or False to remove it
+    .line_filter: function that gets the raw line (unicode), called before
+             .parser, must return True to keep it or False to remove it
     Overwrite .parser() and .add() to customize this class to special log files
+    Set .indexed and overwrite .index_data() to maintain a sidecar index (see
+    MoinMoin.logfile.index), so .since() and .entries_for() can seek directly.
+    Indexed logs can also be rotated into compressed segments (see
+    MoinMoin.logfile.segments), .reverse(), .entries() and .lines() include
+    the segments.
     """
+    indexed = False
+    # cfg.lock_mode of the lock writers take while writing to a log that gets
+    # rotated (see .rotate), None if the log is not rotated. Where flock is
+    # available, writers just flock the log file itself (whatever the mode).
+    rotation_lock_mode = None
 
     def __init__(self, filename, buffer_size=4096):
         """
@@ -94,29 +108,51 @@ class LogFile:
         """
         self.loglevel = logging.NOTSET
         self.__filename = filename
+        self.index = LogIndex(filename)
+        self.segments = SegmentManifest(filename)
         self.__buffer = None # currently used buffer, points to one of the following:
         self.__buffer1 = None
         self.__buffer2 = None
         self.buffer_size = buffer_size
         self.__lineno = 0
         self.filter = None
+        self.line_filter = None
+        self.written_size = None # size of the log file after our last write
 
     def __iter__(self):
         return self
 
-    def reverse(self):
+    def reverse(self, skip=0):
         """ yield log entries in reverse direction starting from last one
 
+        @param skip: number of (newest) lines to pass over without parsing
+                     them (the filters do not see them either)
         @rtype: iterator
         """
         self.to_end()
+        while skip and not self.peek(-1):
+            skip -= 1
         while 1:
             try:
                 logging.log(self.loglevel, "LogFile.reverse %s" % self.__filename)
                 result = self.previous()
             except StopIteration:
-                return
+                break
             yield result
+        segments = self.segments.segments()
+        segments.reverse()
+        for segment in segments:
+            try:
+                for line in segment.reverse_lines():
+                    if skip:
+                        skip -= 1
+                        continue
+                    result = self._parse(unicode(line, config.charset))
+                    if result is None or (self.filter and not self.filter(result)):
+                        continue
+                    yield result
+            except IOError, err:
+                logging.warning("logfile: can't read segment %r (%s)" % (segment.path, str(err)))
 
     def sanityCheck(self):
         """ Check for log file write access.
@@ -186,13 +222,16 @@ class LogFile:
 
         Expensive for big log files - O(n)
 
+        Archived segments are included (their line counts are in the
+        segment manifest).
+
         @return: size of log file in lines
         @rtype: Int
         """
+        count = sum([segment.lines for segment in self.segments.segments()])
         try:
             f = file(self.__filename, 'r')
             try:
-                count = 0
                 for line in f:
                     count += 1
                 return count
@@ -200,7 +239,7 @@ class LogFile:
                 f.close()
         except (OSError, IOError), err:
             if err.errno == errno.ENOENT:
-                return 0
+                return count
             raise
 
     def date(self):
@@ -287,7 +326,7 @@ class LogFile:
         """get next line already parsed"""
         if self.peek(0):
             raise StopIteration
-        result = self.parser(self.__buffer.lines[self.__rel_index])
+        result = self._parse(self.__buffer.lines[self.__rel_index])
         self.peek(1)
         return result
 
@@ -309,7 +348,7 @@ class LogFile:
         """get previous line already parsed"""
         if self.peek(-1):
             raise StopIteration
-        return self.parser(self.__buffer.lines[self.__rel_index])
+        return self._parse(self.__buffer.lines[self.__rel_index])
 
     def previous(self):
         """get previous line that passes through the filter
@@ -439,6 +478,268 @@ class LogFile:
         """
         return line.split("\t")
 
+    def _parse(self, line):
+        """ parse a line, unless it is rejected by .line_filter (return None then) """
+        if self.line_filter and not self.line_filter(line):
+            return None
+        return self.parser(line)
+
+    def index_data(self, line):
+        """
+        @param line: line as read from file or as given to _add (unicode)
+        @return: (timestamp usecs, key) for the index or None on error
+        This method must be overwritten by sub classes that set .indexed.
+        """
+        return None
+
+    def _ready_index(self):
+        """ Return the index, (re)build it from the log if it does not exist yet
+            or does not fit the log any more.
+        """
+        if not self.index.exists() or self.index.stale(self.size()):
+            self.index.build(self.__filename, self.index_data)
+        return self.index
+
+    def _read_entries(self, f, begin, end, key=None, time_usecs=0):
+        """ yield the parsed and filtered log entries in byte range begin..end
+            (end may be None for end of file)
+        """
+        f.seek(begin)
+        pos = begin
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            line = unicode(line.rstrip('\n'), config.charset)
+            data = self.index_data(line)
+            if data is None or data[0] < time_usecs or (key is not None and data[1] != key):
+                continue
+            result = self._parse(line)
+            if result is None or (self.filter and not self.filter(result)):
+                continue
+            yield result
+
+    def since(self, time_usecs):
+        """ yield log entries (forward) with a timestamp >= time_usecs,
+            using the index to seek to the first relevant entry (segments
+            older than time_usecs are not read at all).
+
+        @rtype: iterator
+        """
+        return self.entries(time_usecs)
+
+    def entries_for(self, key, time_usecs=0):
+        """ yield log entries (forward) of some key (e.g. a page name) with a
+            timestamp >= time_usecs, using the index to find the entries.
+            Only the log file is searched, not the rotated segments.
+
+        @rtype: iterator
+        """
+        index = self._ready_index()
+        start = time_usecs and index.offset(time_usecs) or 0
+        found, gaps = index.lookup(key, self.size(), start)
+        ranges = [(offset, offset + length) for offset, length in found] + gaps
+        ranges.sort()
+        try:
+            f = file(self.__filename, 'rb')
+        except IOError:
+            return
+        try:
+            for begin, end in ranges:
+                for result in self._read_entries(f, begin, end, key, time_usecs):
+                    yield result
+        finally:
+            f.close()
+
+    def _range_entries(self, f, start_usecs=None, end_usecs=None):
+        """ yield the parsed and filtered entries of open log file f with a
+            timestamp in [start_usecs, end_usecs)
+        """
+        check_time = start_usecs is not None or end_usecs is not None
+        for line in f:
+            line = unicode(line.rstrip('\n'), config.charset)
+            if check_time:
+                data = self.index_data(line)
+                if (data is None or
+                    start_usecs is not None and data[0] < start_usecs or
+                    end_usecs is not None and data[0] >= end_usecs):
+                    continue
+            result = self._parse(line)
+            if result is None or (self.filter and not self.filter(result)):
+                continue
+            yield result
+
+    def entries(self, start_usecs=None, end_usecs=None):
+        """ yield log entries (forward), first those of the archived segments,
+            then those of the log file. Optionally only entries with a
+            timestamp in [start_usecs, end_usecs) are returned, segments not
+            overlapping that time range are not read at all.
+
+        @rtype: iterator
+        """
+        for segment in self.segments.segments(start_usecs, end_usecs):
+            try:
+                f = segment.open()
+            except IOError, err:
+                logging.warning("logfile: can't read segment %r (%s)" % (segment.path, str(err)))
+                continue
+            try:
+                for result in self._range_entries(f, start_usecs, end_usecs):
+                    yield result
+            finally:
+                f.close()
+        try:
+            f = file(self.__filename, 'rb')
+        except IOError:
+            return
+        try:
+            if start_usecs is not None and self.indexed:
+                f.seek(self._ready_index().offset(start_usecs))
+            for result in self._range_entries(f, start_usecs, end_usecs):
+                yield result
+        finally:
+            f.close()
+
+    def first_usecs(self):
+        """ Return the timestamp of the first entry of the log file (not of
+            the segments) or None if it has no entries.
+        """
+        try:
+            f = file(self.__filename, 'rb')
+        except IOError:
+            return None
+        try:
+            for line in f:
+                data = self.index_data(unicode(line.rstrip('\n'), config.charset))
+                if data is not None:
+                    return data[0]
+        finally:
+            f.close()
+        return None
+
+    def needs_rotation(self, max_size=0, max_age=0):
+        """ Is the log file at least max_size bytes big or is its first entry
+            at least max_age seconds old? (0 = no limit)
+        """
+        if max_size and self.size() >= max_size:
+            return True
+        if max_age:
+            first_usecs = self.first_usecs()
+            if first_usecs is not None:
+                return wikiutil.version2timestamp(first_usecs) + max_age <= time.time()
+        return False
+
+    def rotate(self, compression='gz', lock_mode='dir', max_size=0, max_age=0):
+        """ Move the entries of the log file into a new compressed segment,
+            the log file starts from scratch. Needs .index_data().
+
+        Writers (with .rotation_lock_mode set) are only blocked while the
+        log file gets renamed, then new entries go to a new log file while
+        the renamed one gets compressed.
+
+        @param compression: 'gz' or 'bz2'
+        @param lock_mode: cfg.lock_mode, for the lock serializing rotations
+        @param max_size, max_age: if one is given, only rotate if
+                                  .needs_rotation(max_size, max_age) (checked
+                                  again after locking, as another process
+                                  might have rotated the log meanwhile)
+        @return: the new Segment or None
+        """
+        from MoinMoin.util import filesys, lock
+        WriteLock = lock.getLockClasses(lock_mode)[1]
+        write_lock = WriteLock(self.__filename + '.lock', 60.0)
+        if not write_lock.acquire(10.0):
+            logging.warning("logfile: can't lock %r for rotation" % self.__filename)
+            return None
+        try:
+            if (max_size or max_age) and not self.needs_rotation(max_size, max_age):
+                return None
+            rotating = self.__filename + '.rotating'
+            if os.path.exists(rotating):
+                # left behind by an interrupted rotation
+                self.segments.archive(rotating, self.index_data, compression)
+            # wait for the writers that have the log file open, so no entry
+            # gets written to it after it was archived
+            if lock.fcntl is not None:
+                try:
+                    fd = os.open(self.__filename, os.O_RDONLY)
+                except OSError, err:
+                    if err.errno == errno.ENOENT:
+                        return None
+                    raise
+                try:
+                    # writers only hold their shared lock while writing
+                    lock.fcntl.flock(fd, lock.fcntl.LOCK_EX)
+                    filesys.rename(self.__filename, rotating)
+                finally:
+                    os.close(fd) # also releases the flock
+            else:
+                writers_lock = WriteLock(self.__filename + '.writers', 60.0)
+                if not writers_lock.acquire(10.0):
+                    logging.warning("logfile: can't lock the writers of %r for rotation" % self.__filename)
+                    return None
+                try:
+                    filesys.rename(self.__filename, rotating)
+                except OSError, err:
+                    writers_lock.release()
+                    if err.errno == errno.ENOENT:
+                        return None
+                    raise
+                writers_lock.release()
+            self.index.remove()
+            return self.segments.archive(rotating, self.index_data, compression)
+        finally:
+            write_lock.release()
+
+    def _open_output(self):
+        """ Open the log file for appending and lock it against rotation
+
+        If the log gets rotated (see .rotation_lock_mode), the writer holds
+        a shared lock while it has the log file open. Where flock is
+        available, that is a flock on the log file itself (no lock directory
+        needs to be created and removed for every write). If the log file
+        was renamed by a rotation before we got the lock, we open the new
+        one.
+
+        @return: (fd, lock), call ._close_output(fd, lock) when done
+        """
+        from MoinMoin.util import lock
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        mode = 0666 & config.umask
+        if self.rotation_lock_mode is None:
+            return os.open(self.__filename, flags, mode), None
+        if lock.fcntl is not None:
+            while True:
+                fd = os.open(self.__filename, flags, mode)
+                lock.fcntl.flock(fd, lock.fcntl.LOCK_SH)
+                try:
+                    if os.fstat(fd).st_ino == os.stat(self.__filename).st_ino:
+                        return fd, None
+                except OSError, err:
+                    if err.errno != errno.ENOENT:
+                        os.close(fd)
+                        raise
+                os.close(fd) # renamed by a rotation meanwhile
+        ReadLock = lock.getLockClasses(self.rotation_lock_mode)[0]
+        read_lock = ReadLock(self.__filename + '.writers', 60.0)
+        if not read_lock.acquire(10.0):
+            logging.warning("logfile: can't lock %r for writing" % self.__filename)
+            read_lock = None
+        try:
+            return os.open(self.__filename, flags, mode), read_lock
+        except:
+            if read_lock is not None:
+                read_lock.release()
+            raise
+
+    def _close_output(self, fd, writers_lock):
+        """ Close a log file opened by ._open_output (and release its lock) """
+        try:
+            os.close(fd) # also releases the flock
+        finally:
+            if writers_lock is not None:
+                writers_lock.release()
+
     def add(self, *data):
         """
         add line to log file
@@ -448,6 +749,40 @@ class LogFile:
         line = "\t".join(data)
         self._add(line)
 
+    def _add_many(self, lines):
+        """
+        @param lines: flat lines (unicode)
+        write several entries with one write() call, so the lines of
+        concurrent writers do not get mixed up (the file is opened in
+        O_APPEND mode, so each write goes to the current end of the file)
+        """
+        lines = [line.endswith('\n') and line or line + '\n' for line in lines]
+        data = [line.encode(config.charset) for line in lines]
+        buf = ''.join(data)
+        fd, writers_lock = self._open_output()
+        try:
+            written = 0
+            while written < len(buf):
+                written += os.write(fd, buf[written:])
+            end = os.lseek(fd, 0, 1)
+            self.written_size = end
+            if self.indexed and self.index.exists():
+                if end == len(buf):
+                    # the log file was removed and started from scratch,
+                    # so the old index is useless
+                    self.index.remove()
+                else:
+                    records = []
+                    offset = end - len(buf)
+                    for line, encoded in zip(lines, data):
+                        index_data = self.index_data(line.rstrip('\n'))
+                        if index_data is not None:
+                            records.append((index_data[0], offset, len(encoded), index_data[1]))
+                        offset += len(encoded)
+                    self.index.extend(records)
+        finally:
+            self._close_output(fd, writers_lock)
+
     def _add(self, line):
         """
         @param line: flat line
@@ -455,8 +790,4 @@ class LogFile:
         write on entry in the log file
         """
         if line is not None:
-            if line[-1] != '\n':
-                line += '\n'
-            self._output.write(line)
-            self._output.close() # does this maybe help against the sporadic fedora wikis 160 \0 bytes in the edit-log?
-            del self._output # re-open the output file automagically
+            self._add_many([line])
@@ -0,0 +1,58 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.logfile.eventlog Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, time
+
+from MoinMoin.logfile import eventlog
+from MoinMoin._tests import nuke_eventlog, wikiconfig
+
+
+class TestEventSink:
+    """ eventlog: buffered event logging """
+
+    class Config(wikiconfig.Config):
+        log_events_buffer_size = 3
+        log_events_buffer_time = 500 # ms
+
+    def setup_method(self, method):
+        nuke_eventlog(self.request)
+        self.filename = self.request.rootpage.getPagePath('event-log', isfile=1)
+
+    def teardown_method(self, method):
+        eventlog.flush()
+        nuke_eventlog(self.request)
+
+    def add(self, count):
+        for i in range(count):
+            eventlog.EventLog(self.request).add(self.request, 'VIEWPAGE', {'pagename': u'Page%d' % i},
+                                                add_http_info=0, mtime_usecs=1300000000000000 + i)
+
+    def entries(self):
+        return [(event[0], event[2]['pagename']) for event in eventlog.EventLog(self.request).entries()]
+
+    def testFlush(self):
+        self.add(2)
+        assert not os.path.exists(self.filename) # buffered
+        eventlog.flush(self.filename)
+        assert self.entries() == [(1300000000000000, u'Page0'), (1300000000000001, u'Page1')]
+
+    def testBackgroundWrite(self):
+        self.add(3) # a full batch
+        for i in range(200):
+            if os.path.exists(self.filename):
+                break
+            time.sleep(0.02)
+        assert len(self.entries()) == 3
+        self.add(1) # written after log_events_buffer_time
+        for i in range(200):
+            if len(self.entries()) == 4:
+                break
+            time.sleep(0.02)
+        assert len(self.entries()) == 4
+
+coverage_modules = ['MoinMoin.logfile.eventlog']
@@ -8,9 +8,13 @@
 import os
 import tempfile
 import shutil
+import threading
+import time
 from StringIO import StringIO
 
-from MoinMoin.logfile import LogFile
+from MoinMoin.logfile import LogFile, index
+from MoinMoin.logfile.segments import reverse_lines
+from MoinMoin.logfile.editlog import EditLog
 
 
 class TestLogFile(object):
@@ -95,5 +99,237 @@ class TestLogFile(object):
         assert lf.position() == 0
         assert list(lf) == self.LOG + [newdata]
 
+
+class IndexedLogFile(LogFile):
+    """ log file using the same format as the edit-log, page name as key """
+    indexed = True
+
+    def index_data(self, line):
+        fields = line.split(u'\t')
+        return long(fields[0]), fields[3]
+
+
+class TestLogIndex(TestLogFile):
+    """ testing the log index """
+    LOG = TestLogFile.LOG + [
+           [u'1303073724000000', u'00000001', u'SAVENEW', u'bar', u'0.0.0.0', u'example.org', u'666.666.666', u'', u''],
+           [u'1303073725000000', u'00000003', u'SAVE', u'foo', u'0.0.0.0', u'example.org', u'777.777.777', u'', u''],
+          ]
+
+    def teardown_method(self, method):
+        os.remove(self.fname)
+        for ext in ('.idx', '.key'):
+            if os.path.exists(self.fname + ext):
+                os.remove(self.fname + ext)
+
+    def test_since(self):
+        lf = IndexedLogFile(self.fname)
+        assert not lf.index.exists()
+        assert list(lf.since(1303073723000000)) == self.LOG[4:]
+        assert lf.index.exists() # was built by since()
+        assert list(lf.since(0)) == self.LOG
+        assert list(lf.since(1403073723000000)) == []
+
+    def test_entries_for(self):
+        lf = IndexedLogFile(self.fname)
+        assert list(lf.entries_for(u'bar')) == [self.LOG[5]]
+        assert list(lf.entries_for(u'foo')) == self.LOG[:5] + [self.LOG[6]]
+        assert list(lf.entries_for(u'foo', 1303073723000000)) == [self.LOG[4], self.LOG[6]]
+        assert list(lf.entries_for(u'baz')) == []
+
+    def test_add_and_gaps(self):
+        lf = IndexedLogFile(self.fname)
+        list(lf.since(0)) # build index
+        newdata = [u'1303333333000000', u'00000002', u'SAVE', u'bar', u'0.0.0.0', u'example.org', u'888.888.888', u'', u'']
+        lf.add(*newdata) # adds an index record
+        index_size = os.path.getsize(self.fname + '.idx')
+        # some line added without an index record (creates a gap)
+        gapdata = [u'1303333334000000', u'00000003', u'SAVE', u'bar', u'0.0.0.0', u'example.org', u'999.999.999', u'', u'']
+        f = open(self.fname, 'ab')
+        f.write(self.make_line(gapdata))
+        f.close()
+        lf.add(*newdata)
+        assert os.path.getsize(self.fname + '.idx') > index_size
+        assert list(lf.entries_for(u'bar')) == [self.LOG[5], newdata, gapdata, newdata]
+        assert list(lf.since(1303333334000000)) == [gapdata]
+
+    def test_sorted_keys(self):
+        lf = IndexedLogFile(self.fname)
+        old_tail_records = index.TAIL_RECORDS
+        index.TAIL_RECORDS = 1
+        try:
+            assert list(lf.entries_for(u'bar')) == [self.LOG[5]] # sorts the keys
+            assert os.path.exists(self.fname + '.key')
+            newdata = [u'1303333333000000', u'00000002', u'SAVE', u'bar', u'0.0.0.0', u'example.org', u'888.888.888', u'', u'']
+            lf.add(*newdata) # not sorted yet
+            # some line added without an index record (creates a gap)
+            gapdata = [u'1303333334000000', u'00000003', u'SAVE', u'foo', u'0.0.0.0', u'example.org', u'999.999.999', u'', u'']
+            f = open(self.fname, 'ab')
+            f.write(self.make_line(gapdata))
+            f.close()
+            lf.add(*newdata)
+            key_size = os.path.getsize(self.fname + '.key')
+            assert list(lf.entries_for(u'bar')) == [self.LOG[5], newdata, newdata]
+            assert list(lf.entries_for(u'foo', 1303073723000000)) == [self.LOG[4], self.LOG[6], gapdata]
+            assert os.path.getsize(self.fname + '.key') > key_size # sorted again
+            assert list(lf.entries_for(u'bar')) == [self.LOG[5], newdata, newdata]
+            assert list(lf.entries_for(u'foo')) == self.LOG[:5] + [self.LOG[6], gapdata]
+            lf.index.remove()
+            assert not os.path.exists(self.fname + '.key')
+        finally:
+            index.TAIL_RECORDS = old_tail_records
+
+    def test_add_many(self):
+        lf = IndexedLogFile(self.fname)
+        list(lf.since(0)) # build index
+        newdata = [[u'1303333333000000', u'00000002', u'SAVE', u'bar', u'0.0.0.0', u'example.org', u'888.888.888', u'', u''],
+                   [u'1303333334000000', u'00000003', u'SAVE', u'baz', u'0.0.0.0', u'example.org', u'999.999.999', u'', u'']]
+        lf._add_many([u'\t'.join(linedata) for linedata in newdata])
+        assert list(IndexedLogFile(self.fname).entries()) == self.LOG + newdata
+        assert list(lf.entries_for(u'bar')) == [self.LOG[5], newdata[0]]
+        assert list(lf.entries_for(u'baz')) == [newdata[1]]
+        assert list(lf.since(1303333334000000)) == [newdata[1]]
+
+    def test_log_replaced(self):
+        lf = IndexedLogFile(self.fname)
+        list(lf.since(0)) # build index
+        os.remove(self.fname)
+        newdata = [u'1303333333000000', u'00000001', u'SAVENEW', u'foo', u'0.0.0.0', u'example.org', u'888.888.888', u'', u'']
+        lf.add(*newdata)
+        assert list(lf.entries_for(u'foo')) == [newdata]
+        # log truncated behind our back
+        self.write_log(self.fname, self.LOG[:1])
+        assert list(lf.entries_for(u'foo')) == self.LOG[:1]
+
+class TestLogSegments(object):
+    """ testing log rotation into segments """
+    LOG = TestLogIndex.LOG
+    make_line = TestLogFile.make_line.im_func
+
+    def setup_method(self, method):
+        self.dirname = tempfile.mkdtemp()
+        self.fname = os.path.join(self.dirname, 'log')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.dirname)
+
+    def add(self, lf, data):
+        for linedata in data:
+            lf.add(*linedata)
+
+    def test_rotate(self):
+        lf = IndexedLogFile(self.fname)
+        self.add(lf, self.LOG[:3])
+        assert list(lf.since(0)) == self.LOG[:3] # builds index
+        segment = lf.rotate('gz')
+        assert segment.first_usecs == 1292630945000000
+        assert segment.last_usecs == 1292680177309091
+        assert segment.lines == 3
+        assert not os.path.exists(self.fname)
+        assert not lf.index.exists()
+        self.add(lf, self.LOG[3:5])
+        lf.rotate('bz2')
+        self.add(lf, self.LOG[5:])
+        assert [s.name for s in lf.segments.segments()] == [
+            'log.00001292630945000000.gz', 'log.00001292680233866579.bz2']
+        lf = IndexedLogFile(self.fname)
+        assert list(lf.entries()) == self.LOG
+        assert list(lf.reverse()) == self.LOG[::-1]
+        assert lf.lines() == len(self.LOG)
+        assert list(lf.entries_for(u'bar')) == [self.LOG[5]] # only the live log
+
+    def test_time_range(self):
+        lf = IndexedLogFile(self.fname)
+        self.add(lf, self.LOG[:3])
+        lf.rotate()
+        self.add(lf, self.LOG[3:5])
+        segment = lf.rotate()
+        self.add(lf, self.LOG[5:])
+        assert [s.name for s in lf.segments.segments(1300000000000000)] == [segment.name]
+        assert [s.name for s in lf.segments.segments(end_usecs=1292680233866579)] == ['log.00001292630945000000.gz']
+        os.remove(lf.segments.segments()[0].path) # old segment is not read
+        assert list(lf.entries(1292680233866579, 1303073725000000)) == self.LOG[3:6]
+        assert list(lf.entries(1303073724000000)) == self.LOG[5:]
+
+    def test_rotate_waits_for_writers(self):
+        lf = IndexedLogFile(self.fname)
+        lf.rotation_lock_mode = 'dir'
+        self.add(lf, self.LOG[:2])
+        fd, writers_lock = lf._open_output() # a writer has the log file open
+        rotator = threading.Thread(target=lf.rotate)
+        rotator.start()
+        time.sleep(0.3)
+        os.write(fd, self.make_line(self.LOG[2]))
+        lf._close_output(fd, writers_lock)
+        rotator.join()
+        assert lf.segments.segments()[0].lines == 3
+        assert list(lf.reverse()) == self.LOG[2::-1]
+
+    def test_write_after_rotation(self):
+        lf = IndexedLogFile(self.fname)
+        lf.rotation_lock_mode = 'dir'
+        self.add(lf, self.LOG[:2])
+        assert lf.written_size == os.path.getsize(self.fname)
+        lf.rotate()
+        self.add(lf, self.LOG[2:3])
+        assert lf.written_size == os.path.getsize(self.fname)
+        assert not [fn for fn in os.listdir(os.path.dirname(self.fname)) if fn.endswith('.writers')]
+        assert lf.segments.segments()[0].lines == 2
+        assert list(lf.reverse()) == self.LOG[2::-1]
+
+    def test_reverse_lines(self):
+        data = ''.join([self.make_line(linedata) for linedata in self.LOG])
+        expected = data.splitlines()
+        expected.reverse()
+        for block_size in (1, 7, 100, 10000):
+            assert list(reverse_lines(StringIO(data), len(data), block_size)) == expected
+        assert list(reverse_lines(StringIO('a\n\nb'), 4, 2)) == ['b', '', 'a']
+
+    def test_needs_rotation(self):
+        lf = IndexedLogFile(self.fname)
+        assert not lf.needs_rotation(1, 1)
+        self.add(lf, self.LOG[:1])
+        assert lf.needs_rotation(max_size=10)
+        assert not lf.needs_rotation(max_size=10000)
+        assert lf.needs_rotation(max_age=3600) # that entry is from 2010
+        assert lf.rotate(max_size=10000) is None
+        assert lf.rotate(max_size=10) is not None
+        assert lf.rotate() is None # nothing to rotate
+
+
+class TestEditLogFilter(TestLogFile):
+    """ testing edit-log filtering """
+    LOG = TestLogIndex.LOG
+
+    def userids(self, **kw):
+        log = EditLog(self.request, filename=self.fname)
+        log.set_filter(**kw)
+        return [line.userid for line in log]
+
+    def test_filter(self):
+        assert self.userids(pagename=u'bar') == [u'666.666.666']
+        assert self.userids(pagename=[u'bar', u'baz']) == [u'666.666.666']
+        assert self.userids(pagename=u'foo', action=u'SAVE') == [u'555.555.555', u'777.777.777']
+        assert self.userids(action=(u'ATTNEW', u'ATTDEL')) == [u'222.222.222', u'333.333.333', u'444.444.444']
+        assert self.userids(userid=u'111.111.111') == [u'111.111.111']
+        assert self.userids(addr=u'1.2.3.4') == []
+        assert self.userids(hostname=u'example.org') == [linedata[6] for linedata in self.LOG]
+        assert self.userids(since=1303073723000000) == [u'555.555.555', u'666.666.666', u'777.777.777']
+        assert self.userids(since=1292680177309091, until=1303073723000000) == [u'333.333.333', u'444.444.444']
+        assert self.userids(ed_time_usecs=1292680177309091) == [u'333.333.333']
+        assert self.userids(rev=2) == [u'555.555.555']
+        assert self.userids(rev=[u'00000001', 3]) == [u'111.111.111', u'666.666.666', u'777.777.777']
+        assert self.userids() == [linedata[6] for linedata in self.LOG]
+
+    def test_filter_reverse(self):
+        log = EditLog(self.request, filename=self.fname)
+        log.set_filter(pagename=u'foo', action=u'SAVE')
+        assert [line.userid for line in log.reverse()] == [u'777.777.777', u'555.555.555']
+
+    def test_reverse_skip(self):
+        log = EditLog(self.request, filename=self.fname)
+        assert [line.userid for line in log.reverse(2)] == [linedata[6] for linedata in self.LOG[-3::-1]]
+        assert list(log.reverse(len(self.LOG))) == []
+
 coverage_modules = ['MoinMoin.logfile']
 
@@ -18,9 +18,29 @@
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
+import os
+
 from MoinMoin.logfile import LogFile
 from MoinMoin import wikiutil, user, config
 from MoinMoin.Page import Page
+from MoinMoin.util.generation import Generation
+
+
+def generation(request):
+    """ Return the generation counter of the global edit-log.
+
+        Whenever a line is added to the global edit-log, the counter is set to
+        the new size of the log, so other processes can cheaply find out whether
+        something has changed (see MoinMoin.util.generation).
+    """
+    cache = request.cfg.cache
+    try:
+        return cache.editlog_generation
+    except AttributeError:
+        filename = os.path.join(request.cfg.cache_dir, request.cfg.siteid, 'editlog', 'generation')
+        cache.editlog_generation = Generation(filename)
+        return cache.editlog_generation
+
 
 class EditLogLine:
     """
@@ -144,17 +164,97 @@ class EditLogLine:
                 request.formatter.span(0))
 
 
+# actions of edit-log lines of page revisions (the other ones are ATT*)
+SAVE_ACTIONS = ('SAVE', 'SAVENEW', 'SAVE/REVERT', 'SAVE/RENAME', )
+
+
+class EditLogFilter:
+    """ Filter for raw edit-log lines
+
+    This is used as EditLog.line_filter, so lines are rejected before an
+    EditLogLine object gets created for them.
+
+    Every keyword given must match. Values of pagename, rev, addr, hostname,
+    userid and action may be a single value or a list/tuple/set of accepted
+    values.
+    """
+    # field positions in an edit-log line, see EditLog.add
+    TIME, REV, ACTION, PAGENAME, ADDR, HOSTNAME, USERID = range(7)
+
+    def __init__(self, pagename=None, rev=None, addr=None, hostname=None, userid=None,
+                 action=None, since=None, until=None, ed_time_usecs=None):
+        """
+        @param pagename: page name(s) (unicode)
+        @param rev: revision(s) (int or 8 digit string as EditLogLine.rev)
+        @param addr: remote address(es)
+        @param hostname: host name(s), as EditLogLine.hostname (addr if empty)
+        @param userid: user id(s)
+        @param action: action(s), e.g. 'SAVE', 'SAVENEW', 'ATTNEW'
+        @param since: only lines with ed_time_usecs >= since
+        @param until: only lines with ed_time_usecs < until
+        @param ed_time_usecs: only lines with exactly this ed_time_usecs
+        """
+        if pagename is not None:
+            pagename = [unicode(wikiutil.quoteWikinameFS(name)) for name in self._values(pagename)]
+        if rev is not None:
+            rev = [isinstance(r, (int, long)) and u"%08d" % r or r for r in self._values(rev)]
+        checks = []
+        for field, values in [(self.PAGENAME, pagename),
+                              (self.REV, rev),
+                              (self.ADDR, addr),
+                              (self.USERID, userid),
+                              (self.ACTION, action), ]:
+            if values is not None:
+                checks.append((field, frozenset(self._values(values))))
+        self.checks = checks
+        self.hostnames = hostname is not None and frozenset(self._values(hostname)) or None
+        if ed_time_usecs is not None:
+            since, until = long(ed_time_usecs), long(ed_time_usecs) + 1
+        self.since = since
+        self.until = until
+
+    def _values(self, value):
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return value
+        return [value]
+
+    def __call__(self, line):
+        fields = line.split('\t', self.USERID + 1)
+        if len(fields) <= self.USERID:
+            fields.extend([u''] * (self.USERID + 1 - len(fields)))
+        for field, values in self.checks:
+            if fields[field] not in values:
+                return False
+        if self.hostnames is not None:
+            if (fields[self.HOSTNAME] or fields[self.ADDR]) not in self.hostnames:
+                return False
+        if self.since is not None or self.until is not None:
+            try:
+                ed_time_usecs = long(fields[self.TIME] or '0')
+            except ValueError:
+                return False
+            if self.since is not None and ed_time_usecs < self.since:
+                return False
+            if self.until is not None and ed_time_usecs >= self.until:
+                return False
+        return True
+
+
 class EditLog(LogFile):
     """ Used for accessing the global edit-log (e.g. by RecentChanges) as
         well as for the local edit-log (e.g. PageEditor, info action).
     """
+    indexed = True
+
     def __init__(self, request, filename=None, buffer_size=4096, **kw):
+        self._global = False # is this the global edit-log?
         if filename is None:
             rootpagename = kw.get('rootpagename', None)
             if rootpagename:
                 filename = Page(request, rootpagename).getPagePath('edit-log', isfile=1)
             else:
                 filename = request.rootpage.getPagePath('edit-log', isfile=1)
+                self._global = True
         LogFile.__init__(self, filename, buffer_size)
         self._NUM_FIELDS = 9
         self._usercache = {}
@@ -208,6 +308,8 @@ class EditLog(LogFile):
                            comment,
                            )) + "\n"
         self._add(line)
+        if self._global:
+            generation(request).set(self.size())
 
     def parser(self, line):
         """ Parse edit-log line into fields """
@@ -226,17 +328,23 @@ class EditLog(LogFile):
         result.ed_time_usecs = long(result.ed_time_usecs or '0') # has to be long for py 2.2.x
         return result
 
-    def set_filter(self, **kw):
-        """ optionally filter for specific pagenames, addrs, hostnames, userids """
-        expr = "1"
-        for field in ['pagename', 'addr', 'hostname', 'userid']:
-            if field in kw:
-                expr = "%s and x.%s == %s" % (expr, field, repr(kw[field]))
-
-        if 'ed_time_usecs' in kw:
-            expr = "%s and long(x.ed_time_usecs) == %s" % (expr, long(kw['ed_time_usecs'])) # must be long for py 2.2.x
+    def index_data(self, line):
+        """ Return (ed_time_usecs, pagename) of an edit-log line for the index """
+        fields = line.split('\t', 4)
+        try:
+            return long(fields[0]), wikiutil.unquoteWikiname(fields[3].encode('ascii'))
+        except (IndexError, ValueError, UnicodeError):
+            return None
 
-        self.filter = eval("lambda x: " + expr)
+    def set_filter(self, **kw):
+        """ optionally filter for specific pagenames, addrs, hostnames, userids,
+            actions or a time range, see EditLogFilter for the keywords.
+            Call without keywords to remove the filter.
+        """
+        if kw:
+            self.line_filter = EditLogFilter(**kw)
+        else:
+            self.line_filter = None
 
 
     def news(self, oldposition):
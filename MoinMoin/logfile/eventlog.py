@@ -3,17 +3,31 @@
 
     The global event-log is mainly used for statistics (e.g. EventStats).
 
+    If cfg.log_events_buffer_size is set, events are not written by the
+    request, but buffered in memory by an EventSink and written in batches by
+    a background thread.
+
     @copyright: 2007 MoinMoin:ThomasWaldmann
     @license: GNU GPL, see COPYING for details.
 """
 
-import time
+import os, time, atexit, threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
 
 from MoinMoin.logfile import LogFile
 from MoinMoin import wikiutil
 
+# time based rotation needs to read the first line of the event-log, we only
+# do that every ROTATION_CHECK_INTERVAL seconds (per process and log file)
+ROTATION_CHECK_INTERVAL = 60
+_rotation_checked = {} # filename -> time of last check
+
 class EventLog(LogFile):
     """ The global event-log is mainly used for statistics (e.g. EventStats) """
+    indexed = True
+
     def __init__(self, request, filename=None, buffer_size=65536, **kw):
         if filename is None:
             rootpagename = kw.get('rootpagename', None)
@@ -22,6 +36,7 @@ class EventLog(LogFile):
                 filename = Page(request, rootpagename).getPagePath('event-log', isfile=1)
             else:
                 filename = request.rootpage.getPagePath('event-log', isfile=1)
+        self.filename = filename
         LogFile.__init__(self, filename, buffer_size)
 
     def add(self, request, eventtype, values=None, add_http_info=1,
@@ -53,9 +68,40 @@ class EventLog(LogFile):
             values['wikiname'] = cfg.interwikiname
             values['url'] = request.url
 
-        # Encode values in a query string TODO: use more readable format
-        values = wikiutil.makeQueryString(values)
-        self._add(u"%d\t%s\t%s\n" % (mtime_usecs, eventtype, values))
+        if cfg.log_events_buffer_size:
+            get_sink(self.filename, cfg).add(mtime_usecs, eventtype, values)
+            return
+
+        self.set_rotation(cfg)
+        self._add(format_event(mtime_usecs, eventtype, values))
+        self.rotate_if_needed(cfg)
+
+    def set_rotation(self, cfg):
+        """ Writers of an event-log that gets rotated need to take a lock,
+            see LogFile.rotate
+        """
+        if cfg.log_events_rotate_size or cfg.log_events_rotate_interval:
+            self.rotation_lock_mode = cfg.lock_mode
+        else:
+            self.rotation_lock_mode = None
+
+    def rotate_if_needed(self, cfg):
+        """ Rotate the event-log into a compressed segment if it is bigger
+            than cfg.log_events_rotate_size or if its first entry is older than
+            cfg.log_events_rotate_interval.
+        """
+        max_size = cfg.log_events_rotate_size
+        max_age = cfg.log_events_rotate_interval
+        if max_size and self.written_size is not None and self.written_size < max_size:
+            max_size = 0 # we know the size from our last write, no need to stat
+        if max_age:
+            now = time.time()
+            if now - _rotation_checked.get(self.filename, 0) < ROTATION_CHECK_INTERVAL:
+                max_age = 0
+            else:
+                _rotation_checked[self.filename] = now
+        if (max_size or max_age) and self.needs_rotation(max_size, max_age):
+            self.rotate(cfg.log_events_compression, cfg.lock_mode, max_size, max_age)
 
     def parser(self, line):
         """ parse a event-log line into its components """
@@ -66,11 +112,144 @@ class EventLog(LogFile):
             return None
         return long(time_usecs), eventtype, wikiutil.parseQueryString(kvpairs)
 
+    def index_data(self, line):
+        """ Return (time_usecs, pagename) of an event-log line for the index """
+        try:
+            time_usecs, eventtype, kvpairs = line.rstrip().split('\t')
+            time_usecs = long(time_usecs)
+        except ValueError:
+            return None
+        return time_usecs, wikiutil.parseQueryString(kvpairs).get('pagename')
+
     def set_filter(self, event_types=None):
         """ optionally filter log for specific event types """
         if event_types is None:
-            self.filter = None
+            self.line_filter = None
         else:
-            self.filter = lambda line: (line[1] in event_types)
+            # check the raw line, so we do not need to parse the values of
+            # events we are not interested in
+            event_types = frozenset(event_types)
+            def line_filter(line):
+                fields = line.split('\t', 2)
+                return len(fields) == 3 and fields[1] in event_types
+            self.line_filter = line_filter
+
+
+def format_event(mtime_usecs, eventtype, values):
+    """ Return the event-log line for an event """
+    # Encode values in a query string TODO: use more readable format
+    values = wikiutil.makeQueryString(values)
+    return u"%d\t%s\t%s\n" % (mtime_usecs, eventtype, values)
+
+
+class EventSink:
+    """ Buffer events in memory and write them to the event-log in batches
+
+    A background thread writes the buffered events when
+    cfg.log_events_buffer_size events were buffered or when the oldest one
+    was buffered cfg.log_events_buffer_time milliseconds ago, whatever comes
+    first. Each batch is written with one write() call, so batches of
+    concurrent processes do not get mixed up. Buffered events are written
+    when the process exits (unless it gets killed).
+    """
+    def __init__(self, filename, cfg):
+        self.filename = filename
+        self.cfg = cfg
+        self.max_events = cfg.log_events_buffer_size
+        self.max_delay = cfg.log_events_buffer_time / 1000.0
+        self._init_process()
+
+    def _init_process(self):
+        """ (Re-)initialize the sink for the current process """
+        self._pid = os.getpid()
+        self._events = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+    def add(self, mtime_usecs, eventtype, values):
+        """ Buffer an event (the values dict must not be modified afterwards) """
+        if self._pid != os.getpid():
+            # we were forked, the events buffered by the parent process
+            # are written by the parent process, the thread did not survive
+            self._init_process()
+        self._lock.acquire()
+        try:
+            self._events.append((mtime_usecs, eventtype, values))
+            count = len(self._events)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='EventSink')
+                self._thread.setDaemon(True)
+                self._thread.start()
+        finally:
+            self._lock.release()
+        if count >= self.max_events:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.max_delay)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("writing buffered events to %r failed" % self.filename)
+
+    def flush(self):
+        """ Write the buffered events now """
+        self._lock.acquire()
+        try:
+            if self._pid != os.getpid():
+                return
+            events, self._events = self._events, []
+        finally:
+            self._lock.release()
+        if events:
+            event_log = EventLog(None, filename=self.filename)
+            event_log.set_rotation(self.cfg)
+            event_log._add_many([format_event(*event) for event in events])
+            event_log.rotate_if_needed(self.cfg)
+
+
+    def close(self):
+        """ Stop the background thread and write the buffered events """
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            self._stopping = True
+            self._wakeup.set()
+            thread.join(10)
+        self.flush()
+
+
+_sinks = {} # filename -> EventSink
+_sinks_lock = threading.Lock()
+
+def get_sink(filename, cfg):
+    """ Return the EventSink for the event-log filename """
+    try:
+        return _sinks[filename]
+    except KeyError:
+        _sinks_lock.acquire()
+        try:
+            if filename not in _sinks:
+                _sinks[filename] = EventSink(filename, cfg)
+            return _sinks[filename]
+        finally:
+            _sinks_lock.release()
+
+def flush(filename=None):
+    """ Write the buffered events (of event-log filename or of all event-logs) """
+    if filename is None:
+        sinks = _sinks.values()
+    else:
+        sinks = [_sinks.get(filename)]
+    for sink in sinks:
+        if sink is not None:
+            sink.flush()
 
+def _shutdown():
+    for sink in _sinks.values():
+        sink.close()
 
+atexit.register(_shutdown)
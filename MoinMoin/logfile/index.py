@@ -0,0 +1,337 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - LogFile index
+
+    A sidecar file (<logfile>.idx) with one fixed size binary record per log
+    line: (timestamp usecs, byte offset, byte length, key hash). The key is
+    usually the page name the log line is about.
+
+    Records are appended by LogFile._add (only if the index file exists, it is
+    created by build() when it is needed the first time), so the index can be
+    used to seek to the log lines of some time range or to find the log lines
+    of some page without scanning through the whole log file.
+
+    To find the log lines of some key, a second sidecar file (<logfile>.key)
+    holds the records sorted by key hash, so lookups are a binary search.
+    It covers the first records of the .idx file only, records appended later
+    are scanned linearly and the .key file is sorted again when there are more
+    than TAIL_RECORDS of them.
+
+    The index is only a hint: records of concurrent writers may be slightly out
+    of order and log lines written without an index record (e.g. while the
+    index was built) are found by looking for "gaps" in the covered byte
+    ranges, those must be scanned linearly by the caller.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, struct, binascii, tempfile
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import config
+from MoinMoin.util import filesys
+
+RECORD = struct.Struct('<QQII') # time_usecs, offset, length, key hash
+CHUNK_RECORDS = 4096 # records read at once when scanning the index
+
+# .key file: header, gaps, records sorted by key hash (big-endian, so the
+# packed records sort like the values)
+KEY_HEADER = struct.Struct('<QQI') # .idx records covered, bytes covered, gaps
+KEY_GAP = struct.Struct('<QQ') # begin, end
+KEY_RECORD = struct.Struct('>IQI') # key hash, offset, length
+
+# sort the .key file again if more .idx records than that are not in it
+TAIL_RECORDS = 4096
+
+# concurrent writers may add records slightly out of time order, so when
+# looking for a time, we start this much earlier:
+TIME_SLACK_USECS = 600 * 1000000
+
+
+def key_hash(key):
+    """ Return the 32bit hash of a key (unicode or None) used in index records """
+    if not key:
+        return 0
+    return binascii.crc32(key.encode('utf-8')) & 0xffffffff
+
+
+class LogIndex:
+    """ Sidecar index of a LogFile """
+    def __init__(self, filename):
+        """
+        @param filename: name of the log file (not of the index file)
+        """
+        self.filename = filename + '.idx'
+        self.key_filename = filename + '.key'
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def remove(self):
+        """ Remove the index (it will be rebuilt when it is needed next time) """
+        for filename in (self.filename, self.key_filename):
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def stale(self, logsize):
+        """ Return True if the index covers more than the log file's logsize
+            bytes, i.e. if the log was removed or truncated behind our back.
+        """
+        try:
+            f = file(self.filename, 'rb')
+        except IOError:
+            return False
+        try:
+            count = self._count(f)
+            if not count:
+                return False
+            t, offset, length, key = self._record(f, count - 1)
+            return offset + length > logsize
+        finally:
+            f.close()
+
+    def append(self, time_usecs, offset, length, key):
+        """ Append a record for a log line (if the index exists) """
+        self.extend([(time_usecs, offset, length, key)])
+
+    def extend(self, records):
+        """ Append records (time_usecs, offset, length, key) for several log
+            lines with one write (if the index exists)
+        """
+        if not self.exists():
+            return
+        data = ''.join([RECORD.pack(time_usecs, offset, length, key_hash(key))
+                        for time_usecs, offset, length, key in records])
+        try:
+            f = file(self.filename, 'ab')
+            try:
+                f.write(data)
+            finally:
+                f.close()
+        except IOError, err:
+            logging.warning("log index %r: could not append (%s)" % (self.filename, str(err)))
+
+    def build(self, logfilename, index_data):
+        """ Build the index from scratch by scanning the whole log file
+
+        @param logfilename: name of the log file
+        @param index_data: function line -> (time_usecs, key) or None
+        """
+        dirname, basename = os.path.split(self.filename)
+        fd, tmp_fname = tempfile.mkstemp('.tmp', basename, dirname)
+        out = os.fdopen(fd, 'wb')
+        try:
+            offset = 0
+            try:
+                f = file(logfilename, 'rb')
+            except IOError:
+                f = None
+            if f is not None:
+                try:
+                    records = []
+                    for line in f:
+                        length = len(line)
+                        data = index_data(unicode(line, config.charset, 'replace'))
+                        if data is not None:
+                            time_usecs, key = data
+                            records.append(RECORD.pack(time_usecs, offset, length, key_hash(key)))
+                            if len(records) >= CHUNK_RECORDS:
+                                out.write(''.join(records))
+                                records = []
+                        offset += length
+                    out.write(''.join(records))
+                finally:
+                    f.close()
+        finally:
+            out.close()
+        filesys.chmod(tmp_fname, 0666 & config.umask)
+        filesys.rename(tmp_fname, self.filename)
+        try:
+            os.remove(self.key_filename)
+        except OSError:
+            pass
+        logging.debug("log index %r: built, covering %d bytes" % (self.filename, offset))
+
+    def _count(self, f):
+        f.seek(0, 2)
+        return f.tell() // RECORD.size
+
+    def _record(self, f, i):
+        f.seek(i * RECORD.size)
+        return RECORD.unpack(f.read(RECORD.size))
+
+    def offset(self, time_usecs):
+        """ Return a log offset before all log lines with timestamp >= time_usecs
+            (the log lines before that offset all have an older timestamp).
+
+            Assumes that records are (mostly) in time order, does a binary search.
+        """
+        time_usecs -= TIME_SLACK_USECS
+        try:
+            f = file(self.filename, 'rb')
+        except IOError:
+            return 0
+        try:
+            lo, hi = 0, self._count(f)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._record(f, mid)[0] < time_usecs:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0:
+                return 0
+            # the log lines up to the end of the previous record are older
+            t, offset, length, key = self._record(f, lo - 1)
+            return offset + length
+        finally:
+            f.close()
+
+    def _scan(self, f, first, covered, gaps, wanted=None):
+        """ Scan the records of .idx file f from record number first on
+
+        @param covered: everything before this offset is covered by records
+        @param gaps: list of (begin, end) byte ranges not covered so far
+        @param wanted: key hash to look for (None to collect all records)
+        @return: (covered, gaps, found, count), found is a list of
+                 (offset, length) of the records with the wanted key hash (or
+                 of packed KEY_RECORDs of all records if wanted is None),
+                 count is the number of records
+        """
+        found = []
+        count = first
+        f.seek(first * RECORD.size)
+        while True:
+            chunk = f.read(RECORD.size * CHUNK_RECORDS)
+            if len(chunk) < RECORD.size:
+                break
+            for pos in xrange(0, len(chunk) - RECORD.size + 1, RECORD.size):
+                t, offset, length, h = RECORD.unpack_from(chunk, pos)
+                count += 1
+                end = offset + length
+                if offset > covered:
+                    gaps.append((covered, offset))
+                    covered = end
+                elif end > covered:
+                    covered = end
+                elif gaps and offset < gaps[-1][1]:
+                    # record of a concurrent writer, out of order - it
+                    # might fill some gap found earlier
+                    gaps = self._fill(gaps, offset, end)
+                if wanted is None:
+                    found.append(KEY_RECORD.pack(h, offset, length))
+                elif h == wanted:
+                    found.append((offset, length))
+        return covered, gaps, found, count
+
+    def _read_keys(self, wanted):
+        """ Look up a key hash in the .key file
+
+        @return: (number of .idx records covered, bytes covered, gaps,
+                  list of (offset, length) of the records with that key hash)
+        """
+        try:
+            f = file(self.key_filename, 'rb')
+        except IOError:
+            return 0, 0, [], []
+        try:
+            try:
+                count, covered, gap_count = KEY_HEADER.unpack(f.read(KEY_HEADER.size))
+                data = f.read(gap_count * KEY_GAP.size)
+                gaps = [KEY_GAP.unpack_from(data, i * KEY_GAP.size) for i in xrange(gap_count)]
+            except struct.error:
+                return 0, 0, [], []
+            first = f.tell()
+            f.seek(0, 2)
+            lo, hi = 0, (f.tell() - first) // KEY_RECORD.size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(first + mid * KEY_RECORD.size)
+                if KEY_RECORD.unpack(f.read(KEY_RECORD.size))[0] < wanted:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            found = []
+            f.seek(first + lo * KEY_RECORD.size)
+            while True:
+                data = f.read(KEY_RECORD.size)
+                if len(data) < KEY_RECORD.size:
+                    break
+                h, offset, length = KEY_RECORD.unpack(data)
+                if h != wanted:
+                    break
+                found.append((offset, length))
+            return count, covered, gaps, found
+        finally:
+            f.close()
+
+    def _sort(self, f):
+        """ Write a new .key file for .idx file f """
+        covered, gaps, records, count = self._scan(f, 0, 0, [])
+        records.sort()
+        dirname, basename = os.path.split(self.key_filename)
+        fd, tmp_fname = tempfile.mkstemp('.tmp', basename, dirname)
+        out = os.fdopen(fd, 'wb')
+        try:
+            out.write(KEY_HEADER.pack(count, covered, len(gaps)))
+            out.write(''.join([KEY_GAP.pack(begin, end) for begin, end in gaps]))
+            for i in xrange(0, len(records), CHUNK_RECORDS):
+                out.write(''.join(records[i:i + CHUNK_RECORDS]))
+        finally:
+            out.close()
+        filesys.chmod(tmp_fname, 0666 & config.umask)
+        filesys.rename(tmp_fname, self.key_filename)
+        logging.debug("log index %r: sorted %d records" % (self.key_filename, count))
+
+    def lookup(self, key, logsize, start=0):
+        """ Find the log lines of some key
+
+        @param key: the key to look for (unicode)
+        @param logsize: current size of the log file
+        @param start: only return log lines starting at or after this offset
+        @return: (sorted list of (offset, length) of matching log lines,
+                  sorted list of (begin, end) byte ranges not covered by the index)
+        """
+        wanted = key_hash(key)
+        try:
+            f = file(self.filename, 'rb')
+        except IOError:
+            return [], [(start, logsize)]
+        try:
+            first, covered, gaps, found = self._read_keys(wanted)
+            if first > self._count(f):
+                # .key file of another (older) .idx file
+                first, covered, gaps, found = 0, 0, [], []
+            covered, gaps, tail, count = self._scan(f, first, covered, gaps, wanted)
+            found.extend(tail)
+            if count - first > TAIL_RECORDS:
+                try:
+                    self._sort(f)
+                except (IOError, OSError), err:
+                    logging.warning("log index %r: could not sort (%s)" % (self.key_filename, str(err)))
+        finally:
+            f.close()
+        if covered < logsize:
+            gaps.append((covered, logsize))
+        found = [(offset, length) for offset, length in found if offset >= start]
+        found.sort()
+        gaps = [(max(begin, start), end) for begin, end in gaps if end > start]
+        return found, gaps
+
+    def _fill(self, gaps, begin, end):
+        """ Remove the range begin..end from the list of gaps """
+        result = []
+        for gap_begin, gap_end in gaps:
+            if end <= gap_begin or begin >= gap_end:
+                result.append((gap_begin, gap_end))
+                continue
+            if gap_begin < begin:
+                result.append((gap_begin, begin))
+            if end < gap_end:
+                result.append((end, gap_end))
+        return result
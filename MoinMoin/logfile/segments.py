@@ -0,0 +1,226 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - LogFile segments
+
+    A log file can be rotated into compressed archive segments, so the live
+    log file stays small. The segments are kept next to the log file as
+    <logfile>.<first timestamp>.gz (or .bz2), together with a manifest
+    (<logfile>.segments) with one line per segment (oldest first):
+
+        <segment file name> TAB <first usecs> TAB <last usecs> TAB <lines> TAB <bytes>
+
+    (bytes is the uncompressed size). The manifest allows readers to skip
+    segments outside of a time range and to count lines without
+    decompressing anything.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, bz2, gzip, shutil, tempfile
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import config
+from MoinMoin.util import filesys
+
+# block size for reading segments backwards
+BLOCK_SIZE = 65536
+
+# compression name -> function to open a compressed file (like file())
+COMPRESSORS = {
+    'gz': gzip.open,
+    'bz2': bz2.BZ2File,
+}
+
+
+def reverse_lines(f, size, block_size=BLOCK_SIZE):
+    """ yield the lines (without line end) of the first size bytes of
+        seekable file f, last one first
+    """
+    pos = size
+    rest = ''
+    at_end = True
+    while pos > 0:
+        count = min(block_size, pos)
+        pos -= count
+        f.seek(pos)
+        lines = (f.read(count) + rest).split('\n')
+        rest = lines.pop(0)
+        if at_end:
+            if lines and not lines[-1]:
+                del lines[-1] # after the last line end
+            at_end = False
+        lines.reverse()
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+def open_log(filename, mode='rb'):
+    """ Open a log file or a (compressed) segment of it for reading """
+    ext = os.path.splitext(filename)[1][1:]
+    return COMPRESSORS.get(ext, file)(filename, mode)
+
+
+class Segment:
+    """ An archived part of a log file """
+    def __init__(self, dirname, name, first_usecs, last_usecs, lines, size):
+        self.path = os.path.join(dirname, name)
+        self.name = name
+        self.first_usecs = first_usecs
+        self.last_usecs = last_usecs
+        self.lines = lines
+        self.size = size
+
+    def __repr__(self):
+        return "<Segment %s %d..%d>" % (self.name, self.first_usecs, self.last_usecs)
+
+    def overlaps(self, start_usecs=None, end_usecs=None):
+        """ Does the segment have entries in time range [start_usecs, end_usecs)? """
+        if start_usecs is not None and self.last_usecs < start_usecs:
+            return False
+        if end_usecs is not None and self.first_usecs >= end_usecs:
+            return False
+        return True
+
+    def open(self):
+        return open_log(self.path)
+
+    def reverse_lines(self, block_size=BLOCK_SIZE):
+        """ yield the lines of the segment (without line end), last one first
+
+        Compressed files can't be read backwards, so the segment is
+        decompressed into a temporary file first, which is then read
+        backwards block by block.
+        """
+        tmp = tempfile.TemporaryFile()
+        try:
+            f = self.open()
+            try:
+                shutil.copyfileobj(f, tmp, block_size)
+            finally:
+                f.close()
+            for line in reverse_lines(tmp, tmp.tell(), block_size):
+                yield line
+        finally:
+            tmp.close()
+
+
+class SegmentManifest:
+    """ The list of segments of a log file """
+    def __init__(self, logfilename):
+        """
+        @param logfilename: name of the log file (not of the manifest)
+        """
+        self.logfilename = logfilename
+        self.dirname = os.path.dirname(logfilename)
+        self.filename = logfilename + '.segments'
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def segments(self, start_usecs=None, end_usecs=None):
+        """ Return list of Segments (oldest first), optionally only those
+            having entries in time range [start_usecs, end_usecs)
+        """
+        try:
+            f = file(self.filename, 'rb')
+        except IOError:
+            return []
+        try:
+            lines = f.readlines()
+        finally:
+            f.close()
+        result = []
+        for line in lines:
+            try:
+                name, first_usecs, last_usecs, count, size = line.rstrip('\n').split('\t')
+                segment = Segment(self.dirname, name, long(first_usecs), long(last_usecs),
+                                  int(count), long(size))
+            except ValueError:
+                logging.warning("log segments %r: ignoring bad line %r" % (self.filename, line))
+                continue
+            if segment.overlaps(start_usecs, end_usecs):
+                result.append(segment)
+        return result
+
+    def _write(self, segments):
+        lines = ["%s\t%d\t%d\t%d\t%d\n" % (s.name, s.first_usecs, s.last_usecs, s.lines, s.size)
+                 for s in segments]
+        basename = os.path.basename(self.filename)
+        fd, tmp_fname = tempfile.mkstemp('.tmp', basename, self.dirname)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(''.join(lines))
+        finally:
+            f.close()
+        filesys.chmod(tmp_fname, 0666 & config.umask)
+        filesys.rename(tmp_fname, self.filename)
+
+    def archive(self, filename, index_data, compression='gz'):
+        """ Compress log file filename into a new segment and add it to the
+            manifest. filename is removed afterwards.
+
+        @param filename: the (renamed) log file to archive
+        @param index_data: function line -> (time_usecs, key) or None
+        @param compression: 'gz' or 'bz2'
+        @return: the new Segment or None if filename had no entries
+        """
+        compress = COMPRESSORS[compression]
+        first_usecs = last_usecs = None
+        count = size = 0
+        basename = os.path.basename(self.logfilename)
+        fd, tmp_fname = tempfile.mkstemp('.tmp', basename, self.dirname)
+        os.close(fd)
+        try:
+            src = file(filename, 'rb')
+            try:
+                dst = compress(tmp_fname, 'wb')
+                try:
+                    for line in src:
+                        dst.write(line)
+                        count += 1
+                        size += len(line)
+                        data = index_data(unicode(line, config.charset, 'replace'))
+                        if data is not None:
+                            if first_usecs is None:
+                                first_usecs = last_usecs = data[0]
+                            else:
+                                first_usecs = min(first_usecs, data[0])
+                                last_usecs = max(last_usecs, data[0])
+                finally:
+                    dst.close()
+            finally:
+                src.close()
+            if first_usecs is None:
+                os.remove(tmp_fname)
+                os.remove(filename)
+                return None
+            name = "%s.%020d.%s" % (basename, first_usecs, compression)
+            segment = Segment(self.dirname, name, first_usecs, last_usecs, count, size)
+            filesys.chmod(tmp_fname, 0666 & config.umask)
+            filesys.rename(tmp_fname, segment.path)
+        except:
+            if os.path.exists(tmp_fname):
+                os.remove(tmp_fname)
+            raise
+        self._write(self.segments() + [segment])
+        os.remove(filename)
+        logging.info("log %r: archived %d lines into %s" % (self.logfilename, count, name))
+        return segment
+
+    def remove(self):
+        """ Remove all segments and the manifest """
+        for segment in self.segments():
+            try:
+                os.remove(segment.path)
+            except OSError:
+                pass
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
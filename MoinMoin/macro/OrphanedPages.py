@@ -6,6 +6,8 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+from MoinMoin import linkgraph
+
 Dependencies = ["pages"]
 
 def macro_OrphanedPages(macro):
@@ -16,25 +18,18 @@ def macro_OrphanedPages(macro):
     if macro.request.isSpiderAgent: # reduce bot cpu usage
         return ''
 
-    # delete all linked pages from a dict of all pages
+    # pages readable by the current user not linked from any of them
     pages = macro.request.rootpage.getPageDict()
-    orphaned = {}
-    orphaned.update(pages)
-    for page in pages.values():
-        links = page.getPageLinks(macro.request)
-        for link in links:
-            if link in orphaned:
-                del orphaned[link]
+    orphanednames = linkgraph.get_linkgraph(macro.request).orphaned(macro.request, pages)
 
     result = []
     f = macro.formatter
-    if not orphaned:
+    if not orphanednames:
         result.append(f.paragraph(1))
         result.append(f.text(_("No orphaned pages in this wiki.")))
         result.append(f.paragraph(0))
     else:
         # return a list of page links
-        orphanednames = orphaned.keys()
         orphanednames.sort()
         result.append(f.number_list(1))
         for name in orphanednames:
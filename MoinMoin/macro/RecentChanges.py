@@ -290,7 +290,14 @@ def macro_RecentChanges(macro, abandoned=False):
     this_day = today
     day_count = 0
 
-    for line in log.reverse():
+    if max_days:
+        lines = log.reverse()
+    else:
+        # the listing ends at the bookmark, the edit-log index lets us start
+        # reading there
+        lines = list(log.since(bookmark_usecs))
+        lines.reverse()
+    for line in lines:
 
         if not request.user.may.read(line.pagename):
             continue
@@ -340,6 +347,9 @@ def macro_RecentChanges(macro, abandoned=False):
         else:
             pages[line.pagename] = [line]
     else:
+        if not max_days:
+            # the edits before the bookmark were not read at all
+            msg = _('[Bookmark reached]')
         if len(pages) > 0:
             # end of loop reached: print out stuff
             # XXX duplicated code from above
@@ -6,7 +6,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import wikiutil
+from MoinMoin import linkgraph, wikiutil
 
 Dependencies = ["pages"]
 
@@ -35,31 +35,27 @@ def macro_WantedPages(macro):
     pages = request.rootpage.getPageDict()
 
     # build a dict of wanted pages
-    wanted = {}
-    deprecated_links = []
-    for name, page in pages.items():
+    if allpages:
+        linking = pages
+    else:
         # Skip system pages, because missing translations are not wanted pages,
         # unless you are a translator and clicked "Include system pages"
-        if not allpages and wikiutil.isSystemPage(request, name):
+        linking = dict([(name, page) for name, page in pages.iteritems()
+                        if not wikiutil.isSystemPage(request, name)])
+    wanted = {}
+    deprecated = {}
+    for link, names in linkgraph.get_linkgraph(request).wanted(request, pages, linking).items():
+        if not request.user.may.read(link):
             continue
-
-        # Add links to pages which do not exist in pages dict
-        links = page.getPageLinks(request)
-        is_deprecated = page.parse_processing_instructions(
-                ).get('deprecated', False)
-
-        for link in links:
-            if not link in pages and request.user.may.read(link):
-                if is_deprecated:
-                    deprecated_links.append(link)
-                if link in wanted:
-                    wanted[link][name] = 1
-                else:
-                    wanted[link] = {name: 1}
-
-    for link in deprecated_links:
-        if len(wanted[link]) == 1:
-            del wanted[link]
+        if len(names) == 1:
+            # a page only linked from a deprecated page is not wanted
+            name = names[0]
+            if name not in deprecated:
+                deprecated[name] = pages[name].parse_processing_instructions(
+                        ).get('deprecated', False)
+            if deprecated[name]:
+                continue
+        wanted[link] = dict.fromkeys(names, 1)
 
     # Check for the extreme case when there are no wanted pages
     if not wanted:
@@ -11,6 +11,7 @@ from MoinMoin import caching, macro
 from MoinMoin.logfile import eventlog
 from MoinMoin.PageEditor import PageEditor
 from MoinMoin.Page import Page
+from MoinMoin.stats import rollup
 
 from MoinMoin._tests import become_trusted, create_page, make_macro, nuke_eventlog, nuke_page
 
@@ -24,9 +25,8 @@ class TestHits:
         self.page = create_page(request, self.pagename, u"Foo!")
         # for that test eventlog needs to be empty
         nuke_eventlog(self.request)
-        # hits is based on hitcounts which reads the cache
-        caching.CacheEntry(request, 'charts', 'pagehits', scope='wiki').remove()
-        caching.CacheEntry(request, 'charts', 'hitcounts', scope='wiki').remove()
+        # hits are counted by the hit rollup
+        caching.CacheEntry(request, 'charts', 'rollup', scope='wiki').remove()
 
     def teardown_class(self):
         nuke_page(self.request, self.pagename)
@@ -36,18 +36,15 @@ class TestHits:
         return m.execute(name, args)
 
     def testPageHits(self):
-        """ macro PageHits test: updating of cache from event-log for multiple call of PageHits"""
+        """ macro PageHits test: updating of hit rollup from event-log for multiple call of PageHits"""
         count = 20
         for counter in range(count):
             eventlog.EventLog(self.request).add(self.request, 'VIEWPAGE', {'pagename': 'PageHits'})
             result = self._test_macro(u'PageHits', u'') # XXX SENSE???
-        cache = caching.CacheEntry(self.request, 'charts', 'pagehits', scope='wiki', use_pickle=True)
-        date, hits = 0, {}
-        if cache.exists():
-            try:
-                date, hits = cache.content()
-            except caching.CacheError:
-                cache.remove()
+        hits = rollup.get_rollup(self.request).page_views(self.request)
         assert hits['PageHits'] == count
+        # the rollup on disk is up-to-date, too
+        other = rollup.HitRollup()
+        assert other.page_views(self.request)['PageHits'] == count
 
 coverage_modules = ['MoinMoin.macro.PageHits']
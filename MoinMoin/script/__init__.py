@@ -203,6 +203,9 @@ moin ... account create ...
 moin ... account disable ...
 moin ... account resetpw ...
 
+moin ... benchmark diff ...
+moin ... benchmark locking ...
+
 moin ... cli show ...
 
 moin ... export dump ...
@@ -215,6 +218,7 @@ moin ... index build ...
 moin ... maint cleancache ...
 moin ... maint cleanpage ...
 moin ... maint globaledit ...
+moin ... maint hitrollup ...
 moin ... maint makecache ...
 moin ... maint mkpagepacks ...
 moin ... maint reducewiki ...
@@ -0,0 +1,138 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - diff benchmark script
+
+@copyright: 2026 MoinMoin contributors
+@license: GNU GPL, see COPYING for details.
+"""
+
+import re, time
+
+from MoinMoin import config
+from MoinMoin.Page import Page
+from MoinMoin.formatter.text_html import Formatter
+from MoinMoin.script import MoinScript, fatal
+from MoinMoin.util import diff_engine, diff_html, diff_text
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script compares the diff engines (see MoinMoin.util.diff_engine and the
+diff_engine configuration setting) on the page revisions of a wiki: every
+revision of every page (with more than one revision) is diffed against its
+previous revision, like for the diff action (text and side by side HTML
+diffs) and for notification mails (text diffs).
+
+For each engine, the total and the worst times are shown, as well as the
+speedup compared to the first engine and the number of revision pairs for
+which the text diff is different from the one of the first engine (different
+engines may find different, but equally correct diffs).
+
+Detailed Instructions:
+======================
+General syntax: moin [options] benchmark diff [diff-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[diff-options] see below:
+    --engines=E,...   diff engines to compare (default: difflib,patience)
+    --pages=REGEX     only use the pages with names matching REGEX
+    --max-pairs=N     use at most N revision pairs (default: 1000)
+    --repeat=N        diff every pair N times, use the fastest run (default: 1)
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--engines", dest="engines", default="difflib,patience",
+            help="diff engines to compare (default: difflib,patience)"
+        )
+        self.parser.add_option(
+            "--pages", dest="pages", default=None,
+            help="only use the pages with names matching REGEX"
+        )
+        self.parser.add_option(
+            "--max-pairs", dest="max_pairs", type="int", default=1000,
+            help="use at most N revision pairs (default: 1000)"
+        )
+        self.parser.add_option(
+            "--repeat", dest="repeat", type="int", default=1,
+            help="diff every pair N times, use the fastest run (default: 1)"
+        )
+
+    def mainloop(self):
+        self.init_request()
+        request = self.request
+        options = self.options
+        engines = options.engines.split(',')
+        for engine in engines:
+            if engine not in diff_engine.ENGINES:
+                fatal("Unknown diff engine %r, known are: %s" % (engine, ', '.join(diff_engine.ENGINES)))
+        pages_filter = None
+        if options.pages:
+            pages_filter = re.compile(options.pages.decode(config.charset), re.U).search
+        pairs = load_corpus(request, pages_filter, options.max_pairs)
+        if not pairs:
+            fatal("No pages with more than one revision found.")
+        print "%d revision pairs, %d lines" % (len(pairs), sum([len(old) + len(new) for name, old, new in pairs]))
+        request.formatter = Formatter(request)
+        print "%-10s %10s %10s %12s %8s %10s" % ('engine', 'text [s]', 'html [s]', 'slowest [s]', 'speedup', 'different')
+        first = None
+        for engine in engines:
+            result = run_benchmark(request, pairs, engine, options.repeat)
+            if first is None:
+                first = result
+            text_time, html_time, slowest, outputs = result
+            speedup = (first[0] + first[1]) / max(text_time + html_time, 1e-6)
+            different = len([1 for output, first_output in zip(outputs, first[3]) if output != first_output])
+            print "%-10s %10.3f %10.3f %12.4f %7.1fx %10d" % (engine, text_time, html_time, slowest, speedup, different)
+
+
+def load_corpus(request, pages_filter=None, max_pairs=1000):
+    """ Load the texts of consecutive revisions of the wiki's pages
+
+    @param pages_filter: function called with the page names, only use
+                         the pages it returns True for
+    @param max_pairs: maximum number of pairs
+    @rtype: list of (pagename, old lines, new lines) tuples
+    """
+    pairs = []
+    for pagename in request.rootpage.getPageList(user='', exists=0, filter=pages_filter):
+        revisions = Page(request, pagename).getRevList()
+        revisions.reverse()
+        for old_rev, new_rev in zip(revisions, revisions[1:]):
+            old = Page(request, pagename, rev=old_rev).get_raw_body()
+            new = Page(request, pagename, rev=new_rev).get_raw_body()
+            pairs.append((pagename, old.splitlines(), new.splitlines()))
+            if len(pairs) >= max_pairs:
+                return pairs
+    return pairs
+
+
+def run_benchmark(request, pairs, engine, repeat=1):
+    """ Diff all revision pairs with one engine
+
+    @return: (time for the text diffs, time for the HTML diffs,
+              slowest pair (text and HTML diff), list of the text diffs)
+    """
+    text_time = html_time = slowest = 0.0
+    outputs = []
+    for pagename, old, new in pairs:
+        old_text, new_text = u'\n'.join(old), u'\n'.join(new)
+        text_times, html_times = [], []
+        for i in range(repeat):
+            t = time.time()
+            output = diff_text.diff(old, new, engine=engine)
+            text_times.append(time.time() - t)
+            t = time.time()
+            diff_html.diff(request, old_text, new_text, engine=engine)
+            html_times.append(time.time() - t)
+        outputs.append(output)
+        text_time += min(text_times)
+        html_time += min(html_times)
+        slowest = max(slowest, min(text_times) + min(html_times))
+    return text_time, html_time, slowest, outputs
+
@@ -0,0 +1,159 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - locking benchmark script
+
+@copyright: 2026 MoinMoin contributors
+@license: GNU GPL, see COPYING for details.
+"""
+
+import os, sys, time, random, shutil, tempfile
+
+from MoinMoin.script import MoinScript, fatal
+from MoinMoin.util import lock
+
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script compares the lock implementations selectable by the lock_mode
+configuration setting ('dir' and 'flock') under contention: many worker
+processes repeatedly acquire a read or write lock on the same lock directory
+and do a small read-modify-write of a counter file while holding a write
+lock. At the end, the counter is checked to make sure no update was lost.
+
+It does not need a wiki configuration.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] benchmark locking [locking-options]
+
+[locking-options] see below:
+    --workers=N       number of concurrent worker processes (default: 32)
+    --iterations=N    lock operations per worker (default: 100)
+    --readers=R       fraction of operations using a read lock (default: 0.5)
+    --hold=S          seconds a lock is held (default: 0.001)
+    --modes=M,...     lock modes to compare (default: dir,flock)
+    --dir=DIR         directory for the locks (default: a temporary one)
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--workers", dest="workers", type="int", default=32,
+            help="number of concurrent worker processes (default: 32)"
+        )
+        self.parser.add_option(
+            "--iterations", dest="iterations", type="int", default=100,
+            help="lock operations per worker (default: 100)"
+        )
+        self.parser.add_option(
+            "--readers", dest="readers", type="float", default=0.5,
+            help="fraction of operations using a read lock (default: 0.5)"
+        )
+        self.parser.add_option(
+            "--hold", dest="hold", type="float", default=0.001,
+            help="seconds a lock is held (default: 0.001)"
+        )
+        self.parser.add_option(
+            "--modes", dest="modes", default="dir,flock",
+            help="lock modes to compare (default: dir,flock)"
+        )
+        self.parser.add_option(
+            "--dir", dest="lock_dir", default=None,
+            help="directory for the locks (default: a temporary one)"
+        )
+
+    def mainloop(self):
+        if not hasattr(os, 'fork'):
+            fatal("This benchmark needs os.fork.")
+        options = self.options
+        base_dir = options.lock_dir or tempfile.mkdtemp('', 'moin-lockbench-')
+        try:
+            print "%d workers x %d operations, %d%% read locks, locks held for %.4fs" % (
+                options.workers, options.iterations, int(options.readers * 100), options.hold)
+            print "%-6s %10s %10s %12s %12s %8s" % ('mode', 'total [s]', 'ops/s', 'avg wait [s]', 'max wait [s]', 'check')
+            for mode in options.modes.split(','):
+                mode_dir = os.path.join(base_dir, mode)
+                os.makedirs(mode_dir)
+                result = run_benchmark(mode, mode_dir, options.workers, options.iterations,
+                                       options.readers, options.hold)
+                print "%-6s %10.3f %10.1f %12.5f %12.5f %8s" % ((mode, ) + result)
+        finally:
+            if not options.lock_dir:
+                shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def run_benchmark(mode, base_dir, workers, iterations, readers, hold):
+    """ Run the benchmark for one lock mode
+
+    @return: (total time, operations per second, average wait, maximum wait,
+              'ok' or 'FAILED' (result of the lost update check))
+    """
+    lock_dir = os.path.join(base_dir, 'lock')
+    counter = os.path.join(base_dir, 'counter')
+    file(counter, 'w').write('0')
+    ReadLock, WriteLock = lock.getLockClasses(mode)
+    r, w = os.pipe()
+    start = time.time()
+    pids = []
+    for i in range(workers):
+        pid = os.fork()
+        if not pid:
+            try:
+                os.close(r)
+                result = worker(ReadLock, WriteLock, lock_dir, counter, iterations, readers, hold)
+                os.write(w, '%d %f %f\n' % result)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(w)
+    results = os.fdopen(r).read().splitlines()
+    for pid in pids:
+        os.waitpid(pid, 0)
+    total = time.time() - start
+
+    writes = 0
+    wait_sum = wait_max = 0.0
+    for line in results:
+        worker_writes, worker_wait_sum, worker_wait_max = line.split()
+        writes += int(worker_writes)
+        wait_sum += float(worker_wait_sum)
+        wait_max = max(wait_max, float(worker_wait_max))
+    ok = len(results) == workers and int(file(counter).read()) == writes
+    operations = workers * iterations
+    return total, operations / total, wait_sum / operations, wait_max, ok and 'ok' or 'FAILED'
+
+
+def worker(ReadLock, WriteLock, lock_dir, counter, iterations, readers, hold):
+    """ Do the lock operations of one worker process
+
+    @return: (number of counter increments, sum of wait times, max. wait time)
+    """
+    random.seed()
+    writes = 0
+    wait_sum = wait_max = 0.0
+    for i in range(iterations):
+        write = random.random() >= readers
+        if write:
+            the_lock = WriteLock(lock_dir, 60.0)
+        else:
+            the_lock = ReadLock(lock_dir, 60.0)
+        t = time.time()
+        if not the_lock.acquire(60.0):
+            sys.stderr.write("could not acquire lock\n")
+            continue
+        wait = time.time() - t
+        wait_sum += wait
+        wait_max = max(wait_max, wait)
+        try:
+            if write:
+                value = int(file(counter).read())
+                time.sleep(hold)
+                file(counter, 'w').write(str(value + 1))
+                writes += 1
+            else:
+                time.sleep(hold)
+        finally:
+            the_lock.release()
+    return writes, wait_sum, wait_max
@@ -0,0 +1,61 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.script.maint.makecache Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching
+from MoinMoin.Page import Page
+from MoinMoin.logfile import eventlog
+from MoinMoin.script.maint import makecache
+from MoinMoin.stats import rollup
+from MoinMoin._tests import become_trusted, create_page, nuke_page, nuke_eventlog
+
+
+class TestMakeCache:
+    """ makecache: cache warming """
+    pagename = u'MakeCacheTestPage'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def testWarmPage(self):
+        request = self.request
+        create_page(request, self.pagename, u'FrontPage')
+        page = Page(request, self.pagename)
+        caching.CacheEntry(request, page, 'pagelinks', scope='item').remove()
+        caching.CacheEntry(request, page, 'text_html', scope='item').remove()
+        assert not makecache.cache_is_fresh(request, page)
+        assert makecache.warm_page(request, self.pagename) is True
+        assert caching.CacheEntry(request, page, 'pagelinks', scope='item').exists()
+        assert caching.CacheEntry(request, page, 'text_html', scope='item').exists()
+        assert makecache.cache_is_fresh(request, page)
+        assert makecache.warm_page(request, self.pagename) is False
+
+
+class TestOrderPages:
+    """ makecache: popular pages first """
+
+    def setup_method(self, method):
+        nuke_eventlog(self.request)
+        self.request.cfg.cache.hit_rollup = rollup.HitRollup()
+
+    def teardown_method(self, method):
+        nuke_eventlog(self.request)
+        caching.CacheEntry(self.request, 'charts', 'rollup', scope='wiki').remove()
+        del self.request.cfg.cache.hit_rollup
+
+    def testOrder(self):
+        elog = eventlog.EventLog(self.request)
+        for pagename in [u'RecentChanges', u'WikiSandBox', u'WikiSandBox']:
+            elog.add(self.request, 'VIEWPAGE', {'pagename': pagename}, add_http_info=0)
+        pages = [u'FrontPage', u'RecentChanges', u'AbcPage', u'WikiSandBox']
+        assert makecache.order_pages(self.request, pages) == [
+            u'WikiSandBox', u'RecentChanges', u'AbcPage', u'FrontPage']
+
+coverage_modules = ['MoinMoin.script.maint.makecache']
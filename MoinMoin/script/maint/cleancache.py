@@ -7,7 +7,7 @@ MoinMoin - cleancache script
 @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import caching, i18n, user
+from MoinMoin import caching, diffcache, i18n, user
 from MoinMoin.Page import Page
 from MoinMoin.script import MoinScript
 
@@ -49,15 +49,23 @@ General syntax: moin [options] maint cleancache
             arena = Page(request, pagename)
             for key in keys:
                 caching.CacheEntry(request, arena, key, scope='item').remove()
+            diffcache.remove_diffs(request, arena)
 
         # clean wiki scope cache entries
         arena_key_list = [
             ('charts', 'hitcounts'),
             ('charts', 'pagehits'),
             ('charts', 'useragents'),
+            ('charts', 'rollup'),
+            ('pagelists', 'index'),
+            ('pagelists', 'linkgraph'),
         ]
         for arena, key in arena_key_list:
             caching.CacheEntry(request, arena, key, scope='wiki').remove()
+        # delta logs of the hit rollup
+        for key in caching.get_cache_list(request, 'charts', 'wiki'):
+            if key.startswith('rollup.'):
+                caching.CacheEntry(request, 'charts', key, scope='wiki').remove()
 
         # clean dict and groups related cache
         arena_scope_list =  [('pagedicts', 'wiki'),
@@ -76,5 +84,7 @@ General syntax: moin [options] maint cleancache
         # clean language cache files
         caching.CacheEntry(request, 'i18n', 'meta', scope='wiki').remove()
         wiki_languages = i18n.wikiLanguages().keys()
-        for key in wiki_languages:
-            caching.CacheEntry(request, 'i18n', key, scope='wiki').remove()
+        for key in caching.get_cache_list(request, 'i18n', 'wiki'):
+            # compiled catalogs (and pickled languages of older versions)
+            if key.endswith('.catalog') or key in wiki_languages:
+                caching.CacheEntry(request, 'i18n', key, scope='wiki').remove()
@@ -0,0 +1,48 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - hitrollup script
+
+@copyright: 2026 MoinMoin contributors
+@license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.script import MoinScript
+from MoinMoin.stats import rollup
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script rebuilds the hit rollup (the view/edit and user agent counters
+used by the PageHits, Hits and StatsChart macros) from the complete
+event-log in data/event-log.
+
+The wiki keeps the rollup up-to-date itself, reading only new events. You
+only need this for a big event-log without a rollup yet (e.g. after
+upgrading or after "maint cleancache"), so the first page using the
+statistics does not have to read all of it.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] maint hitrollup [hitrollup-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[hitrollup-options] see below:
+    --processes=N   read the event-log with N processes in parallel (default: 1)
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+
+        self.parser.add_option(
+            "--processes", metavar="N", dest="processes", type="int", default=1,
+            help="read the event-log with N processes in parallel (default: 1)"
+        )
+
+    def mainloop(self):
+        self.init_request()
+        request = self.request
+        rollup.get_rollup(request).rebuild(request, processes=self.options.processes)
+
@@ -2,14 +2,98 @@
 """
 MoinMoin - makecache script
 
-@copyright: 2008 MoinMoin:ReimarBauer
+@copyright: 2008 MoinMoin:ReimarBauer,
+            2026 MoinMoin contributors
 @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import caching
+import time
+
+from MoinMoin import caching, config, linkgraph, wikiutil
 from MoinMoin.Page import Page
-from MoinMoin.script import MoinScript
-from MoinMoin.stats import hitcounts
+from MoinMoin.script import MoinScript, log
+from MoinMoin.stats import rollup
+
+# pages viewed most often during that many days are done first
+POPULARITY_DAYS = 30
+
+# save the names of the pages done after that many pages
+CHECKPOINT_INTERVAL = 100
+
+# report progress every that many seconds
+REPORT_INTERVAL = 30.0
+
+
+def cache_is_fresh(request, page):
+    """ Are the caches of a page (pagelinks and text_html, if the page can
+        use it) up-to-date?
+    """
+    text_filename = page._text_filename()
+    if caching.CacheEntry(request, page, 'pagelinks', scope='item').needsUpdate(text_filename):
+        return False
+    if 'text_html' not in request.cfg.caching_formats:
+        return True
+    try:
+        Parser = wikiutil.searchAndImportPlugin(request.cfg, "parser", page.pi['format'])
+    except wikiutil.PluginMissingError:
+        return True
+    if not getattr(Parser, 'caching', False):
+        return True # there never will be a text_html cache
+    attachments = page.getPagePath('attachments', check_create=0)
+    cache = caching.CacheEntry(request, page, 'text_html', scope='item')
+    return not cache.needsUpdate(text_filename, attachments)
+
+
+class Null:
+    def write(self, data):
+        pass
+
+
+def warm_page(request, pagename):
+    """ Render a page to fill its caches, unless they are up-to-date
+
+    @param pagename: name of the page
+    @return: True if the page was rendered, False if its caches were fresh,
+             None if rendering failed
+    """
+    page = Page(request, pagename)
+    request.page = page
+    try:
+        if cache_is_fresh(request, page):
+            return False
+        request.redirect(Null())
+        try:
+            page.send_page(content_only=1) # fills text_html and pagelinks
+        finally:
+            request.redirect()
+        page.getPageLinks(request) # in case rendering did not cache them
+        return True
+    except Exception, err:
+        log("Rendering %s failed: %s" % (pagename.encode(config.charset), err))
+        return None
+
+
+def order_pages(request, pagenames, days=POPULARITY_DAYS):
+    """ Sort page names by recent popularity (most views first, then by name)
+
+    @param days: count the views of that many recent days (see HitRollup.page_views)
+    """
+    views = rollup.get_rollup(request).page_views(request, days)
+    return sorted(pagenames, key=lambda pagename: (-views.get(pagename, 0), pagename))
+
+
+# the request of a worker process, see _init_worker
+_worker_request = None
+
+def _init_worker(url, pagename):
+    global _worker_request
+    from MoinMoin.web.contexts import ScriptContext
+    _worker_request = ScriptContext(url, pagename)
+
+def _warm_page(pagename):
+    """ warm_page for a multiprocessing pool """
+    return pagename, warm_page(_worker_request, pagename)
+
 
 class PluginScript(MoinScript):
     """\
@@ -22,27 +106,97 @@ You will usually do this after changing MoinMoin code and calling "maint cleanca
 version, installing or removing macros.
 
 text_html is the name of the cache file used for compiled pages formatted
-by the wiki text to html formatter.
+by the wiki text to html formatter, pagelinks lists the links of a page.
+
+Pages whose caches are up-to-date are skipped, the others are rendered,
+the ones viewed most during the last days first. The script remembers
+which pages it did, so if it gets interrupted, running it again continues
+where it stopped. Finally, the link graph (used for backlinks, orphaned and
+wanted pages) is built from the pagelinks caches.
 
 Detailed Instructions:
 ======================
-General syntax: moin [options] maint makecache
+General syntax: moin [options] maint makecache [makecache-options]
 
 [options] usually should be:
     --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[makecache-options] see below:
+    --processes=N   render pages with N processes in parallel (default: 1)
+    --restart       do all pages again, even if a previous run was interrupted
 """
 
     def __init__(self, argv, def_values):
         MoinScript.__init__(self, argv, def_values)
 
+        self.parser.add_option(
+            "--processes", metavar="N", dest="processes", type="int", default=1,
+            help="render pages with N processes in parallel (default: 1)"
+        )
+        self.parser.add_option(
+            "--restart", dest="restart", action="store_true", default=False,
+            help="do all pages again, even if a previous run was interrupted"
+        )
+
     def mainloop(self):
         self.init_request()
         request = self.request
 
-        # make cache related to pagelinks entries of a page
+        checkpoint = caching.CacheEntry(request, 'makecache', 'checkpoint', scope='wiki', use_pickle=True)
+        done = set()
+        if self.options.restart:
+            checkpoint.remove()
+        elif checkpoint.exists():
+            try:
+                done = set(checkpoint.content())
+                log("Continuing an interrupted run, %d pages were done already." % len(done))
+            except caching.CacheError:
+                pass
+
         pages = request.rootpage.getPageList(user='', exists=1)
-        for pagename in pages:
-            page = Page(request, pagename)
-            request.page = page
-            p = page.getPageLinks(request)
+        todo = order_pages(request, [pagename for pagename in pages if pagename not in done])
+
+        processes = self.options.processes
+        pool = None
+        if processes > 1 and len(todo) > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes, _init_worker,
+                                        (self.options.wiki_url or None, self.options.page))
+            results = pool.imap_unordered(_warm_page, todo)
+        else:
+            results = ((pagename, warm_page(request, pagename)) for pagename in todo)
+
+        start = last_report = time.time()
+        counts = {True: 0, False: 0, None: 0} # rendered, fresh, failed
+        try:
+            for pagename, rendered in results:
+                done.add(pagename)
+                counts[rendered] += 1
+                if sum(counts.values()) % CHECKPOINT_INTERVAL == 0:
+                    checkpoint.update(done)
+                now = time.time()
+                if now - last_report >= REPORT_INTERVAL:
+                    self.report(counts, len(todo), now - start)
+                    last_report = now
+        except:
+            # e.g. KeyboardInterrupt, remember what we did for the next run
+            if pool is not None:
+                pool.terminate()
+            checkpoint.update(done)
+            raise
+        if pool is not None:
+            pool.close()
+            pool.join()
+        checkpoint.remove()
+        self.report(counts, len(todo), time.time() - start)
+
+        start = time.time()
+        linkgraph.get_linkgraph(request).rebuild(request)
+        log("Link graph built in %.1fs." % (time.time() - start))
 
+    def report(self, counts, total, seconds):
+        """ Log progress and throughput """
+        count = sum(counts.values())
+        log("%d of %d pages in %.1fs (%.1f pages/s): %d rendered, %d up-to-date, %d failed" % (
+            count, total, seconds, count / max(seconds, 0.001),
+            counts[True], counts[False], counts[None]))
@@ -57,7 +57,7 @@ General syntax: moin [options] migration data [migration-data-options]
         meta_fname = os.path.join(data_dir, 'meta')
         while True:
             try:
-                meta = wikiutil.MetaDict(meta_fname, request.cfg.cache_dir)
+                meta = wikiutil.MetaDict(meta_fname, request.cfg.cache_dir, request.cfg.lock_mode)
                 try:
                     curr_rev = meta['data_format_revision']
                     mig_name = str(curr_rev)
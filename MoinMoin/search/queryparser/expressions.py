@@ -16,7 +16,7 @@ import re
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
-from MoinMoin import config, wikiutil
+from MoinMoin import config, linkgraph, wikiutil
 from MoinMoin.search.results import Match, TitleMatch, TextMatch
 
 try:
@@ -461,6 +461,7 @@ class LinkSearch(BaseFieldSearch):
 
         self._textpattern = '(' + pattern.replace('/', '|') + ')' # used for search in text
         self.textsearch = TextSearch(self._textpattern, use_re=True, case=case)
+        self._linking = None # (backlinks of the link graph, linking pages)
 
     def highlight_re(self):
         if not self.highlight:
@@ -468,16 +469,37 @@ class LinkSearch(BaseFieldSearch):
 
         return u"(%s)" % self._textpattern
 
+    def _linking_pages(self, request):
+        """ Return the names of the pages linking to a page matching the
+            pattern (set), looked up in the link graph (once per search),
+            or None if the link graph does not exist yet
+        """
+        graph = linkgraph.get_linkgraph(request)
+        backlinks = graph.backlinks
+        if self._linking is None or self._linking[0] is not backlinks:
+            sources = graph.linking_to(request, self.search_re.match)
+            if sources is None:
+                return None
+            # the graph might have been updated by linking_to
+            self._linking = (graph.backlinks, sources)
+        return self._linking[1]
+
     def _get_matches(self, page):
         # Get matches in page links
         matches = []
 
-        # XXX in python 2.5 any() may be used.
         found = False
-        for link in page.getPageLinks(page.request):
-            if self.search_re.match(link):
-                found = True
-                break
+        linking = None
+        if not page.rev:
+            linking = self._linking_pages(page.request)
+        if linking is not None:
+            found = page.page_name in linking
+        else:
+            # XXX in python 2.5 any() may be used.
+            for link in page.getPageLinks(page.request):
+                if self.search_re.match(link):
+                    found = True
+                    break
 
         if found:
             # Search in page text
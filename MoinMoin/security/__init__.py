@@ -28,6 +28,42 @@ from MoinMoin.Page import Page
 ### Basic Permissions Interface -- most features enabled by default
 #############################################################################
 
+def _hierarchic_acl(request, pagename):
+    """ Return the effective ACL of <pagename> for cfg.acl_hierarchic=True
+
+    This is the ACL of the first page with an ACL in the page hierarchy,
+    starting at the leaf and going to the root, or None if no page in the
+    hierarchy has an ACL. If the item has an acl (even one that doesn't match)
+    we *do not* check the parents. We only check the parents if there's no
+    acl on the item at all.
+
+    The result is cached across requests in request.cfg.cache.acl, which
+    forgets a page's entry when the page or one of its parent pages shows up
+    in the edit-log (see MoinMoin.Page.ItemCache).
+
+    @param request: the current request object
+    @param pagename: pagename to get the effective acl for
+    @rtype: MoinMoin.security.AccessControlList
+    @return: effective acl of the page or None
+    """
+    cache = request.cfg.cache.acl
+    cache_data = cache.getItem(request, pagename, 'effective')
+    if cache_data is not None:
+        return cache_data[0]
+    acl = None
+    pages = pagename.split('/') # create page hierarchy list
+    for i in range(len(pages), 0, -1):
+        # Create the next pagename in the hierarchy
+        # starting at the leaf, going to the root
+        name = '/'.join(pages[:i])
+        page_acl = Page(request, name).getACL(request)
+        if page_acl.acl:
+            acl = page_acl
+            break
+    cache.putItem(request, pagename, 'effective', (acl, ))
+    return acl
+
+
 def _check(request, pagename, username, right):
     """ Check <right> access permission for user <username> on page <pagename>
 
@@ -56,24 +92,12 @@ def _check(request, pagename, username, right):
         return allowed
 
     if request.cfg.acl_hierarchic:
-        pages = pagename.split('/') # create page hierarchy list
-        some_acl = False
-        for i in range(len(pages), 0, -1):
-            # Create the next pagename in the hierarchy
-            # starting at the leaf, going to the root
-            name = '/'.join(pages[:i])
-            # Get page acl and ask for permission
-            acl = Page(request, name).getACL(request)
-            if acl.acl:
-                some_acl = True
-                allowed = acl.may(request, username, right)
-                if allowed is not None:
-                    return allowed
-                # If the item has an acl (even one that doesn't match) we *do not*
-                # check the parents. We only check the parents if there's no acl on
-                # the item at all.
-                break
-        if not some_acl:
+        acl = _hierarchic_acl(request, pagename)
+        if acl is not None:
+            allowed = acl.may(request, username, right)
+            if allowed is not None:
+                return allowed
+        else:
             allowed = cache.acl_rights_default.may(request, username, right)
             if allowed is not None:
                 return allowed
@@ -94,6 +118,102 @@ def _check(request, pagename, username, right):
     return False
 
 
+class BatchCheck:
+    """ Check one right of one user for many pages (e.g. a complete page list).
+
+    This gives the same results as _check, but it takes the page ACLs from the
+    page list index (see MoinMoin.Page.PageListIndex) instead of creating a
+    Page object for every page, and it evaluates every distinct ACL only once
+    (usually most pages have no ACL and just share the default result).
+    """
+    def __init__(self, request, username, right, pages):
+        """
+        @param request: the current request object
+        @param username: the user name
+        @param right: the right to check
+        @param pages: page list index dict {pagename: (underlay, exists, rev, acl_lines)}
+        """
+        self.request = request
+        self.username = username
+        self.right = right
+        self.pages = pages
+        self.before = request.cfg.cache.acl_rights_before.may(request, username, right)
+        self._results = {} # acl_lines -> bool
+        self._acls = {} # pagename -> AccessControlList (for hierarchic mode)
+
+    def _acl_lines(self, pagename):
+        """ Return the acl_lines of some page, from the index if possible """
+        status = self.pages.get(pagename)
+        if status is not None and status[1]: # existing page
+            return status[3]
+        # non-existing or deleted page, use the ACL of the last revision
+        return Page(self.request, pagename).getACL(self.request).acl_lines
+
+    def _result(self, acl_lines):
+        """ Return the final result of _check for a page with those acl_lines
+            (None means no ACL on the page, so acl_rights_default is used).
+        """
+        try:
+            return self._results[acl_lines]
+        except KeyError:
+            request = self.request
+            allowed = AccessControlList(request.cfg, acl_lines or []).may(request, self.username, self.right)
+            if allowed is None:
+                allowed = request.cfg.cache.acl_rights_after.may(request, self.username, self.right)
+            result = bool(allowed)
+            self._results[acl_lines] = result
+            return result
+
+    def _hierarchic_acl_lines(self, pagename):
+        """ Return the acl_lines of the first page with an ACL in the page hierarchy
+            of pagename (starting at the leaf), or None if there is none.
+        """
+        pages = pagename.split('/')
+        for i in range(len(pages), 0, -1):
+            name = '/'.join(pages[:i])
+            try:
+                acl = self._acls[name]
+            except KeyError:
+                acl = self._acls[name] = AccessControlList(self.request.cfg, self._acl_lines(name) or [])
+            if acl.acl:
+                return tuple(acl.acl_lines)
+        return None
+
+    def may(self, pagename):
+        """ May the user do <right> on page <pagename>? """
+        if self.before is not None:
+            return self.before
+        if self.request.cfg.acl_hierarchic:
+            acl_lines = self._hierarchic_acl_lines(pagename)
+        else:
+            acl_lines = self._acl_lines(pagename)
+            if acl_lines is not None:
+                acl_lines = tuple(acl_lines)
+        return self._result(acl_lines)
+
+
+def batch_checker(request, user, right, pages):
+    """ Return a function checking <right> of <user> for a page name,
+        optimized for checking many pages (see BatchCheck).
+
+    If the configured security policy overrides this right, we need to ask
+    the policy about each single page.
+
+    @param request: the current request object
+    @param user: the user (MoinMoin.user.User)
+    @param right: the right to check
+    @param pages: page list index dict, see MoinMoin.Page.PageListIndex
+    @rtype: function
+    @return: checking function for that right, accepting a pagename
+    """
+    policy = user.may
+    policy_class = policy.__class__
+    if (getattr(policy_class, right, None) is not None or
+        getattr(policy_class, '__getattr__', None) != Permissions.__getattr__):
+        return getattr(policy, right)
+    return BatchCheck(request, policy.name, right, pages).may
+
+
 class Permissions:
     """ Basic interface for user permissions and system policy.
 
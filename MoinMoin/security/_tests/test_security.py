@@ -391,4 +391,36 @@ class TestPageAcls(object):
             for right in mayNot:
                 yield _not_have_right, u, right, pagename, hierarchic
 
+    def testBatchCheck(self):
+        """ security: batch checks give the same results as single page checks """
+        self.request.rootpage.getPageList(user='') # make sure the index is up-to-date
+        pages = self.request.cfg.cache.pagelists.getItem(self.request, 'all', None).pages
+        pagenames = [page_name for page_name, dummy in self.pages] + [u'AclTestMainPage/NonExisting']
+        for hierarchic in (False, True):
+            self.request.cfg.acl_hierarchic = hierarchic
+            for username in (u'WikiAdmin', u'AnyUser', u'JaneDoe', u'JoeDoe'):
+                u = User(self.request, auth_username=username)
+                u.valid = True
+                for right in self.request.cfg.acl_rights_valid:
+                    may = security.batch_checker(self.request, u, right, pages)
+                    for pagename in pagenames:
+                        assert may(pagename) == u.may.__getattr__(right)(pagename)
+
+    def testHierarchicACLCache(self):
+        """ security: cached hierarchic acls follow acl changes of parent pages """
+        self.request.cfg.acl_hierarchic = True
+        u = User(self.request, auth_username=u'JoeDoe')
+        u.valid = True
+        pagename = self.subpage_name + u'/SubSubPage'
+        assert not u.may.read(pagename) # by inherited acl from main page
+        assert self.request.cfg.cache.acl.getItem(self.request, pagename, 'effective') is not None
+        create_page(self.request, self.mainpage_name, u"#acl JoeDoe:read\nFoo!")
+        try:
+            assert self.request.cfg.cache.acl.getItem(self.request, pagename, 'effective') is None
+            assert u.may.read(pagename)
+            assert not u.may.write(pagename)
+        finally:
+            create_page(self.request, self.mainpage_name, self.pages[0][1])
+        assert not u.may.read(pagename)
+
 coverage_modules = ['MoinMoin.security']
@@ -0,0 +1,212 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.stats.rollup Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+
+from MoinMoin import caching
+from MoinMoin.logfile import eventlog
+from MoinMoin.stats import rollup
+from MoinMoin._tests import nuke_eventlog
+
+DAY = 86400 * 1000000 # usecs
+
+
+class TestHitRollup:
+    """ stats: hit rollup """
+
+    def setup_method(self, method):
+        nuke_eventlog(self.request)
+        self.remove_cache()
+        self.request.cfg.cache.hit_rollup = rollup.HitRollup()
+        self.filename = self.request.rootpage.getPagePath('event-log', isfile=1)
+
+    def teardown_method(self, method):
+        nuke_eventlog(self.request)
+        self.remove_cache()
+        del self.request.cfg.cache.hit_rollup
+
+    def remove_cache(self):
+        request = self.request
+        caching.CacheEntry(request, 'charts', 'rollup', scope='wiki').remove()
+        for key in caching.get_cache_list(request, 'charts', 'wiki'):
+            if key.startswith('rollup.'):
+                caching.CacheEntry(request, 'charts', key, scope='wiki').remove()
+
+    def log(self, eventtype, pagename, mtime_usecs, ua=None):
+        data = {'pagename': pagename}
+        if ua:
+            data['HTTP_USER_AGENT'] = ua
+        eventlog.EventLog(self.request).add(self.request, eventtype, data, add_http_info=0,
+                                            mtime_usecs=mtime_usecs)
+
+    def testIncremental(self):
+        start = 1300000000 * 1000000
+        self.log('VIEWPAGE', u'FrontPage', start, 'Mozilla/5.0 (X11; Linux)')
+        self.log('SAVEPAGE', u'FrontPage', start + 1)
+        self.log('VIEWPAGE', u'WikiSandBox', start + 2 * DAY,
+                 'Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1)')
+        hits = rollup.get_rollup(self.request)
+        days, views, edits = hits.daily(self.request)
+        assert days == ['2011-03-13', '2011-03-14', '2011-03-15']
+        assert views == [1, 0, 1]
+        assert edits == [1, 0, 0]
+        assert hits.daily(self.request, u'FrontPage') == (['2011-03-13'], [1], [1])
+        assert hits.useragents(self.request) == [(1, 'Mozilla/5.0'), (1, 'MSIE 6.0')]
+
+        pos = hits.pos
+        assert pos == os.path.getsize(self.filename)
+        self.log('VIEWPAGE', u'FrontPage', start + 2 * DAY)
+        assert hits.page_views(self.request) == {u'FrontPage': 2, u'WikiSandBox': 1}
+        assert hits.pos > pos
+
+    def testIncompleteLine(self):
+        self.log('VIEWPAGE', u'FrontPage', 1300000000 * 1000000)
+        f = file(self.filename, 'ab')
+        f.write('1300000001000000\tVIEWPAGE\tpagename=Front')
+        f.close()
+        hits = rollup.get_rollup(self.request)
+        assert hits.page_views(self.request) == {u'FrontPage': 1}
+        f = file(self.filename, 'ab')
+        f.write('Page\n')
+        f.close()
+        assert hits.page_views(self.request) == {u'FrontPage': 2}
+
+    def testOtherProcess(self):
+        self.log('VIEWPAGE', u'FrontPage', 1300000000 * 1000000)
+        assert rollup.get_rollup(self.request).page_views(self.request) == {u'FrontPage': 1}
+        other = rollup.HitRollup()
+        other._update(self.request)
+        assert other.pos == os.path.getsize(self.filename) # continued from the on-disk cache
+        assert other.page_views(self.request) == {u'FrontPage': 1}
+
+    def testDeltaLog(self):
+        """ stats: updates are appended to the delta log, not saved as snapshots """
+        start = 1300000000 * 1000000
+        self.log('VIEWPAGE', u'FrontPage', start)
+        hits = rollup.get_rollup(self.request)
+        assert hits.page_views(self.request) == {u'FrontPage': 1}
+        cache = hits._cache(self.request)
+        uid = cache.uid()
+        log_filename = hits._log_filename(self.request, hits.log_id)
+        other = rollup.HitRollup()
+        other._update(self.request)
+        for i in range(3):
+            self.log('VIEWPAGE', u'WikiSandBox', start + i)
+            assert hits.page_views(self.request) == {u'FrontPage': 1, u'WikiSandBox': i + 1}
+        assert cache.uid() == uid
+        assert os.path.getsize(log_filename) > 0
+        # another process applies the deltas, counting from its own position
+        # (and does not count the events again)
+        other._update(self.request)
+        assert other.page_views(self.request) == {u'FrontPage': 1, u'WikiSandBox': 3}
+        assert other.pos == hits.pos == os.path.getsize(self.filename)
+        # the same for a process starting from the snapshot
+        other = rollup.HitRollup()
+        other._update(self.request)
+        assert other.page_views(self.request) == {u'FrontPage': 1, u'WikiSandBox': 3}
+
+    def testCompaction(self):
+        """ stats: a big delta log is replaced by a new snapshot """
+        old_max_size = rollup.LOG_MAX_SIZE
+        rollup.LOG_MAX_SIZE = 0
+        try:
+            self.log('VIEWPAGE', u'FrontPage', 1300000000 * 1000000)
+            hits = rollup.get_rollup(self.request)
+            hits.page_views(self.request)
+            log_filename = hits._log_filename(self.request, hits.log_id)
+            self.log('VIEWPAGE', u'FrontPage', 1300000001 * 1000000)
+            assert hits.page_views(self.request) == {u'FrontPage': 2}
+            assert not os.path.exists(log_filename)
+            assert os.path.getsize(hits._log_filename(self.request, hits.log_id)) == 0
+            other = rollup.HitRollup()
+            other._update(self.request)
+            assert other.page_views(self.request) == {u'FrontPage': 2}
+        finally:
+            rollup.LOG_MAX_SIZE = old_max_size
+
+    def testNewEventLog(self):
+        self.log('VIEWPAGE', u'FrontPage', 1300000000 * 1000000)
+        self.log('VIEWPAGE', u'FrontPage', 1300000001 * 1000000)
+        hits = rollup.get_rollup(self.request)
+        assert hits.page_views(self.request) == {u'FrontPage': 2}
+        nuke_eventlog(self.request)
+        self.log('VIEWPAGE', u'RecentChanges', 1300000002 * 1000000)
+        self.log('VIEWPAGE', u'RecentChanges', 1300000003 * 1000000)
+        self.log('VIEWPAGE', u'RecentChanges', 1300000004 * 1000000)
+        assert hits.page_views(self.request) == {u'RecentChanges': 3}
+
+    def testRotation(self):
+        start = 1300000000 * 1000000
+        self.log('VIEWPAGE', u'FrontPage', start)
+        self.log('VIEWPAGE', u'FrontPage', start + 1)
+        hits = rollup.get_rollup(self.request)
+        assert hits.page_views(self.request) == {u'FrontPage': 2}
+        self.log('VIEWPAGE', u'FrontPage', start + 2) # not counted yet when rotated
+        eventlog.EventLog(self.request).rotate()
+        assert hits.page_views(self.request) == {u'FrontPage': 3}
+        self.log('VIEWPAGE', u'WikiSandBox', start + 3)
+        eventlog.EventLog(self.request).rotate('bz2')
+        self.log('VIEWPAGE', u'WikiSandBox', start + 4)
+        assert hits.page_views(self.request) == {u'FrontPage': 3, u'WikiSandBox': 2}
+        # counting from scratch includes the segments
+        self.remove_cache()
+        assert rollup.HitRollup().page_views(self.request) == {u'FrontPage': 3, u'WikiSandBox': 2}
+        rebuilt = rollup.HitRollup()
+        rebuilt.rebuild(self.request, processes=2)
+        assert rebuilt.page_views(self.request) == {u'FrontPage': 3, u'WikiSandBox': 2}
+
+    def testRotateOnAdd(self):
+        cfg = self.request.cfg
+        cfg.log_events_rotate_size = 80 # two lines
+        try:
+            for i in range(5):
+                self.log('VIEWPAGE', u'FrontPage', 1300000000 * 1000000 + i)
+        finally:
+            del cfg.log_events_rotate_size
+        elog = eventlog.EventLog(self.request)
+        assert len(elog.segments.segments()) == 2
+        assert len(list(elog.entries())) == 5
+        assert rollup.get_rollup(self.request).page_views(self.request) == {u'FrontPage': 5}
+
+    def testRebuild(self):
+        start = 1300000000 * 1000000
+        for i in range(50):
+            self.log(i % 5 and 'VIEWPAGE' or 'SAVEPAGE', u'Page%d' % (i % 3), start + i * DAY / 4)
+        expected = rollup.get_rollup(self.request).daily(self.request)
+        for processes in (1, 3):
+            hits = rollup.HitRollup()
+            hits.rebuild(self.request, processes=processes)
+            assert hits.pos == os.path.getsize(self.filename)
+            assert hits.daily(self.request) == expected
+            assert hits.daily(self.request, u'Page1') == rollup.get_rollup(self.request).daily(self.request, u'Page1')
+
+
+def test_count_events_chunks():
+    """ stats: counting event-log chunks does not count lines twice """
+    import tempfile
+    fd, filename = tempfile.mkstemp()
+    try:
+        lines = ['%d\tVIEWPAGE\tpagename=Page%d\n' % (1300000000000000 + i, i) for i in range(10)]
+        os.write(fd, ''.join(lines))
+        os.close(fd)
+        size = os.path.getsize(filename)
+        total = 0
+        start = 0
+        for end in (7, 40, 41, 100, None):
+            counters, pos = rollup.count_events(filename, start, end)
+            total += sum([counts[0] for counts in counters.days.values()])
+            assert end is None or pos >= end
+            start = end
+        assert total == 10
+        counters, pos = rollup.count_events(filename)
+        assert pos == size
+        assert sorted(counters.pages) == [u'Page%d' % i for i in range(10)]
+    finally:
+        os.remove(filename)
+
+coverage_modules = ['MoinMoin.stats.rollup']
@@ -0,0 +1,499 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - Hit count rollup
+
+    The page hit and user agent statistics (PageHits macro, StatsChart
+    hitcounts and useragents) are all computed from the VIEWPAGE and SAVEPAGE
+    events in the global event-log. Instead of scanning the event-log again
+    for every one of them, HitRollup keeps per day and per page view/edit
+    counters and user agent counters, together with the event-log position
+    up to which events were counted. When queried, it only reads the events
+    appended to the event-log since then (and the segments the event-log was
+    rotated into meanwhile, see MoinMoin.logfile.segments).
+
+    The rollup is kept in memory (request.cfg.cache.hit_rollup) and on disk,
+    so other processes can continue from there: a snapshot of all counters
+    (cache arena 'charts', key 'rollup') and a delta log next to it
+    (rollup.<log id>.log), to which every update appends a record with just
+    the counts of the newly counted events and the event-log positions it
+    counted from and up to. Other processes apply the records continuing
+    from their own position (so events counted by two processes at the same
+    time are not added twice). When the delta log gets bigger than
+    LOG_MAX_SIZE, a new snapshot with a new delta log is written.
+    "moin maint hitrollup" rebuilds the rollup from the complete event-log,
+    using several processes.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import time
+import datetime
+import errno
+import struct
+import threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching, config, wikiutil
+from MoinMoin.logfile import eventlog
+from MoinMoin.logfile.segments import SegmentManifest, open_log
+from MoinMoin.util import pickle, PICKLE_PROTOCOL
+
+# this is a CONSTANT used for on-disk caching, it must NOT be configurable and
+# not depend on request.user!
+DATE_FMT = '%04d-%02d-%02d' # % (y, m, d)
+
+# the event types we count
+VIEW, EDIT = 'VIEWPAGE', 'SAVEPAGE'
+
+# bytes of the first line of the event-log we remember, to notice if the
+# event-log was replaced by a new one
+HEAD_SIZE = 100
+
+# increase this if the on-disk format changes
+FORMAT_VERSION = 3
+
+# delta log records: length of the pickled data, pickled data
+RECORD_HEADER = '<I'
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER)
+
+# write a new snapshot if the delta log gets bigger than that [bytes]
+LOG_MAX_SIZE = 256 * 1024
+
+
+def agent_type(ua):
+    """ Return the user agent type we count for an User-Agent header """
+    try:
+        pos = ua.index(" (compatible; ")
+        return ua[pos:].split(';')[1].strip()
+    except ValueError:
+        return ua.split()[0]
+
+
+class Counters:
+    """ View/edit counters per day and page and user agent counters
+
+    Days are stored as date ordinals (UTC), the values are [views, edits].
+    """
+    def __init__(self):
+        self.days = {} # day -> [views, edits]
+        self.pages = {} # pagename -> {day -> [views, edits]}
+        self.useragents = {} # user agent type -> count
+
+    def add(self, time_usecs, eventtype, values):
+        """ Count an event """
+        field = eventtype == EDIT and 1 or 0
+        day = datetime.date(*time.gmtime(wikiutil.version2timestamp(time_usecs))[:3]).toordinal()
+        counts = self.days.get(day)
+        if counts is None:
+            counts = self.days[day] = [0, 0]
+        counts[field] += 1
+        pagename = values.get('pagename')
+        if pagename:
+            page_days = self.pages.get(pagename)
+            if page_days is None:
+                page_days = self.pages[pagename] = {}
+            counts = page_days.get(day)
+            if counts is None:
+                counts = page_days[day] = [0, 0]
+            counts[field] += 1
+        ua = values.get('HTTP_USER_AGENT')
+        if ua:
+            ua = agent_type(ua)
+            self.useragents[ua] = self.useragents.get(ua, 0) + 1
+
+    def _merge_days(self, days, other_days):
+        for day, (views, edits) in other_days.iteritems():
+            counts = days.get(day)
+            if counts is None:
+                days[day] = [views, edits]
+            else:
+                counts[0] += views
+                counts[1] += edits
+
+    def merge(self, other):
+        """ Add the counters of another Counters object """
+        self._merge_days(self.days, other.days)
+        for pagename, page_days in other.pages.iteritems():
+            self._merge_days(self.pages.setdefault(pagename, {}), page_days)
+        for ua, count in other.useragents.iteritems():
+            self.useragents[ua] = self.useragents.get(ua, 0) + count
+
+
+def count_events(filename, start=0, end=None):
+    """ Count the events of the event-log lines starting in [start, end)
+
+    Only complete lines are counted, a line being written just now is left
+    for the next time.
+
+    @param filename: event-log (or event-log segment) file name
+    @param start: file offset to start at (if it is not at the start of a
+                  line, the rest of that line is skipped)
+    @param end: offset where to stop (None = end of file)
+    @return: (Counters, offset after the last counted line)
+    """
+    parser = eventlog.EventLog(None, filename=filename).parser
+    counters = Counters()
+    try:
+        f = open_log(filename)
+    except IOError:
+        return counters, start
+    try:
+        pos = start
+        if pos > 0:
+            f.seek(pos - 1)
+            if f.read(1) != '\n':
+                pos += len(f.readline())
+        f.seek(pos)
+        while end is None or pos < end:
+            line = f.readline()
+            if not line.endswith('\n'):
+                break # end of file or incomplete line
+            pos += len(line)
+            fields = line.split('\t', 2)
+            if len(fields) != 3 or fields[1] not in (VIEW, EDIT):
+                continue
+            try:
+                event = parser(unicode(line, config.charset))
+            except (UnicodeError, ValueError):
+                event = None
+            if event is not None:
+                counters.add(*event)
+    finally:
+        f.close()
+    return counters, pos
+
+
+def _count_chunk(args):
+    """ count_events for a multiprocessing pool, returns picklable data """
+    counters, pos = count_events(*args)
+    return counters.days, counters.pages, counters.useragents, pos
+
+
+def read_head(filename):
+    """ Return the first bytes of the event-log (or of a segment) """
+    try:
+        f = open_log(filename)
+    except IOError:
+        return ''
+    try:
+        return f.readline(HEAD_SIZE)
+    finally:
+        f.close()
+
+
+class HitRollup:
+    """ Counters for the events up to some position of the event-log """
+    def __init__(self):
+        self.counters = Counters()
+        self.segment = None # name of the newest event-log segment counted
+        self.pos = 0 # event-log position up to which events were counted
+        self.head = '' # first bytes of that event-log
+        self.log_id = None # id of the delta log of the on-disk snapshot
+        self._log_offset = 0 # delta log position up to which we read it
+        self._uid = None # uid of the on-disk snapshot we are in sync with
+        self._lock = threading.Lock()
+
+    def _cache(self, request):
+        return caching.CacheEntry(request, 'charts', 'rollup', scope='wiki', use_pickle=True)
+
+    def _filename(self, request):
+        return request.rootpage.getPagePath('event-log', isfile=1)
+
+    def _log_filename(self, request, log_id):
+        return os.path.join(caching.get_arena_dir(request, 'charts', 'wiki'), 'rollup.%s.log' % log_id)
+
+    def _position(self):
+        return self.segment, self.pos, self.head
+
+    def _reset(self):
+        self.counters = Counters()
+        self.segment = None
+        self.pos = 0
+        self.head = ''
+
+    def _load(self, cache):
+        """ Load the on-disk snapshot (if it is valid) """
+        try:
+            data = cache.content()
+        except caching.CacheError:
+            return False
+        try:
+            version, log_id, segment, pos, head, days, pages, useragents = data
+        except (TypeError, ValueError):
+            return False
+        if version != FORMAT_VERSION:
+            return False
+        self.counters = Counters()
+        self.counters.days, self.counters.pages, self.counters.useragents = days, pages, useragents
+        self.segment, self.pos, self.head = segment, pos, head
+        self.log_id, self._log_offset = log_id, 0
+        return True
+
+    def _save(self, request, cache):
+        """ Write a snapshot of the counters, starting a new delta log """
+        counters = self.counters
+        old_log_id = self.log_id
+        log_id = os.urandom(8).encode('hex')
+        try:
+            # the delta log must exist before the snapshot refers to it, we
+            # only append to existing delta logs (see _append)
+            fd = os.open(self._log_filename(request, log_id),
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666 & config.umask)
+            os.close(fd)
+            cache.update((FORMAT_VERSION, log_id, self.segment, self.pos, self.head,
+                          counters.days, counters.pages, counters.useragents))
+        except (OSError, caching.CacheError), err:
+            logging.warning("could not save hit rollup: %s" % str(err))
+            return
+        self.log_id, self._log_offset = log_id, 0
+        self._uid = cache.uid()
+        if old_log_id is not None:
+            try:
+                os.remove(self._log_filename(request, old_log_id))
+            except OSError:
+                pass
+
+    def _read_log(self, request):
+        """ Apply the delta log records continuing from our position """
+        if self.log_id is None:
+            return
+        try:
+            f = file(self._log_filename(request, self.log_id), 'rb')
+        except IOError:
+            return
+        try:
+            f.seek(self._log_offset)
+            data = f.read()
+        finally:
+            f.close()
+        offset = 0
+        while offset + RECORD_HEADER_SIZE <= len(data):
+            length, = struct.unpack_from(RECORD_HEADER, data, offset)
+            end = offset + RECORD_HEADER_SIZE + length
+            if end > len(data):
+                break # being written just now
+            try:
+                start, position, days, pages, useragents = pickle.loads(data[offset + RECORD_HEADER_SIZE:end])
+            except Exception, err:
+                logging.warning("ignoring bad hit rollup delta log record (%s)" % str(err))
+            else:
+                if start == self._position():
+                    counters = Counters()
+                    counters.days, counters.pages, counters.useragents = days, pages, useragents
+                    self.counters.merge(counters)
+                    self.segment, self.pos, self.head = position
+            offset = end
+        self._log_offset += offset
+
+    def _append(self, request, start, counters):
+        """ Append a record to the delta log
+
+        @param start: position we counted counters from
+        @return: size of the delta log or None if the delta log is gone
+                 (another process wrote a new snapshot meanwhile)
+        """
+        record = pickle.dumps((start, self._position(),
+                               counters.days, counters.pages, counters.useragents),
+                              PICKLE_PROTOCOL)
+        data = struct.pack(RECORD_HEADER, len(record)) + record
+        try:
+            fd = os.open(self._log_filename(request, self.log_id), os.O_WRONLY | os.O_APPEND)
+        except OSError, err:
+            if err.errno == errno.ENOENT:
+                return None
+            raise
+        try:
+            written = 0
+            while written < len(data):
+                written += os.write(fd, data[written:])
+            end = os.lseek(fd, 0, 1)
+        finally:
+            os.close(fd)
+        if end - len(data) == self._log_offset:
+            self._log_offset = end # nobody else appended since we read
+        return end
+
+    def _pending_segments(self, filename):
+        """ Return list of (segment file name, start offset) to count, as the
+            event-log was rotated since we counted it, or None if we can't
+            continue from where we are (the event-log was replaced).
+        """
+        segments = SegmentManifest(filename).segments()
+        new = [segment for segment in segments
+               if self.segment is None or segment.name > self.segment]
+        if not self.pos:
+            return [(segment.path, 0) for segment in new]
+        # the part of the event-log we counted must be the oldest new segment
+        if not new or read_head(new[0].path) != self.head:
+            return None
+        return [(new[0].path, self.pos)] + [(segment.path, 0) for segment in new[1:]]
+
+    def _update(self, request):
+        """ Count the events appended to the event-log since we looked last """
+        filename = self._filename(request)
+        eventlog.flush(filename) # count the events buffered by this process, too
+        cache = self._cache(request)
+        uid = cache.uid()
+        if uid is not None and uid != self._uid:
+            # another process wrote a new snapshot
+            if self._load(cache):
+                self._uid = uid
+        self._read_log(request)
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        if size == self.pos and self.pos:
+            return
+        start = self._position()
+        reset = False
+        head = read_head(filename)
+        if self.pos and size >= self.pos and head == self.head:
+            todo = [(filename, self.pos)]
+        else:
+            # the event-log was rotated or replaced or we did not count it yet
+            todo = self._pending_segments(filename)
+            if todo is None:
+                logging.info("event-log was replaced, rebuilding the hit rollup")
+                self._reset()
+                reset = True
+                todo = self._pending_segments(filename)
+            todo.append((filename, 0))
+        new = Counters()
+        changed = False
+        for path, offset in todo:
+            counters, pos = count_events(path, offset)
+            new.merge(counters)
+            if path != filename:
+                self.segment = os.path.basename(path)
+            changed = changed or pos != offset
+        if changed or pos != self.pos:
+            self.counters.merge(new)
+            self.pos, self.head = pos, head
+            if reset or self.log_id is None or uid is None:
+                self._save(request, cache)
+            else:
+                log_size = self._append(request, start, new)
+                if log_size is None or log_size > LOG_MAX_SIZE:
+                    self._save(request, cache)
+
+    def rebuild(self, request, processes=1):
+        """ Rebuild the rollup from the complete event-log
+
+        @param processes: number of processes counting chunks of the event-log
+        """
+        filename = self._filename(request)
+        segments = SegmentManifest(filename).segments()
+        head = read_head(filename)
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        chunk_size = max(size / max(processes, 1), 1)
+        chunks = [(filename, start, start + chunk_size) for start in range(0, size, chunk_size)]
+        if chunks:
+            chunks[-1] = (filename, chunks[-1][1], None)
+        # compressed segments can't be split, each one is a chunk
+        chunks = [(segment.path, 0, None) for segment in segments] + chunks
+        if processes > 1 and len(chunks) > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(_count_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_count_chunk(chunk) for chunk in chunks]
+        self._lock.acquire()
+        try:
+            self._reset()
+            for (path, start, end), (days, pages, useragents, pos) in zip(chunks, results):
+                counters = Counters()
+                counters.days, counters.pages, counters.useragents = days, pages, useragents
+                self.counters.merge(counters)
+                if path == filename:
+                    self.pos = pos
+            if segments:
+                self.segment = segments[-1].name
+            self.head = head
+            self._save(request, self._cache(request))
+        finally:
+            self._lock.release()
+
+    def daily(self, request, pagename=None):
+        """ Return the views and edits per day (of the whole wiki or of one page)
+
+        @param pagename: page name or None
+        @return: (days, views, edits) lists, days formatted by DATE_FMT,
+                 from the first to the last day with events (days without
+                 events in between have 0 counts)
+        """
+        self._lock.acquire()
+        try:
+            self._update(request)
+            if pagename:
+                days = self.counters.pages.get(pagename, {})
+            else:
+                days = self.counters.days
+            if not days:
+                return [], [], []
+            first, last = min(days), max(days)
+            day_list, views, edits = [], [], []
+            for day in xrange(first, last + 1):
+                counts = days.get(day, (0, 0))
+                date = datetime.date.fromordinal(day)
+                day_list.append(DATE_FMT % (date.year, date.month, date.day))
+                views.append(counts[0])
+                edits.append(counts[1])
+            return day_list, views, edits
+        finally:
+            self._lock.release()
+
+    def page_views(self, request, days=None):
+        """ Return dict {pagename: total views}
+
+        @param days: only count the views of that many recent days (None: all)
+        """
+        if days:
+            first = datetime.datetime.utcnow().date().toordinal() - days + 1
+        else:
+            first = 0
+        self._lock.acquire()
+        try:
+            self._update(request)
+            result = {}
+            for pagename, page_days in self.counters.pages.iteritems():
+                views = sum([counts[0] for day, counts in page_days.iteritems() if day >= first])
+                if views:
+                    result[pagename] = views
+            return result
+        finally:
+            self._lock.release()
+
+    def useragents(self, request):
+        """ Return list of (count, user agent type), highest count first """
+        self._lock.acquire()
+        try:
+            self._update(request)
+            data = [(count, ua) for ua, count in self.counters.useragents.items()]
+        finally:
+            self._lock.release()
+        data.sort()
+        data.reverse()
+        return data
+
+
+def get_rollup(request):
+    """ Return the HitRollup of this wiki (kept in request.cfg.cache) """
+    cache = request.cfg.cache
+    try:
+        return cache.hit_rollup
+    except AttributeError:
+        cache.hit_rollup = HitRollup()
+        return cache.hit_rollup
+
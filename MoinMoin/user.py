@@ -20,7 +20,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, time, codecs, base64
+import os, re, time, codecs, base64, tempfile
 import hashlib
 import hmac
 from copy import deepcopy
@@ -36,13 +36,20 @@ logging = log.getLogger(__name__)
 
 from MoinMoin import config, caching, wikiutil, i18n, events
 from werkzeug.security import safe_str_cmp as safe_str_equal
-from MoinMoin.util import timefuncs, random_string
+from MoinMoin.util import timefuncs, random_string, filesys, lock
 from MoinMoin.wikiutil import url_quote_plus
 
 # for efficient lookup <attr> -> userid, we keep an index of this in the cache.
 # the attribute names in here should be uniquely identifying a user.
 CACHED_USER_ATTRS = ['name', 'email', 'jid', 'openids', ]
 
+# the attribute names stored in the page subscriptions cache, see
+# User.updatePageSubCache
+SUBSCRIPTION_USER_ATTRS = ['name', 'email', 'subscribed_pages', ]
+
+# file names of user profiles in user_dir
+USERID_RE = re.compile(r'^\d+\.\d+(\.\d+)?$')
+
 
 def getUserList(request):
     """ Get a list of all (numerical) user IDs.
@@ -51,10 +58,11 @@ def getUserList(request):
     @rtype: list
     @return: all user IDs
     """
-    import re
-    user_re = re.compile(r'^\d+\.\d+(\.\d+)?$')
+    store = request.cfg.user_store
+    if store is not None:
+        return store.userids(request)
     files = os.listdir(request.cfg.user_dir)
-    userlist = [f for f in files if user_re.match(f)]
+    userlist = [f for f in files if USERID_RE.match(f)]
     return userlist
 
 def get_by_filter(request, filter_func):
@@ -94,6 +102,9 @@ def _getUserIdByKey(request, key, search, case=True):
         raise ValueError("unsupported key, must be in CACHED_USER_ATTRS")
     if not search:
         return None
+    store = request.cfg.user_store
+    if store is not None:
+        return store.lookup(request, key, search, case)
     cfg_cache_attr = key + "2id"
     if not case:
         cfg_cache_attr += "_lower"
@@ -439,6 +450,226 @@ def decodeDict(line):
     return items
 
 
+def readProfile(cfg, filename):
+    """ Read a user profile file
+
+    Transient fields (cfg.user_transient_fields) and keys starting with an
+    underscore are ignored.
+
+    @param cfg: the wiki config
+    @param filename: file name of the profile
+    @rtype: dict
+    @return: profile data
+    """
+    data = codecs.open(filename, "r", config.charset).readlines()
+    user_data = {}
+    for line in data:
+        if line[0] == '#':
+            continue
+
+        try:
+            key, val = line.strip().split('=', 1)
+            if key not in cfg.user_transient_fields and key[0] != '_':
+                # Decode list values
+                if key.endswith('[]'):
+                    key = key[:-2]
+                    val = decodeList(val)
+                # Decode dict values
+                elif key.endswith('{}'):
+                    key = key[:-2]
+                    val = decodeDict(val)
+                # for compatibility reading old files, keep these explicit
+                # we will store them with [] appended
+                elif key in ['quicklinks', 'subscribed_pages', 'subscribed_events']:
+                    val = decodeList(val)
+                user_data[key] = val
+        except ValueError:
+            pass
+    return user_data
+
+
+class SubscriptionIndex:
+    """ Index of the page subscriptions of all users
+
+    Finding the subscribers of a page should not need to look at every
+    subscribed user (see Page.getSubscribers), so we keep:
+
+     * a dict mapping every subscribed pattern to the ids of the users having
+       it, for plain page names (a pattern matches equal page names even if it
+       is a regular expression, see User.isSubscribedTo),
+     * a dict mapping every pattern that looks like a regular expression to the
+       ids of the users having it and some combined regular expressions
+       matching if any of those patterns matches, so usually only one or a few
+       searches are needed to find out that no such pattern matches.
+
+    The index is kept in request.cfg.cache and updated incrementally when a
+    user profile is saved (see User.updatePageSubCache, which serializes the
+    changes by locking the pagesubscriptions cache). If another process
+    changed the pagesubscriptions cache, getSubscriptionIndex rebuilds it.
+
+    Changes are done copy-on-write (we never modify a set another thread
+    might be looking at), so lookups need no locking.
+    """
+    # characters having a special meaning in a regular expression
+    special_re = re.compile(r'[.^$*+?{}\[\]\\|()]')
+    # patterns that must not be combined with others (back references or
+    # flags, which would change the meaning of the combined expression)
+    uncombinable_re = re.compile(r'\\\d|\(\?P=|\(\?[iLmsux]')
+    # python's re module does not support more than 100 groups per expression
+    MAX_GROUPS = 99
+
+    def __init__(self, page_sub=None, uid=None):
+        """
+        @param page_sub: dict {userid: {'name': ..., 'email': ..., 'subscribed_pages': [...]}}
+                         as stored in the pagesubscriptions cache
+        @param uid: uid of the cache entry page_sub was loaded from
+        """
+        self.uid = uid
+        self.users = {} # userid -> entry
+        self.exact = {} # pattern -> set of userids
+        self.patterns = {} # regex pattern -> set of userids
+        self._matchers = None # [(combined regex, [(regex, pattern), ...]), ...]
+        for userid, entry in (page_sub or {}).items():
+            self.add(userid, entry)
+
+    def add(self, userid, entry):
+        """ Add (or replace) the subscriptions of a user
+
+        @param userid: the user id
+        @param entry: dict with name, email and subscribed_pages of the user
+        """
+        self.remove(userid)
+        entry = dict(entry, subscribed_pages=list(entry['subscribed_pages']))
+        self.users[userid] = entry
+        for pattern in entry['subscribed_pages']:
+            self.exact[pattern] = self.exact.get(pattern, frozenset()) | set([userid])
+            if self.special_re.search(pattern):
+                userids = self.patterns.get(pattern)
+                self.patterns[pattern] = (userids or frozenset()) | set([userid])
+                if userids is None:
+                    self._matchers = None
+
+    def remove(self, userid):
+        """ Remove the subscriptions of a user (if there are any)
+
+        @param userid: the user id
+        """
+        entry = self.users.pop(userid, None)
+        if entry is None:
+            return
+        for pattern in entry['subscribed_pages']:
+            for index in (self.exact, self.patterns):
+                userids = index.get(pattern)
+                if userids is not None:
+                    userids = userids - set([userid])
+                    if userids:
+                        index[pattern] = userids
+                    else:
+                        index.pop(pattern, None)
+                        if index is self.patterns:
+                            self._matchers = None
+
+    def _combine(self, chunk):
+        """ Return matcher for a list of (regex, pattern) """
+        try:
+            combined = re.compile(u'|'.join([u'(?:^%s$)' % pattern for regex, pattern in chunk]), re.M)
+        except re.error:
+            return [(regex, [(regex, pattern)]) for regex, pattern in chunk]
+        return [(combined, chunk)]
+
+    def _build_matchers(self):
+        """ Compile the regex patterns, skipping bad ones """
+        matchers = []
+        chunk, groups = [], 0
+        for pattern in self.patterns.keys():
+            try:
+                regex = re.compile(r'^%s$' % pattern, re.M)
+            except re.error:
+                continue
+            if self.uncombinable_re.search(pattern):
+                matchers.append((regex, [(regex, pattern)]))
+                continue
+            if chunk and groups + regex.groups > self.MAX_GROUPS:
+                matchers.extend(self._combine(chunk))
+                chunk, groups = [], 0
+            chunk.append((regex, pattern))
+            groups += regex.groups
+        if chunk:
+            matchers.extend(self._combine(chunk))
+        return matchers
+
+    def subscribers(self, pages):
+        """ Return the ids of the users subscribed to any of pages
+
+        @param pages: list of page names (including interwiki names)
+        @rtype: set
+        @return: user ids
+        """
+        result = set()
+        for pagename in pages:
+            result.update(self.exact.get(pagename, ()))
+        if self.patterns:
+            matchers = self._matchers
+            if matchers is None:
+                matchers = self._matchers = self._build_matchers()
+            # Create text for regular expression search
+            text = '\n'.join(pages)
+            for combined, chunk in matchers:
+                if combined.search(text):
+                    for regex, pattern in chunk:
+                        if regex.search(text):
+                            result.update(self.patterns.get(pattern, ()))
+        return result
+
+
+def getSubscriptionIndex(request):
+    """ Get the SubscriptionIndex of all users
+
+    The index is kept in request.cfg.cache and rebuilt from the
+    pagesubscriptions cache if that was changed by another process (the
+    cache itself gets built first if it does not exist yet).
+
+    @param request: current request
+    @rtype: SubscriptionIndex
+    """
+    scope, arena, key = 'userdir', 'users', 'pagesubscriptions'
+
+    try:
+        index = request.cfg.cache.page_subscriptions
+    except AttributeError:
+        index = None
+
+    # get or create cache file
+    cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True)
+    if cache.exists():
+        uid = cache.uid()
+        if index is not None and uid is not None and index.uid == uid:
+            return index
+        page_sub = cache.content()
+    else:
+        # build a cache if it doesn't exist
+        cache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True, do_locking=False)
+        # lock to stop anybody else interfering with the data while we're working
+        cache.lock('w')
+        userlist = getUserList(request)
+        page_sub = {}
+        for userid in userlist:
+            subscriber = User(request, userid)
+            # we don't care about storing entries for users without any page subscriptions
+            if subscriber.subscribed_pages:
+                page_sub[subscriber.id] = {
+                    'name': subscriber.name,
+                    'email': subscriber.email,
+                    'subscribed_pages': subscriber.subscribed_pages,
+                }
+        cache.update(page_sub)
+        uid = cache.uid()
+        cache.unlock()
+
+    index = request.cfg.cache.page_subscriptions = SubscriptionIndex(page_sub, uid)
+    return index
+
+
 class User:
     """ A MoinMoin User """
 
@@ -490,6 +721,7 @@ class User:
         self.language = ""
         self.real_language = "" # In case user uses "Browser setting". For language-statistics
         self._stored = False
+        self._cached_values = None # see save()
         self.date_fmt = ""
         self.datetime_fmt = ""
         self.quicklinks = self._cfg.quicklinks_default
@@ -562,17 +794,61 @@ class User:
         """
         return os.path.join(self._cfg.user_dir, self.id or "...NONE...")
 
+    def __bookmarks_filename(self):
+        """ Get filename of the user's bookmarks file (see setBookmark) """
+        return self.__filename() + '.bookmarks'
+
+    def __lock_dir(self):
+        """ Get the lock directory of the user's files (see _lock) """
+        return os.path.join(self._cfg.user_dir, '__lock__', self.id)
+
+    def _lock(self):
+        """ Acquire the lock serializing the writes to this user's files
+
+        @rtype: lock object or None
+        @return: the acquired write lock (call its release method when done)
+                 or None, if we could not get the lock in time
+        """
+        lock_dir = self.__lock_dir()
+        parent_dir = os.path.dirname(lock_dir)
+        if not os.path.exists(parent_dir):
+            try:
+                os.makedirs(parent_dir)
+            except OSError:
+                if not os.path.isdir(parent_dir): # not created by someone else
+                    raise
+        WriteLock = lock.getLockClasses(self._cfg.lock_mode)[1]
+        wlock = WriteLock(lock_dir, 60.0)
+        if wlock.acquire(10.0):
+            return wlock
+        logging.warning("Can't acquire write lock in %s, writing unlocked" % lock_dir)
+
     def exists(self):
         """ Do we have a user account for this user?
 
         @rtype: bool
         @return: true, if we have a user account
         """
+        store = self._cfg.user_store
+        if store is not None:
+            return bool(self.id) and store.exists(self._request, self.id)
         return os.path.exists(self.__filename())
 
     def remove(self):
         """ Remove user profile from disk """
-        os.remove(self.__filename())
+        store = self._cfg.user_store
+        if store is not None:
+            store.remove(self._request, self.id)
+        else:
+            os.remove(self.__filename())
+        try:
+            os.remove(self.__bookmarks_filename())
+        except OSError:
+            pass
+        try:
+            os.rmdir(self.__lock_dir())
+        except OSError:
+            pass
 
     def load_from_id(self, password=None):
         """ Load user account data from disk.
@@ -585,33 +861,19 @@ class User:
         @param password: If not None, then the given password must match the
                          password in the user account file.
         """
-        if not self.exists():
-            return
-
-        data = codecs.open(self.__filename(), "r", config.charset).readlines()
+        store = self._cfg.user_store
+        if store is not None:
+            data = self.id and store.load(self._request, self.id)
+            if not data:
+                return
+        else:
+            if not self.exists():
+                return
+            data = readProfile(self._cfg, self.__filename())
         user_data = {'enc_password': ''}
-        for line in data:
-            if line[0] == '#':
-                continue
-
-            try:
-                key, val = line.strip().split('=', 1)
-                if key not in self._cfg.user_transient_fields and key[0] != '_':
-                    # Decode list values
-                    if key.endswith('[]'):
-                        key = key[:-2]
-                        val = decodeList(val)
-                    # Decode dict values
-                    elif key.endswith('{}'):
-                        key = key[:-2]
-                        val = decodeDict(val)
-                    # for compatibility reading old files, keep these explicit
-                    # we will store them with [] appended
-                    elif key in ['quicklinks', 'subscribed_pages', 'subscribed_events']:
-                        val = decodeList(val)
-                    user_data[key] = val
-            except ValueError:
-                pass
+        for key, val in data.items():
+            if key not in self._cfg.user_transient_fields and key[0] != '_':
+                user_data[key] = val
 
         # Validate data from user file. In case we need to change some
         # values, we set 'changed' flag, and later save the user data.
@@ -655,9 +917,12 @@ class User:
         if not self.disabled:
             self.valid = 1
 
+        self._loadBookmarks()
+
         # Mark this user as stored so saves don't send
         # the "user created" event
         self._stored = True
+        self._cached_values = self._cachedValues()
 
         # If user data has been changed, save fixed user data.
         if changed:
@@ -773,35 +1038,62 @@ class User:
         if not os.path.exists(user_dir):
             os.makedirs(user_dir)
 
+        # concurrent saves of the same user must not interleave, or the lookup
+        # caches might end up reflecting another profile than the saved one
+        wlock = self._lock()
+        try:
+            self._save()
+        finally:
+            if wlock is not None:
+                wlock.release()
+
+    def _save(self):
+        """ Save the profile and update the caches, see save """
         self.last_saved = str(time.time())
 
-        # !!! should write to a temp file here to avoid race conditions,
-        # or even better, use locking
-
-        data = codecs.open(self.__filename(), "w", config.charset)
-        data.write("# Data saved '%s' for id '%s'\n" % (
-            time.strftime(self._cfg.datetime_fmt, time.localtime(time.time())),
-            self.id))
-        attrs = self.persistent_items()
-        attrs.sort()
-        for key, value in attrs:
-            # Encode list values
-            if isinstance(value, list):
-                key += '[]'
-                value = encodeList(value)
-            # Encode dict values
-            elif isinstance(value, dict):
-                key += '{}'
-                value = encodeDict(value)
-            line = u"%s=%s" % (key, unicode(value))
-            line = line.replace('\n', ' ').replace('\r', ' ') # no lineseps
-            data.write(line + '\n')
-        data.close()
+        store = self._cfg.user_store
+        if store is not None:
+            store.save(self._request, self.id, dict(self.persistent_items()))
+        else:
+            user_dir = self._cfg.user_dir
+            # write to a temp file and rename it, so nobody ever reads a
+            # partially written profile
+            fd, tmp_fname = tempfile.mkstemp('.tmp', self.id + '.', user_dir)
+            data = codecs.getwriter(config.charset)(os.fdopen(fd, 'w'))
+            data.write("# Data saved '%s' for id '%s'\n" % (
+                time.strftime(self._cfg.datetime_fmt, time.localtime(time.time())),
+                self.id))
+            attrs = self.persistent_items()
+            attrs.sort()
+            for key, value in attrs:
+                # Encode list values
+                if isinstance(value, list):
+                    key += '[]'
+                    value = encodeList(value)
+                # Encode dict values
+                elif isinstance(value, dict):
+                    key += '{}'
+                    value = encodeDict(value)
+                line = u"%s=%s" % (key, unicode(value))
+                line = line.replace('\n', ' ').replace('\r', ' ') # no lineseps
+                data.write(line + '\n')
+            data.close()
+            filesys.chmod(tmp_fname, 0666 & config.umask) # fix mode that mkstemp chose
+            filesys.rename(tmp_fname, self.__filename())
 
         if not self.disabled:
             self.valid = 1
 
-        self.updateLookupCaches()
+        # only rewrite the lookup and page subscriptions caches if some
+        # attribute stored there changed
+        cached_values = self._cachedValues()
+        old_values = self._cached_values or {}
+        changed = set([key for key, value in cached_values.items()
+                       if key not in old_values or old_values[key] != value])
+        self._cached_values = cached_values
+
+        if changed.intersection(CACHED_USER_ATTRS + ['valid']):
+            self.updateLookupCaches()
 
         if not self._stored:
             self._stored = True
@@ -809,7 +1101,17 @@ class User:
             events.send_event(event)
 
         # update page subscriber's cache after saving user preferences
-        self.updatePageSubCache()
+        if changed.intersection(SUBSCRIPTION_USER_ATTRS + ['valid']):
+            self.updatePageSubCache()
+
+    def _cachedValues(self):
+        """ Return a copy of the attributes that are stored in the lookup
+            caches or the page subscriptions cache.
+        """
+        values = {'valid': self.valid}
+        for attrname in CACHED_USER_ATTRS + SUBSCRIPTION_USER_ATTRS:
+            values[attrname] = deepcopy(getattr(self, attrname, None))
+        return values
 
     # -----------------------------------------------------------------
     # Time and date formatting
@@ -857,7 +1159,7 @@ class User:
             interwikiname = self._cfg.interwikiname or u''
             bookmark = unicode(tm)
             self.bookmarks[interwikiname] = bookmark
-            self.save()
+            self._saveBookmark(interwikiname, bookmark)
 
     def getBookmark(self):
         """ Get bookmark timestamp.
@@ -886,10 +1188,83 @@ class User:
                 del self.bookmarks[interwikiname]
             except KeyError:
                 return 1
-            self.save()
+            self._saveBookmark(interwikiname, u'')
             return 0
         return 1
 
+    # bookmarks files bigger than this get rewritten by _saveBookmark
+    BOOKMARKS_MAX_SIZE = 4096
+
+    def _loadBookmarks(self):
+        """ Apply the changes recorded in the bookmarks file to self.bookmarks
+
+        Bookmarks change often (whenever the user visits RecentChanges), so
+        instead of rewriting the complete profile, every change gets appended
+        to a small separate file. Later lines override earlier ones, an empty
+        bookmark means that the bookmark was deleted.
+        """
+        self._readBookmarks(self.bookmarks)
+
+    def _readBookmarks(self, bookmarks):
+        """ Apply the changes recorded in the bookmarks file to bookmarks
+
+        @param bookmarks: dict interwikiname -> bookmark, modified in place
+        """
+        try:
+            f = codecs.open(self.__bookmarks_filename(), 'r', config.charset)
+        except IOError:
+            return
+        try:
+            lines = f.readlines()
+        finally:
+            f.close()
+        for line in lines:
+            try:
+                interwikiname, bookmark = line.rstrip('\n').split('\t')
+            except ValueError:
+                continue # partially written line
+            if bookmark:
+                bookmarks[interwikiname] = bookmark
+            else:
+                bookmarks.pop(interwikiname, None)
+
+    def _saveBookmark(self, interwikiname, bookmark):
+        """ Record a bookmark change in the bookmarks file (see _loadBookmarks)
+
+        @param interwikiname: interwiki name of the wiki (or u'')
+        @param bookmark: bookmark timestamp or u'' (to delete the bookmark)
+        """
+        filename = self.__bookmarks_filename()
+        line = u'%s\t%s\n' % (interwikiname, bookmark)
+        # an append must not happen between reading and replacing the file
+        # when compacting it, or it would get lost
+        wlock = self._lock()
+        try:
+            f = open(filename, 'ab')
+            try:
+                f.write(line.encode(config.charset))
+            finally:
+                f.close()
+            if os.path.getsize(filename) > self.BOOKMARKS_MAX_SIZE:
+                # compact it, keeping only the current bookmarks - other
+                # processes might have appended changes we do not know yet
+                bookmarks = dict(self.bookmarks)
+                self._readBookmarks(bookmarks)
+                fd, tmp_fname = tempfile.mkstemp('.tmp', self.id + '.', self._cfg.user_dir)
+                f = os.fdopen(fd, 'wb')
+                try:
+                    for interwikiname, bookmark in bookmarks.items():
+                        line = u'%s\t%s\n' % (interwikiname, bookmark)
+                        f.write(line.encode(config.charset))
+                finally:
+                    f.close()
+                filesys.chmod(tmp_fname, 0666 & config.umask) # fix mode that mkstemp chose
+                filesys.rename(tmp_fname, filename)
+                self.bookmarks = bookmarks
+        finally:
+            if wlock is not None:
+                wlock.release()
+
     # -----------------------------------------------------------------
     # Subscribe
 
@@ -914,7 +1289,6 @@ class User:
         if not self.valid:
             return False
 
-        import re
         # Create a new list with both names and interwiki names.
         pages = pagelist[:]
         if self._cfg.interwikiname:
@@ -1007,6 +1381,14 @@ class User:
         cache.lock('w')
         page_sub = cache.content()
 
+        # only update the in-memory index incrementally if it is up-to-date
+        try:
+            index = self._request.cfg.cache.page_subscriptions
+        except AttributeError:
+            index = None
+        if index is not None and (index.uid is None or index.uid != cache.uid()):
+            index = None
+
         # we only store entries for valid users with some page subscriptions
         if self.valid and self.subscribed_pages:
             page_sub[self.id] = {
@@ -1018,10 +1400,18 @@ class User:
             del page_sub[self.id]
 
         cache.update(page_sub)
+        if index is not None:
+            if self.id in page_sub:
+                index.add(self.id, page_sub[self.id])
+            else:
+                index.remove(self.id)
+            index.uid = cache.uid()
         cache.unlock()
 
     def updateLookupCaches(self):
         """ When a user profile is saved, we update the userid lookup caches """
+        if self._cfg.user_store is not None:
+            return # the user store maintains its own indexes
 
         scope, arena, key = 'userdir', 'users', 'lookup'
 
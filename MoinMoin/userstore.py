@@ -0,0 +1,223 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - user profile stores
+
+    By default, every user profile is a text file in cfg.user_dir and looking
+    up a user by name, email, jid or openid needs the lookup caches (see
+    MoinMoin.user). Alternatively, a user store object (cfg.user_store) can be
+    configured, which keeps all profiles in one database together with
+    indexes for the attributes in user.CACHED_USER_ATTRS.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os
+import threading
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin.util import pickle, PICKLE_PROTOCOL
+
+
+class UserStore:
+    """ Base class of user profile stores
+
+    A user store keeps the profile data of users (the persistent items of
+    a User object, as dict) under their user id.
+    """
+    def exists(self, request, userid):
+        """ Do we have a profile for userid? """
+        raise NotImplementedError
+
+    def load(self, request, userid):
+        """ Return the profile data of userid (dict) or None """
+        raise NotImplementedError
+
+    def save(self, request, userid, data):
+        """ Store the profile data (dict) of userid """
+        raise NotImplementedError
+
+    def remove(self, request, userid):
+        """ Remove the profile of userid """
+        raise NotImplementedError
+
+    def userids(self, request):
+        """ Return a list of all user ids """
+        raise NotImplementedError
+
+    def lookup(self, request, attrname, value, case=True):
+        """ Return the id of the (enabled) user having value for attrname or None
+
+        @param attrname: one of user.CACHED_USER_ATTRS
+        @param value: the value to look for
+        @param case: do a case-sensitive lookup?
+        """
+        raise NotImplementedError
+
+
+def _copy_data(data):
+    """ Copy profile data, so the caller may modify list and dict values """
+    result = {}
+    for key, value in data.iteritems():
+        if isinstance(value, list):
+            value = value[:]
+        elif isinstance(value, dict):
+            value = value.copy()
+        result[key] = value
+    return result
+
+
+class SQLiteUserStore(UserStore):
+    """ Keep the user profiles in a sqlite database
+
+    The profile data is stored pickled, the user.CACHED_USER_ATTRS values of
+    enabled users are stored in an indexed table for the lookups. Unpickled
+    profiles are cached in memory as long as last_saved of the profile (and
+    the size of its data) does not change.
+
+    When the database gets created, all profiles found in cfg.user_dir are
+    imported (the profile files are kept, but not used any more).
+    """
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, last_saved TEXT, data BLOB)",
+        "CREATE TABLE IF NOT EXISTS user_keys (attr TEXT, value TEXT, value_lower TEXT, id TEXT)",
+        "CREATE INDEX IF NOT EXISTS user_keys_value ON user_keys (attr, value)",
+        "CREATE INDEX IF NOT EXISTS user_keys_value_lower ON user_keys (attr, value_lower)",
+        "CREATE INDEX IF NOT EXISTS user_keys_id ON user_keys (id)",
+    ]
+
+    def __init__(self, filename=None, timeout=30.0):
+        """
+        @param filename: database file name (default: <user_dir>/users.sqlite)
+        @param timeout: seconds to wait for other processes writing to the database
+        """
+        if sqlite3 is None:
+            raise ImportError("SQLiteUserStore needs the sqlite3 module")
+        self.filename = filename
+        self.timeout = timeout
+        self._local = threading.local() # connections are per thread
+        self._cache = {} # (filename, userid) -> (last_saved, size, data)
+
+    def _filename(self, request):
+        return self.filename or os.path.join(request.cfg.user_dir, 'users.sqlite')
+
+    def _connect(self, request):
+        """ Return (filename, connection to the database) for this thread """
+        filename = self._filename(request)
+        try:
+            connections = self._local.connections
+        except AttributeError:
+            connections = self._local.connections = {}
+        try:
+            return filename, connections[filename]
+        except KeyError:
+            pass
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        created = not os.path.exists(filename)
+        conn = sqlite3.connect(filename, timeout=self.timeout)
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        connections[filename] = conn
+        if created:
+            self._import_profiles(request, conn)
+        return filename, conn
+
+    def _import_profiles(self, request, conn):
+        """ Import the profile files from cfg.user_dir """
+        from MoinMoin import user
+        user_dir = request.cfg.user_dir
+        if not os.path.isdir(user_dir):
+            return
+        count = 0
+        for userid in os.listdir(user_dir):
+            if user.USERID_RE.match(userid):
+                data = user.readProfile(request.cfg, os.path.join(user_dir, userid))
+                self._store(conn, userid, data)
+                count += 1
+        conn.commit()
+        if count:
+            logging.info("imported %d user profiles from %s" % (count, user_dir))
+
+    def _store(self, conn, userid, data):
+        """ Write profile data and index entries (without committing) """
+        from MoinMoin import user
+        blob = pickle.dumps(data, PICKLE_PROTOCOL)
+        conn.execute("INSERT OR REPLACE INTO users (id, last_saved, data) VALUES (?, ?, ?)",
+                     (userid, data.get('last_saved', u''), sqlite3.Binary(blob)))
+        conn.execute("DELETE FROM user_keys WHERE id = ?", (userid, ))
+        if not int(data.get('disabled', 0) or 0):
+            for attrname in user.CACHED_USER_ATTRS:
+                values = data.get(attrname)
+                if not isinstance(values, list):
+                    values = [values]
+                for value in values:
+                    if value: # we do not store empty values, likely not unique
+                        conn.execute("INSERT INTO user_keys (attr, value, value_lower, id) VALUES (?, ?, ?, ?)",
+                                     (attrname, value, value.lower(), userid))
+        return len(blob)
+
+    def exists(self, request, userid):
+        filename, conn = self._connect(request)
+        row = conn.execute("SELECT 1 FROM users WHERE id = ?", (userid, )).fetchone()
+        return row is not None
+
+    def load(self, request, userid):
+        filename, conn = self._connect(request)
+        key = filename, userid
+        row = conn.execute("SELECT last_saved, length(data) FROM users WHERE id = ?", (userid, )).fetchone()
+        if row is None:
+            self._cache.pop(key, None)
+            return None
+        cached = self._cache.get(key)
+        if cached is not None and cached[:2] == tuple(row):
+            data = cached[2]
+        else:
+            blob = conn.execute("SELECT data FROM users WHERE id = ?", (userid, )).fetchone()[0]
+            data = pickle.loads(str(blob))
+            self._cache[key] = row[0], row[1], data
+        return _copy_data(data)
+
+    def save(self, request, userid, data):
+        filename, conn = self._connect(request)
+        data = _copy_data(data)
+        try:
+            size = self._store(conn, userid, data)
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+        self._cache[filename, userid] = data.get('last_saved', u''), size, data
+
+    def remove(self, request, userid):
+        filename, conn = self._connect(request)
+        conn.execute("DELETE FROM users WHERE id = ?", (userid, ))
+        conn.execute("DELETE FROM user_keys WHERE id = ?", (userid, ))
+        conn.commit()
+        self._cache.pop((filename, userid), None)
+
+    def userids(self, request):
+        filename, conn = self._connect(request)
+        return [str(row[0]) for row in conn.execute("SELECT id FROM users")]
+
+    def lookup(self, request, attrname, value, case=True):
+        filename, conn = self._connect(request)
+        if case:
+            sql = "SELECT id FROM user_keys WHERE attr = ? AND value = ?"
+        else:
+            sql = "SELECT id FROM user_keys WHERE attr = ? AND value_lower = ?"
+            value = value.lower()
+        row = conn.execute(sql, (attrname, value)).fetchone()
+        if row is not None:
+            return str(row[0])
+        return None
+
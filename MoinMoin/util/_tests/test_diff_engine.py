@@ -0,0 +1,108 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.util.diff_engine Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import difflib, random
+
+from MoinMoin.util import diff_engine, diff_text
+
+
+def lcs_length(a, b):
+    """ length of a longest common subsequence (dynamic programming) """
+    row = [0] * (len(b) + 1)
+    for i in range(len(a)):
+        new_row = [0]
+        for j in range(len(b)):
+            if a[i] == b[j]:
+                new_row.append(row[j] + 1)
+            else:
+                new_row.append(max(row[j + 1], new_row[j]))
+        row = new_row
+    return row[-1]
+
+
+def check_blocks(a, b, blocks):
+    assert blocks[-1] == (len(a), len(b), 0)
+    i = j = 0
+    for ai, bj, size in blocks[:-1]:
+        assert size > 0
+        assert ai >= i and bj >= j
+        assert (ai, bj) != (i, j) or (i, j) == (0, 0) # not adjacent
+        assert a[ai:ai + size] == b[bj:bj + size]
+        i, j = ai + size, bj + size
+
+
+class TestDiffEngine:
+
+    def testMyers(self):
+        """ util.diff_engine: Myers' algorithm finds a longest common subsequence """
+        rnd = random.Random(42)
+        for n in range(500):
+            a = [rnd.choice('abcd') for i in range(rnd.randint(0, 12))]
+            b = [rnd.choice('abcd') for i in range(rnd.randint(0, 12))]
+            matches = []
+            diff_engine._myers(a, 0, len(a), b, 0, len(b), matches)
+            assert len(matches) == lcs_length(a, b)
+            for i, j in matches:
+                assert a[i] == b[j]
+
+    def testEngines(self):
+        """ util.diff_engine: all engines give valid matching blocks and opcodes """
+        rnd = random.Random(23)
+        for n in range(200):
+            a = [rnd.choice('abcdefgh') for i in range(rnd.randint(0, 30))]
+            b = a[:]
+            for edit in range(rnd.randint(0, 5)):
+                pos = rnd.randint(0, len(b))
+                b[pos:pos + rnd.randint(0, 3)] = [rnd.choice('abcxyz') for i in range(rnd.randint(0, 3))]
+            for engine in diff_engine.ENGINES:
+                check_blocks(a, b, diff_engine.get_matching_blocks(a, b, engine))
+                new = []
+                for tag, i1, i2, j1, j2 in diff_engine.get_opcodes(a, b, engine):
+                    if tag == 'equal':
+                        assert a[i1:i2] == b[j1:j2]
+                    if tag != 'delete':
+                        new.extend(b[j1:j2])
+                assert new == b
+            assert (diff_engine.get_opcodes(a, b, 'difflib') ==
+                    difflib.SequenceMatcher(None, a, b).get_opcodes())
+
+    def testPatience(self):
+        """ util.diff_engine: patience diff matches unique lines first """
+        a = ['def f():', '    return 1', '', 'def g():', '    return 2', '']
+        b = ['def g():', '    return 2', '', 'def f():', '    return 1', '']
+        # the blank lines are not unique, so they are no anchors
+        blocks = diff_engine.get_matching_blocks(a, b, 'patience')
+        assert blocks == [(3, 0, 2), (5, 5, 1), (6, 6, 0)]
+        assert diff_engine.get_matching_blocks(a, a, 'patience') == [(0, 0, 6), (6, 6, 0)]
+        assert diff_engine.get_matching_blocks([], [], 'patience') == [(0, 0, 0)]
+
+    def testTooManyEdits(self):
+        """ util.diff_engine: very different parts are given up on """
+        old_max = diff_engine.MAX_EDITS
+        diff_engine.MAX_EDITS = 3
+        try:
+            a = list('aabbaabb')
+            b = list('bbaabbaa')
+            blocks = diff_engine.get_matching_blocks(a, b, 'patience')
+            assert blocks == [(8, 8, 0)]
+            assert diff_engine.get_opcodes(a, b, 'patience') == [('replace', 0, 8, 0, 8)]
+        finally:
+            diff_engine.MAX_EDITS = old_max
+
+    def testDiffText(self):
+        """ util.diff_text: the engines give the same output for simple changes """
+        old = ['line %d' % i for i in range(40)]
+        new = old[:]
+        new[5] = 'line 5 changed'
+        del new[20:23]
+        new.insert(30, 'new line')
+        expected = diff_text.diff(old, new, engine='difflib')
+        assert diff_text.diff(old, new, engine='patience') == expected
+        assert diff_text.diff(old, old, engine='patience') == []
+
+coverage_modules = ['MoinMoin.util.diff_engine']
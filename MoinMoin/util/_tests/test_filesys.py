@@ -135,4 +135,40 @@ class TestRename:
         assert not os.path.exists(self.src)
 
 
+class TestStatCache:
+    """ test filesys.StatCache """
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'statcache_')
+        self.fname = os.path.join(self.test_dir, "file")
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def test_cached(self):
+        cache = filesys.StatCache()
+        assert not cache.exists(self.fname)
+        py.test.raises(OSError, cache.getmtime, self.fname)
+        open(self.fname, "w").close()
+        assert not cache.exists(self.fname) # cached result
+        cache.invalidate(self.fname)
+        assert cache.exists(self.fname)
+        assert not cache.isdir(self.fname)
+        assert cache.isdir(self.test_dir)
+        assert cache.getmtime(self.fname) == os.path.getmtime(self.fname)
+        os.remove(self.fname)
+        assert cache.exists(self.fname)
+        cache.clear()
+        assert not cache.exists(self.fname)
+
+    def test_makedirs(self):
+        cache = filesys.StatCache()
+        dirname = os.path.join(self.test_dir, "a", "b")
+        assert not cache.isdir(dirname)
+        cache.makedirs(dirname)
+        assert os.path.isdir(dirname)
+        assert cache.isdir(dirname)
+        cache.makedirs(dirname) # exists, nothing to do
+
+
 coverage_modules = ['MoinMoin.util.filesys']
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+    MoinMoin - MoinMoin.util.generation Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import tempfile, os, shutil
+
+from MoinMoin.util.generation import Generation
+
+
+class TestGeneration(object):
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'generation_')
+        self.filename = os.path.join(self.test_dir, 'sub', 'generation')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def testCreate(self):
+        """ util.generation: a new counter is created with value 0 """
+        gen = Generation(self.filename)
+        assert gen.get() == 0
+        assert os.path.exists(self.filename)
+        gen.close()
+
+    def testShared(self):
+        """ util.generation: a value set via one mapping is seen via another one """
+        writer = Generation(self.filename)
+        reader = Generation(self.filename)
+        assert reader.get() == 0
+        writer.set(4711)
+        assert reader.get() == 4711
+        writer.set(2 ** 40)
+        assert reader.get() == 2 ** 40
+        writer.close()
+        reader.close()
+
+coverage_modules = ['MoinMoin.util.generation']
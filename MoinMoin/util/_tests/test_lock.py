@@ -7,10 +7,11 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import tempfile, os, time, shutil
+import tempfile, os, time, shutil, threading
 
 import py
 
+from MoinMoin.util import lock
 from MoinMoin.util.lock import ExclusiveLock
 
 
@@ -124,5 +125,90 @@ class TestExclusiveLock(object):
         time.sleep(delay)
         lock.release()
 
+
+class TestFlockLock(object):
+
+    def setup_method(self, method):
+        if lock.fcntl is None:
+            py.test.skip("fcntl not available")
+        self.test_dir = tempfile.mkdtemp('', 'lock_')
+        self.lock_dir = os.path.join(self.test_dir, "lock")
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.test_dir)
+
+    def testAcquireRelease(self):
+        """ util.lock: FlockWriteLock: acquire and release """
+        wlock = lock.FlockWriteLock(self.lock_dir)
+        assert wlock.acquire(0.1)
+        assert wlock.isLocked()
+        assert wlock.exists()
+        py.test.raises(RuntimeError, wlock.acquire, 0.1)
+        wlock.release()
+        assert not wlock.isLocked()
+        py.test.raises(RuntimeError, wlock.release)
+
+    def testExclusive(self):
+        """ util.lock: FlockWriteLock excludes other read and write locks """
+        first = lock.FlockWriteLock(self.lock_dir)
+        assert first.acquire(0.1)
+        t = time.time()
+        assert not lock.FlockWriteLock(self.lock_dir).acquire(0.2)
+        assert time.time() - t >= 0.2
+        assert not lock.FlockReadLock(self.lock_dir).acquire(0.1)
+        first.release()
+        assert lock.FlockReadLock(self.lock_dir).acquire(0.1)
+
+    def testShared(self):
+        """ util.lock: FlockReadLock is shared, but excludes write locks """
+        first = lock.FlockReadLock(self.lock_dir)
+        second = lock.FlockReadLock(self.lock_dir)
+        assert first.acquire(0.1)
+        assert second.acquire(0.1)
+        assert not lock.FlockWriteLock(self.lock_dir).acquire(0.1)
+        first.release()
+        second.release()
+        assert lock.FlockWriteLock(self.lock_dir).acquire(0.1)
+
+    def testBlockingWait(self):
+        """ util.lock: FlockWriteLock: waiting lock gets the lock when it is released """
+        first = lock.FlockWriteLock(self.lock_dir)
+        assert first.acquire()
+        timer = threading.Timer(0.2, first.release)
+        timer.start()
+        second = lock.FlockWriteLock(self.lock_dir)
+        assert second.acquire(5.0)
+        second.release()
+        # a waiter that gave up must not keep the lock when it gets it later
+        assert first.acquire()
+        assert not second.acquire(0.1)
+        first.release()
+        assert second.acquire(1.0)
+
+    def testProcessDeath(self):
+        """ util.lock: FlockWriteLock: lock of a dead process is released """
+        if not hasattr(os, 'fork'):
+            py.test.skip("no fork")
+        r, w = os.pipe()
+        pid = os.fork()
+        if not pid:
+            lock.FlockWriteLock(self.lock_dir).acquire()
+            os.write(w, 'x')
+            time.sleep(0.3)
+            os._exit(0) # dies without releasing the lock
+        os.read(r, 1)
+        os.close(r)
+        os.close(w)
+        wlock = lock.FlockWriteLock(self.lock_dir)
+        assert not wlock.acquire(0.1)
+        assert wlock.acquire(5.0)
+        os.waitpid(pid, 0)
+
+    def testGetLockClasses(self):
+        """ util.lock: getLockClasses """
+        assert lock.getLockClasses('dir') == (lock.ReadLock, lock.WriteLock)
+        assert lock.getLockClasses('flock') == (lock.FlockReadLock, lock.FlockWriteLock)
+        py.test.raises(ValueError, lock.getLockClasses, 'foo')
+
 coverage_modules = ['MoinMoin.util.lock']
 
@@ -0,0 +1,37 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.util.lru Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.util.lru import LRUCache
+
+
+class TestLRUCache(object):
+
+    def test_eviction_order(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1 # b is least recently used now
+        cache.set('c', 3)
+        assert 'b' not in cache
+        assert cache.get('b', 42) == 42
+        assert len(cache) == 2
+
+    def test_max_size(self):
+        cache = LRUCache(max_size=10)
+        cache.set('a', 'A', 6)
+        cache.set('b', 'B', 4)
+        assert cache.size == 10
+        cache.set('c', 'C', 1) # evicts a
+        assert 'a' not in cache
+        assert cache.size == 5
+        cache.set('d', 'D', 11) # too big
+        assert 'd' not in cache
+        cache.delete('b')
+        assert cache.size == 1
+
+coverage_modules = ['MoinMoin.util.lru']
@@ -0,0 +1,56 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.util.nameindex Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import difflib
+
+from MoinMoin.util.nameindex import NameIndex
+
+NAMES = [u'FrontPage', u'FrontPage/Sub', u'RecentChanges', u'WikiSandBox', u'SandBox',
+         u'HelpContents', u'HelpOnEditing', u'HelpOnLinking', u'frontpage', u'FindPage']
+
+
+class TestNameIndex(object):
+
+    def test_prefix_suffix(self):
+        index = NameIndex(NAMES)
+        assert len(index) == len(NAMES)
+        assert index.startswith(u'Help') == [u'HelpContents', u'HelpOnEditing', u'HelpOnLinking']
+        assert index.startswith(u'FrontPage/') == [u'FrontPage/Sub']
+        assert sorted(index.endswith(u'Box')) == [u'SandBox', u'WikiSandBox']
+        assert index.startswith(u'Nothing') == []
+
+    def test_close_matches(self):
+        index = NameIndex(NAMES)
+        for word in [u'FrontPaeg', u'HelpOnEditting', u'sandbox', u'RecentChange', u'Xyz']:
+            lower = {}
+            for name in NAMES:
+                lower.setdefault(name.lower(), []).append(name)
+            expected = []
+            for key in difflib.get_close_matches(word.lower(), lower.keys(), len(lower), cutoff=0.6):
+                expected.extend(lower[key])
+            assert sorted(index.close_matches(word)) == sorted(expected)
+        assert index.close_matches(u'FrontPaeg')[:2] in ([u'FrontPage', u'frontpage'],
+                                                         [u'frontpage', u'FrontPage'])
+
+    def test_add_remove(self):
+        index = NameIndex(NAMES)
+        index.add(u'HelpOnMacros')
+        index.add(u'HelpOnMacros') # already there
+        assert len(index) == len(NAMES) + 1
+        assert u'HelpOnMacros' in index.startswith(u'HelpOn')
+        assert u'HelpOnMacros' in index.close_matches(u'HelpOnMakros')
+        index.remove(u'FrontPage')
+        index.remove(u'NotThere')
+        assert u'FrontPage' not in index
+        assert u'frontpage' in index
+        assert index.close_matches(u'FrontPage')[:2] == [u'frontpage', u'FrontPage/Sub']
+        index.remove(u'frontpage')
+        assert u'frontpage' not in index.close_matches(u'FrontPage')
+        assert index.startswith(u'Front') == [u'FrontPage/Sub']
+
+coverage_modules = ['MoinMoin.util.nameindex']
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+    MoinMoin - MoinMoin.util.ratelimit Tests
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import tempfile, os, shutil
+
+from MoinMoin.util.ratelimit import RateTable
+
+NOW = 1300000020 # start of a 60s window
+
+
+class TestRateTable(object):
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'ratelimit_')
+        self.filename = os.path.join(self.test_dir, 'sub', 'table')
+        self.table = RateTable(self.filename)
+
+    def teardown_method(self, method):
+        self.table.close()
+        shutil.rmtree(self.test_dir)
+
+    def testLimit(self):
+        """ util.ratelimit: more than maxnum events during dt get locked out """
+        for i in range(4): # maxnum events and the one after them are ok
+            assert not self.table.hit('a', 3, 60, 600, NOW + i)
+        assert self.table.hit('a', 3, 60, 600, NOW + 5)
+        assert not self.table.hit(u'b', 3, 60, 600, NOW + 5) # other keys are independent
+        # locked out although the window is over
+        assert self.table.hit('a', 3, 60, 600, NOW + 120)
+        assert not self.table.hit('a', 3, 60, 600, NOW + 606)
+
+    def testSlidingWindow(self):
+        """ util.ratelimit: events of the previous window count partially """
+        for i in range(4):
+            assert not self.table.hit('a', 3, 60, 600, NOW + 30 + i)
+        # 4 events in the previous window, 11/12 of it is still in the last 60s
+        assert self.table.hit('a', 3, 60, 600, NOW + 60 + 5)
+        for i in range(4):
+            assert not self.table.hit('b', 3, 60, 600, NOW + 30 + i)
+        assert not self.table.hit('b', 3, 60, 600, NOW + 60 + 30) # only 2 left
+
+    def testKick(self):
+        """ util.ratelimit: surge=True locks out immediately """
+        assert self.table.hit('a', 3, 60, 600, NOW, surge=True)
+        assert self.table.hit('a', 3, 60, 600, NOW + 300)
+
+    def testShared(self):
+        """ util.ratelimit: all processes use the same counters """
+        other = RateTable(self.filename)
+        for i in range(4):
+            assert not self.table.hit('a', 3, 60, 600, NOW)
+        assert other.hit('a', 3, 60, 600, NOW)
+        other.close()
+
+    def testFullTable(self):
+        """ util.ratelimit: expired slots get reused """
+        self.table.SLOTS = self.table.PROBES = 4
+        for key in range(4):
+            self.table.hit(str(key), 3, 60, 600, NOW, surge=key == 0)
+        self.table.hit('new', 3, 60, 600, NOW + 180) # takes over an expired slot
+        assert self.table.hit('0', 3, 60, 600, NOW + 180) # locked out, kept
+        assert not self.table.hit('new', 3, 60, 600, NOW + 181)
+
+coverage_modules = ['MoinMoin.util.ratelimit']
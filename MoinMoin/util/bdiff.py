@@ -9,7 +9,9 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import zlib, difflib, struct
+import zlib, struct
+
+from MoinMoin.util import diff_engine
 
 BDIFF_PATT = ">lll"
 BDIFF_PATT_SIZE = struct.calcsize(BDIFF_PATT)
@@ -20,10 +22,11 @@ def compress(text):
 def decompress(bin):
     return zlib.decompress(bin)
 
-def diff(a, b):
+def diff(a, b, engine=None):
     """ Generates a binary diff of the passed strings.
         Note that you can pass arrays of strings as well.
-        This might give you better results for text files. """
+        This might give you better results for text files.
+        engine is the name of the diff engine (see MoinMoin.util.diff_engine). """
     if not a:
         s = "".join(b)
         return s and (struct.pack(BDIFF_PATT, 0, 0, len(s)) + s)
@@ -34,7 +37,7 @@ def diff(a, b):
     p = [0]
     for i in a: p.append(p[-1] + len(i))
 
-    for am, bm, size in difflib.SequenceMatcher(None, a, b).get_matching_blocks():
+    for am, bm, size in diff_engine.get_matching_blocks(a, b, engine):
         s = "".join(b[lb:bm])
         if am > la or s:
             bin.append(struct.pack(BDIFF_PATT, p[la], p[am], len(s)) + s)
@@ -43,9 +46,9 @@ def diff(a, b):
 
     return "".join(bin)
 
-def textdiff(a, b):
+def textdiff(a, b, engine=None):
     """ A diff function optimised for text files. Works with binary files as well. """
-    return diff(a.splitlines(1), b.splitlines(1))
+    return diff(a.splitlines(1), b.splitlines(1), engine)
 
 def patchtext(bin):
     """ Returns the new hunks that are contained in a binary diff."""
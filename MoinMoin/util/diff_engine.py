@@ -0,0 +1,230 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - line diff engines
+
+    A diff engine finds the longest (or a good) common subsequence of two
+    sequences of hashable items (usually text lines) and returns it as
+    matching blocks, like difflib.SequenceMatcher.get_matching_blocks().
+
+    Engines:
+
+    difflib  - difflib.SequenceMatcher, gets slow (worse than quadratic) for
+               long texts with many similar or repeated lines.
+    patience - patience diff: the lines occuring exactly once in both texts
+               are matched up first (longest increasing subsequence), then the
+               parts between them are diffed the same way. Parts without such
+               lines are diffed with Myers' O(ND) algorithm, so equal texts and
+               texts with few changes are diffed in about linear time. The
+               result is usually more readable, too (e.g. moved or reindented
+               blocks do not get matched on blank lines or brackets).
+
+    cfg.diff_engine selects the engine used by the diff action, notification
+    mails and XML-RPC getDiff.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import bisect
+import difflib
+
+# Myers' algorithm gives up (and reports no more matches in a part) when the
+# part needs more edits than this - memory and time grow with its square.
+MAX_EDITS = 1000
+
+
+def difflib_matching_blocks(a, b):
+    return difflib.SequenceMatcher(None, a, b).get_matching_blocks()
+
+
+def _unique_lcs(a, alo, ahi, b, blo, bhi):
+    """ Return the longest list of (i, j) with a[i] == b[j], both occuring
+        only once in a[alo:ahi] and b[blo:bhi], ascending in i and j
+    """
+    counts = {}
+    for i in xrange(alo, ahi):
+        line = a[i]
+        if line in counts:
+            counts[line] = None # not unique
+        else:
+            counts[line] = i
+    bcounts = {}
+    for j in xrange(blo, bhi):
+        line = b[j]
+        if counts.get(line) is not None:
+            if line in bcounts:
+                bcounts[line] = None
+            else:
+                bcounts[line] = j
+    pairs = [(counts[line], j) for line, j in bcounts.iteritems() if j is not None]
+    if not pairs:
+        return []
+    pairs.sort()
+    # patience sorting: tops[n] is the smallest j ending an increasing
+    # subsequence of length n + 1, backpointers to rebuild it
+    tops = []
+    top_pairs = []
+    back = {}
+    for pair in pairs:
+        n = bisect.bisect_left(tops, pair[1])
+        if n == len(tops):
+            tops.append(pair[1])
+            top_pairs.append(pair)
+        else:
+            tops[n] = pair[1]
+            top_pairs[n] = pair
+        back[pair] = n and top_pairs[n - 1] or None
+    result = []
+    pair = top_pairs[-1]
+    while pair is not None:
+        result.append(pair)
+        pair = back[pair]
+    result.reverse()
+    return result
+
+
+def _myers(a, alo, ahi, b, blo, bhi, matches):
+    """ Append the (i, j) of a longest common subsequence of a[alo:ahi] and
+        b[blo:bhi] to matches (nothing if it needs more than MAX_EDITS edits)
+    """
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, MAX_EDITS)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3) # furthest x on diagonal k (at index k + offset)
+    trace = []
+    for d in xrange(max_d + 1):
+        done = False
+        for k in xrange(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                done = True
+                break
+        trace.append(v[offset - d:offset + d + 1])
+        if done:
+            break
+    else:
+        return
+
+    found = []
+    x, y = n, m
+    for d in xrange(len(trace) - 1, 0, -1):
+        prev = trace[d - 1] # diagonal k at index k + d - 1
+        k = x - y
+        if k == -d or (k != d and prev[k - 1 + d - 1] < prev[k + 1 + d - 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[prev_k + d - 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            found.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        found.append((alo + x, blo + y))
+    found.reverse()
+    matches.extend(found)
+
+
+def _patience(a, alo, ahi, b, blo, bhi, matches):
+    """ Append the (i, j) of the matching items of a[alo:ahi] and b[blo:bhi]
+        to matches
+    """
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo += 1
+        blo += 1
+    suffix = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        suffix.append((ahi, bhi))
+    if alo < ahi and blo < bhi:
+        anchors = _unique_lcs(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                _patience(a, alo, i, b, blo, j, matches)
+                matches.append((i, j))
+                alo, blo = i + 1, j + 1
+            _patience(a, alo, ahi, b, blo, bhi, matches)
+        else:
+            _myers(a, alo, ahi, b, blo, bhi, matches)
+    suffix.reverse()
+    matches.extend(suffix)
+
+
+def patience_matching_blocks(a, b):
+    matches = []
+    _patience(a, 0, len(a), b, 0, len(b), matches)
+    blocks = []
+    for i, j in matches:
+        if blocks:
+            last = blocks[-1]
+            if last[0] + last[2] == i and last[1] + last[2] == j:
+                last[2] += 1
+                continue
+        blocks.append([i, j, 1])
+    blocks = [tuple(block) for block in blocks]
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+ENGINES = {
+    'difflib': difflib_matching_blocks,
+    'patience': patience_matching_blocks,
+}
+
+DEFAULT_ENGINE = 'patience'
+
+
+def get_matching_blocks(a, b, engine=None):
+    """ Find the matching blocks of two sequences
+
+    @param a: old sequence (e.g. list of lines)
+    @param b: new sequence
+    @param engine: name of the diff engine (see ENGINES, default: DEFAULT_ENGINE)
+    @rtype: list of (i, j, n) tuples, ascending and not adjacent
+    @return: a[i:i+n] == b[j:j+n] for each block, the last one is
+             (len(a), len(b), 0) - like SequenceMatcher.get_matching_blocks()
+    """
+    return ENGINES[engine or DEFAULT_ENGINE](a, b)
+
+
+def get_opcodes(a, b, engine=None):
+    """ Describe how to turn a into b
+
+    @param a: old sequence (e.g. list of lines)
+    @param b: new sequence
+    @param engine: name of the diff engine (see ENGINES, default: DEFAULT_ENGINE)
+    @rtype: list of (tag, i1, i2, j1, j2) tuples
+    @return: like SequenceMatcher.get_opcodes(), tag is one of 'replace',
+             'delete', 'insert' or 'equal'
+    """
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in get_matching_blocks(a, b, engine):
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
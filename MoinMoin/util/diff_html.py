@@ -3,13 +3,15 @@
     MoinMoin - Side by side diffs
 
     @copyright: 2002 Juergen Hermann <jh@web.de>,
-                2002 Scott Moonen <smoonen@andstuff.org>
+                2002 Scott Moonen <smoonen@andstuff.org>,
+                2026 MoinMoin contributors
     @license: GNU GPL, see COPYING for details.
 """
 
 import difflib
 
 from MoinMoin.wikiutil import escape
+from MoinMoin.util import diff_engine
 
 def indent(line):
     eol = ''
@@ -24,7 +26,7 @@ def indent(line):
 
 
 # This code originally by Scott Moonen, used with permission.
-def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom='', old_top_class='', new_top_class='', old_bottom_class='', new_bottom_class=''):
+def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom='', old_top_class='', new_top_class='', old_bottom_class='', new_bottom_class='', engine=None):
     """ Find changes between old and new and return
         HTML markup visualising them.
 
@@ -38,16 +40,17 @@ def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom=''
         @param new_top_class: Custom class for <td> with new_top content (optional)
         @param old_bottom_class: Custom class for <td> with old_bottom content (optional)
         @param new_bottom_class: Custom class for <td> with new_bottom content (optional)
+        @param engine: diff engine to use (optional, default: cfg.diff_engine)
     """
-    _ = request.getText
-    t_line = _("Line") + " %d"
+    return diff_table(diff_rows(request, old, new, engine),
+                      old_top, new_top, old_bottom, new_bottom,
+                      old_top_class, new_top_class, old_bottom_class, new_bottom_class)
 
-    seq1 = old.splitlines()
-    seq2 = new.splitlines()
-
-    seqobj = difflib.SequenceMatcher(None, seq1, seq2)
-    linematch = seqobj.get_matching_blocks()
 
+def diff_table(rows, old_top='', new_top='', old_bottom='', new_bottom='', old_top_class='', new_top_class='', old_bottom_class='', new_bottom_class=''):
+    """ Return the diff table with the rows made by diff_rows (and the
+        custom html on top and at the bottom, see diff)
+    """
     result = """
 <table class="diff">
 """
@@ -55,6 +58,29 @@ def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom=''
     if old_top or new_top:
         result += '<tr><td class="%s">%s</td><td class="%s">%s</td></tr>' % (old_top_class, old_top, new_top_class, new_top)
 
+    result += rows
+
+    if old_bottom or new_bottom:
+        result += '<tr><td class="%s">%s</td><td class="%s">%s</td></tr>' % (old_top_class, old_top, new_top_class, new_top)
+
+    result += '</table>\n'
+    return result
+
+
+def diff_rows(request, old, new, engine=None):
+    """ Find changes between old and new and return the table rows
+        visualising them (in the user interface language, see diff).
+    """
+    _ = request.getText
+    t_line = _("Line") + " %d"
+
+    seq1 = old.splitlines()
+    seq2 = new.splitlines()
+
+    linematch = diff_engine.get_matching_blocks(seq1, seq2, engine or request.cfg.diff_engine)
+
+    result = ''
+
     if len(seq1) == len(seq2) and linematch[0] == (0, 0, len(seq1)):
         # No differences.
         result += '<tr><td class="diff-same" colspan="2">' + _("No differences found!") + '</td></tr>'
@@ -96,10 +122,11 @@ def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom=''
                         rightpane += '\n'
                     rightpane += seq2[lastmatch[1] + line]
 
+            # the quick ratios are upper bounds of the ratio, avoid computing
+            # the (slow) character diff if they are too small already
             charobj = difflib.SequenceMatcher(None, leftpane, rightpane)
-            charmatch = charobj.get_matching_blocks()
-
-            if charobj.ratio() < 0.5:
+            if (charobj.real_quick_ratio() < 0.5 or charobj.quick_ratio() < 0.5 or
+                charobj.ratio() < 0.5):
                 # Insufficient similarity.
                 if leftpane:
                     leftresult = """<span>%s</span>""" % indent(escape(leftpane))
@@ -116,7 +143,7 @@ def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom=''
 
                 leftresult = ''
                 rightresult = ''
-                for thismatch in charmatch:
+                for thismatch in charobj.get_matching_blocks():
                     if thismatch[0] - charlast[0] != 0:
                         leftresult += """<span>%s</span>""" % indent(
                             escape(leftpane[charlast[0]:thismatch[0]]))
@@ -140,9 +167,5 @@ def diff(request, old, new, old_top='', new_top='', old_bottom='', new_bottom=''
 
             lastmatch = (match[0] + match[2], match[1] + match[2])
 
-    if old_bottom or new_bottom:
-        result += '<tr><td class="%s">%s</td><td class="%s">%s</td></tr>' % (old_top_class, old_top, new_top_class, new_top)
-
-    result += '</table>\n'
     return result
 
@@ -1,12 +1,41 @@
 # -*- coding: iso-8859-1 -*-
 """
-    MoinMoin - simple text diff (uses difflib)
+    MoinMoin - simple text diff (uses difflib or another diff engine)
 
-    @copyright: 2006 MoinMoin:ThomasWaldmann
+    @copyright: 2006 MoinMoin:ThomasWaldmann,
+                2026 MoinMoin contributors
     @license: GNU GPL, see COPYING for details.
 """
 import difflib
 
+from MoinMoin.util import diff_engine
+
+# replaced blocks of at most that many old x new lines get similar lines
+# paired up (like difflib.Differ does), bigger ones are output as a whole
+FANCY_REPLACE_LIMIT = 10000
+
+
+def compare(oldlines, newlines, differ, engine=None):
+    """ Like differ.compare(oldlines, newlines), but lines get matched by
+        the diff engine. Only the replaced blocks are refined by the (slow)
+        differ.
+    """
+    for tag, alo, ahi, blo, bhi in diff_engine.get_opcodes(oldlines, newlines, engine):
+        if tag == 'replace':
+            if (ahi - alo) * (bhi - blo) <= FANCY_REPLACE_LIMIT:
+                g = differ._fancy_replace(oldlines, alo, ahi, newlines, blo, bhi)
+            else:
+                g = differ._plain_replace(oldlines, alo, ahi, newlines, blo, bhi)
+        elif tag == 'delete':
+            g = differ._dump('-', oldlines, alo, ahi)
+        elif tag == 'insert':
+            g = differ._dump('+', newlines, blo, bhi)
+        else:
+            g = differ._dump(' ', oldlines, alo, ahi)
+        for line in g:
+            yield line
+
+
 def diff(oldlines, newlines, **kw):
     """
     Find changes between oldlines and newlines.
@@ -14,6 +43,8 @@ def diff(oldlines, newlines, **kw):
     @param oldlines: list of old text lines
     @param newlines: list of new text lines
     @keyword ignorews: if 1: ignore whitespace
+    @keyword engine: diff engine to use (see MoinMoin.util.diff_engine),
+                     'difflib' gives exactly the output of difflib.Differ
     @rtype: list
     @return: lines like diff tool does output.
     """
@@ -23,7 +54,11 @@ def diff(oldlines, newlines, **kw):
     else:
         d = difflib.Differ(false, false)
 
-    lines = list(d.compare(oldlines, newlines))
+    engine = kw.get('engine') or diff_engine.DEFAULT_ENGINE
+    if engine == 'difflib':
+        lines = list(d.compare(oldlines, newlines))
+    else:
+        lines = list(compare(oldlines, newlines, d, engine))
 
     # return empty list if there were no changes
     changed = 0
@@ -180,6 +180,74 @@ def fuid(filename, max_staleness=3600):
     return uid
 
 
+class StatCache:
+    """ Cache of os.stat results
+
+    Used per request (request.stat_cache) for the page directory tree, so
+    the many existence and mtime checks done while rendering a page only
+    stat each path once. Code changing files / directories that might have
+    been looked at must call invalidate() or clear() afterwards.
+
+    .memo can be used for other data about the files (e.g. page existence),
+    it is cleared together with the stat results.
+    """
+    def __init__(self):
+        self._stats = {}
+        self.memo = {}
+
+    def stat(self, path):
+        """ Return os.stat(path) or None if it can not be stat()ed """
+        try:
+            return self._stats[path]
+        except KeyError:
+            try:
+                st = os.stat(path)
+            except (IOError, OSError):
+                st = None
+            self._stats[path] = st
+            return st
+
+    def exists(self, path):
+        """ Cached os.path.exists """
+        return self.stat(path) is not None
+
+    def isdir(self, path):
+        """ Cached os.path.isdir """
+        st = self.stat(path)
+        return st is not None and S_ISDIR(st.st_mode)
+
+    def getmtime(self, path):
+        """ Cached os.path.getmtime (raises OSError if path does not exist) """
+        st = self.stat(path)
+        if st is None:
+            raise OSError(errno.ENOENT, "No such file or directory", path)
+        return st.st_mtime
+
+    def makedirs(self, path):
+        """ Create directory path (including parents) if it does not exist """
+        if self.isdir(path):
+            return
+        try:
+            os.makedirs(path)
+        except OSError, err:
+            if not os.path.exists(path):
+                raise
+        self.clear() # also forget about parent directories
+
+    def invalidate(self, path):
+        """ Forget the stat results of path and its directory (which changed
+            if path was created, renamed or removed).
+        """
+        self._stats.pop(path, None)
+        self._stats.pop(os.path.dirname(path), None)
+        self.memo.clear()
+
+    def clear(self):
+        """ Forget everything """
+        self._stats.clear()
+        self.memo.clear()
+
+
 def copystat(src, dst):
     """Copy stat bits from src to dst
 
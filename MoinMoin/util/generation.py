@@ -0,0 +1,74 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - cross-process generation counter
+
+    A generation counter is a tiny file holding a 64bit number, memory mapped
+    by every process using it. A writer stores a new value after it changed
+    something (e.g. appended to the edit-log), a reader just compares the
+    current value with the one it has seen last time. As the file is memory
+    mapped, this comparison does not need any system call.
+
+    Note: the value is not incremented (that would need locking), writers
+    rather store some value that is unique for their change, like the new
+    size of an append-only file. Readers must only check for inequality.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, mmap, struct
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import config
+
+_FORMAT = '<Q'
+_SIZE = struct.calcsize(_FORMAT)
+
+
+class Generation:
+    """ Memory mapped generation counter """
+    def __init__(self, filename):
+        """
+        @param filename: name of the counter file (will be created if needed)
+        """
+        self.filename = filename
+        self._map = None
+
+    def _open(self):
+        if self._map is None:
+            dirname = os.path.dirname(self.filename)
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                if not os.path.isdir(dirname):
+                    raise
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0666 & config.umask)
+            try:
+                if os.fstat(fd).st_size < _SIZE:
+                    os.write(fd, '\0' * _SIZE)
+                self._map = mmap.mmap(fd, _SIZE)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def get(self):
+        """ Return the current value or None if the counter is not usable """
+        try:
+            return struct.unpack(_FORMAT, self._open()[:_SIZE])[0]
+        except EnvironmentError, err:
+            logging.warning("generation counter %r not usable (%s)" % (self.filename, str(err)))
+            return None
+
+    def set(self, value):
+        """ Store a new value (must be different from the old one) """
+        try:
+            self._open()[:_SIZE] = struct.pack(_FORMAT, value)
+        except EnvironmentError, err:
+            logging.warning("generation counter %r not usable (%s)" % (self.filename, str(err)))
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
@@ -2,16 +2,32 @@
 """
     MoinMoin - locking functions
 
+    There are 2 lock implementations, selected by cfg.lock_mode (see
+    getLockClasses):
+
+    'dir' - portable locks using lock directories (ExclusiveLock, ReadLock,
+            WriteLock), waiting for other locks is done by polling
+    'flock' - POSIX only locks using fcntl.flock (FlockReadLock,
+              FlockWriteLock), waiting is done by blocking in the kernel and
+              locks of dead processes are released automatically
+
     @copyright: 2005 Florian Festi, Nir Soffer,
-                2008 MoinMoin:ThomasWaldmann
+                2008 MoinMoin:ThomasWaldmann,
+                2026 MoinMoin contributors
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, sys, tempfile, time, errno
+import os, sys, tempfile, time, errno, threading, select
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # e.g. win32
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
+from MoinMoin import config
 from MoinMoin.util import filesys
 
 class Timer:
@@ -400,3 +416,172 @@ class LazyWriteLock(WriteLock):
             return WriteLock.expire(self)
         else: # POSIX
             return True
+
+
+class FlockLock:
+    """ Lock using fcntl.flock on the file <dir>/flock
+
+    Has the same interface as ExclusiveLock (and ReadLock/WriteLock), but:
+     * the lock is held by an open file, so it is released by the operating
+       system if the process dies - there are no stale locks to expire
+     * waiting for a lock blocks in the kernel instead of polling
+     * flock locks belong to an open file (not to the process like lockf/fcntl
+       locks), so this also works between threads of the same process
+
+    Subclasses define the flock operation (shared or exclusive).
+    """
+    fileName = 'flock'
+    operation = None # fcntl.LOCK_SH or fcntl.LOCK_EX
+
+    def __init__(self, dir, timeout=None):
+        """ Init a flock lock
+
+        @param dir: the lock directory (will be created if needed)
+        @param timeout: ignored (locks of dead processes vanish automatically),
+                        just for compatibility with the lock directory classes
+        """
+        self.dir = dir
+        self.timeout = timeout
+        self.lockFile = os.path.join(dir, self.fileName)
+        self._fd = None
+
+    def acquire(self, timeout=None):
+        """ Try to acquire the lock, wait at most timeout seconds
+            (forever, if timeout is None).
+
+        Return True if a lock was acquired; False otherwise.
+        """
+        if self._fd is not None:
+            raise RuntimeError("lock already locked")
+        fd = self._open()
+        try:
+            fcntl.flock(fd, self.operation | fcntl.LOCK_NB)
+        except IOError, err:
+            if err.errno not in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                os.close(fd)
+                raise
+            if not self._wait(fd, timeout):
+                logging.debug('failed to acquire flock lock: %s' % (self.lockFile, ))
+                return False
+        self._fd = fd
+        logging.debug('acquired flock lock: %s' % (self.lockFile, ))
+        return True
+
+    def release(self):
+        """ Release the lock """
+        if self._fd is None:
+            raise RuntimeError('lock already released: %s' % self.lockFile)
+        fd, self._fd = self._fd, None
+        os.close(fd) # also releases the flock
+        logging.debug('released flock lock: %s' % self.lockFile)
+
+    def isLocked(self):
+        return self._fd is not None
+
+    def exists(self):
+        return os.path.exists(self.lockFile)
+
+    def isExpired(self):
+        return False
+
+    def expire(self):
+        return False
+
+    # Private -------------------------------------------------------
+
+    def _open(self):
+        flags = os.O_RDWR | os.O_CREAT
+        try:
+            return os.open(self.lockFile, flags, 0666 & config.umask)
+        except OSError, err:
+            if err.errno != errno.ENOENT:
+                raise
+            try:
+                os.makedirs(self.dir)
+            except OSError, err:
+                if err.errno != errno.EEXIST:
+                    raise
+            return os.open(self.lockFile, flags, 0666 & config.umask)
+
+    def _wait(self, fd, timeout):
+        """ Block until we get the lock on fd (return True) or timeout passed
+            (return False, fd is closed then).
+
+        As flock has no timeout, a helper thread does the blocking flock call.
+        If we give up waiting, the helper thread owns fd and closes it (and
+        thus releases the lock) whenever it finally gets the lock.
+        """
+        if timeout is None:
+            fcntl.flock(fd, self.operation)
+            return True
+        state = {'done': False, 'locked': False, 'abandoned': False, }
+        mutex = threading.Lock()
+        # the waiter signals us through a pipe, so we can block in select()
+        # (threading.Event.wait with a timeout polls)
+        signal_r, signal_w = os.pipe()
+
+        def waiter():
+            try:
+                fcntl.flock(fd, self.operation)
+                success = True
+            except IOError:
+                success = False
+            mutex.acquire()
+            try:
+                if state['abandoned']:
+                    os.close(fd)
+                else:
+                    state['done'] = True
+                    state['locked'] = success
+                    os.write(signal_w, 'x')
+                os.close(signal_w)
+            finally:
+                mutex.release()
+
+        thread = threading.Thread(target=waiter)
+        thread.setDaemon(True)
+        thread.start()
+        try:
+            try:
+                select.select([signal_r], [], [], timeout)
+            except select.error:
+                pass
+            mutex.acquire()
+            try:
+                if not state['done']:
+                    state['abandoned'] = True # waiter will close fd
+                    return False
+            finally:
+                mutex.release()
+        finally:
+            os.close(signal_r)
+        if not state['locked']:
+            os.close(fd)
+        return state['locked']
+
+
+class FlockReadLock(FlockLock):
+    """ Read lock (shared flock), see ReadLock """
+    if fcntl is not None:
+        operation = fcntl.LOCK_SH
+
+
+class FlockWriteLock(FlockLock):
+    """ Write lock (exclusive flock), see WriteLock """
+    if fcntl is not None:
+        operation = fcntl.LOCK_EX
+
+
+def getLockClasses(mode):
+    """ Return the (read lock, write lock) classes for some cfg.lock_mode
+
+    @param mode: 'dir' or 'flock' (if fcntl is not available on this platform,
+                 we fall back to 'dir')
+    """
+    if mode == 'flock':
+        if fcntl is not None:
+            return FlockReadLock, FlockWriteLock
+        logging.warning("lock_mode 'flock' is not available on this platform, using 'dir'")
+    elif mode != 'dir':
+        raise ValueError("unknown lock_mode %r" % mode)
+    return ReadLock, WriteLock
@@ -0,0 +1,96 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - bounded, thread safe LRU mapping
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import threading
+
+
+class LRUCache:
+    """ Mapping that discards the least recently used entries if it holds
+        more than max_entries entries or if the total size of the entries
+        exceeds max_size (the size of an entry is given when setting it).
+    """
+    def __init__(self, max_entries=1000, max_size=None):
+        """
+        @param max_entries: maximum number of entries to keep
+        @param max_size: maximum total size of the entries (None = unlimited)
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {} # key -> link [prev, next, key, value, size]
+        self._root = root = [] # doubly linked list, most recently used first
+        root[:] = [root, root, None, None, 0]
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _unlink(self, link):
+        prev_link, next_link = link[0], link[1]
+        prev_link[1] = next_link
+        next_link[0] = prev_link
+
+    def _link_first(self, link):
+        root = self._root
+        first = root[1]
+        link[0], link[1] = root, first
+        root[1] = first[0] = link
+
+    def get(self, key, default=None):
+        """ Return the value stored under key (or default) and mark it as
+            most recently used.
+        """
+        self._lock.acquire()
+        try:
+            link = self._entries.get(key)
+            if link is None:
+                return default
+            self._unlink(link)
+            self._link_first(link)
+            return link[3]
+        finally:
+            self._lock.release()
+
+    def set(self, key, value, size=0):
+        """ Store value under key
+
+        @param size: the size of value (e.g. in bytes), values bigger than
+                     max_size are not stored at all
+        """
+        self._lock.acquire()
+        try:
+            self._remove(key)
+            if self.max_size is not None and size > self.max_size:
+                return
+            link = [None, None, key, value, size]
+            self._link_first(link)
+            self._entries[key] = link
+            self.size += size
+            root = self._root
+            while len(self._entries) > self.max_entries or (
+                  self.max_size is not None and self.size > self.max_size):
+                self._remove(root[0][2]) # the least recently used one
+        finally:
+            self._lock.release()
+
+    def delete(self, key):
+        """ Remove key (if it is there) """
+        self._lock.acquire()
+        try:
+            self._remove(key)
+        finally:
+            self._lock.release()
+
+    def _remove(self, key):
+        link = self._entries.pop(key, None)
+        if link is not None:
+            self._unlink(link)
+            self.size -= link[4]
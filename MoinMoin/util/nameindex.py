@@ -0,0 +1,148 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - index of names for prefix, suffix and fuzzy lookups
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import bisect
+import difflib
+import heapq
+import operator
+
+
+class NameIndex:
+    """ Set of names, answering which names start or end with some string
+        (using sorted lists of the names and of the reversed names) and which
+        names are similar to some name (using an inverted index of the
+        n-grams of the lowercased names).
+
+        Changes are done copy-on-write (we never modify a set or list another
+        thread might be looking at), so lookups need no locking. Concurrent
+        changes must be serialized by the caller.
+    """
+    MAX_CANDIDATES = 200 # names sharing most n-grams we compare in detail
+
+    def __init__(self, names=(), n=3):
+        """
+        @param names: initial names (unicode)
+        @param n: length of the n-grams
+        """
+        self.n = n
+        names = set(names)
+        self.names = sorted(names)
+        self.reversed = sorted([name[::-1] for name in names])
+        self.lower = {} # lowercased name -> list of names
+        self.grams = {} # n-gram -> set of lowercased names
+        for name in names:
+            key = name.lower()
+            if key in self.lower:
+                self.lower[key].append(name)
+                continue
+            self.lower[key] = [name]
+            for gram in self._grams(key):
+                keys = self.grams.get(gram)
+                if keys is None:
+                    keys = self.grams[gram] = set()
+                keys.add(key)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.lower.get(name.lower(), ())
+
+    def _grams(self, key):
+        """ Return the set of n-grams of a lowercased name """
+        padded = u'\0' + key + u'\0'
+        return set([padded[i:i+self.n] for i in range(max(len(padded) - self.n + 1, 1))])
+
+    def add(self, name):
+        """ Add a name (if it is not there yet) """
+        if name in self:
+            return
+        names = self.names[:]
+        bisect.insort(names, name)
+        reversed_names = self.reversed[:]
+        bisect.insort(reversed_names, name[::-1])
+        self.names, self.reversed = names, reversed_names
+        key = name.lower()
+        names = self.lower.get(key)
+        if names:
+            self.lower[key] = names + [name]
+            return
+        self.lower[key] = [name]
+        for gram in self._grams(key):
+            self.grams[gram] = self.grams.get(gram, set()) | set([key])
+
+    def remove(self, name):
+        """ Remove a name (if it is there) """
+        if name not in self:
+            return
+        names = self.names[:]
+        del names[bisect.bisect_left(names, name)]
+        reversed_names = self.reversed[:]
+        del reversed_names[bisect.bisect_left(reversed_names, name[::-1])]
+        self.names, self.reversed = names, reversed_names
+        key = name.lower()
+        names = [other for other in self.lower[key] if other != name]
+        if names:
+            self.lower[key] = names
+            return
+        del self.lower[key]
+        for gram in self._grams(key):
+            keys = self.grams.get(gram, set()) - set([key])
+            if keys:
+                self.grams[gram] = keys
+            else:
+                self.grams.pop(gram, None)
+
+    def _prefixed(self, sorted_names, prefix):
+        result = []
+        i = bisect.bisect_left(sorted_names, prefix)
+        while i < len(sorted_names) and sorted_names[i].startswith(prefix):
+            result.append(sorted_names[i])
+            i += 1
+        return result
+
+    def startswith(self, prefix):
+        """ Return sorted list of the names starting with prefix """
+        return self._prefixed(self.names, prefix)
+
+    def endswith(self, suffix):
+        """ Return list of the names ending with suffix """
+        return [name[::-1] for name in self._prefixed(self.reversed, suffix[::-1])]
+
+    def close_matches(self, word, cutoff=0.6):
+        """ Return the names similar to word, ignoring case, best match first
+
+        Like difflib.get_close_matches(word.lower(), <lowercased names>,
+        cutoff=cutoff), but only the MAX_CANDIDATES names sharing most n-grams
+        with word are compared in detail.
+
+        @param word: the name to match
+        @param cutoff: minimum similarity ratio (0..1) of a match
+        @return: list of names
+        """
+        word = word.lower()
+        shared = {}
+        for gram in self._grams(word):
+            for key in self.grams.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        candidates = heapq.nlargest(self.MAX_CANDIDATES, shared.iteritems(),
+                                    key=operator.itemgetter(1))
+        result = []
+        s = difflib.SequenceMatcher()
+        s.set_seq2(word)
+        for key, count in candidates:
+            s.set_seq1(key)
+            if (s.real_quick_ratio() >= cutoff and
+                s.quick_ratio() >= cutoff and
+                s.ratio() >= cutoff):
+                result.append((-s.ratio(), key))
+        result.sort()
+        matches = []
+        for ratio, key in result:
+            matches.extend(self.lower.get(key, ()))
+        return matches
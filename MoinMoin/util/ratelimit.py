@@ -0,0 +1,158 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - cross-process sliding window rate counters
+
+    A RateTable counts events (e.g. requests) per key (e.g. client and
+    action) in a fixed size hash table, kept in a memory mapped file shared
+    by all processes using it (like MoinMoin.util.generation). Every slot
+    holds the event counts of the current and the previous time window, the
+    number of events during the last dt seconds is estimated from them
+    (sliding window counter), so counting an event is O(1) and needs no
+    timestamp lists.
+
+    Slot layout (little endian):
+
+        key hash (8 bytes), window number, events in previous window,
+        events in current window, locked out until (time), expires (time)
+
+    If the probed slots of a new key are all used, the one expiring first is
+    taken over, so the table never needs cleaning up.
+
+    @copyright: 2026 MoinMoin contributors
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, mmap, struct, threading, hashlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # e.g. win32
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import config
+
+_SLOT = struct.Struct('<QIIIII')
+
+
+def key_hash(key):
+    """ Return the 64bit hash of a key (str or unicode), never 0 (0 marks
+        empty slots)
+    """
+    if isinstance(key, unicode):
+        key = key.encode('utf-8')
+    return struct.unpack('<Q', hashlib.md5(key).digest()[:8])[0] or 1
+
+
+class RateTable:
+    """ Memory mapped table of sliding window event counters """
+    SLOTS = 16384 # number of slots of a new table file
+    PROBES = 8 # number of slots looked at for a key
+
+    def __init__(self, filename):
+        """
+        @param filename: name of the table file (will be created if needed)
+        """
+        self.filename = filename
+        self._fd = None
+        self._map = None
+        self._slots = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._map is None:
+            dirname = os.path.dirname(self.filename)
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                if not os.path.isdir(dirname):
+                    raise
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0666 & config.umask)
+            try:
+                size = os.fstat(fd).st_size
+                if size < _SLOT.size:
+                    size = self.SLOTS * _SLOT.size
+                    os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+            except:
+                os.close(fd)
+                raise
+            self._fd = fd
+            self._slots = size // _SLOT.size
+        return self._map
+
+    def _find(self, data, key):
+        """ Return the offset of the slot for key (a new or reused one if the
+            key is not in the table) and its current content
+        """
+        start = key % self._slots
+        best = None
+        for i in range(self.PROBES):
+            offset = ((start + i) % self._slots) * _SLOT.size
+            slot = _SLOT.unpack_from(data, offset)
+            if slot[0] == key:
+                return offset, slot
+            if best is None or slot[5] < best[1][5]:
+                best = offset, slot
+        return best[0], (key, 0, 0, 0, 0, 0)
+
+    def hit(self, key, maxnum, dt, lockout_time, now, surge=False):
+        """ Count an event and check whether there were too many
+
+        The key is in surge state if it is locked out or if there were more
+        than maxnum events during the last dt seconds (before this one). When
+        getting into surge state (or if surge is given), the key gets locked
+        out for lockout_time seconds.
+
+        @param key: the key to count the event for (str or unicode)
+        @param maxnum: number of events allowed during dt seconds
+        @param dt: length of the time window [s]
+        @param lockout_time: time the key gets locked out [s]
+        @param now: current time (int)
+        @param surge: lock out the key in any case
+        @return: True if the key is in surge state
+        """
+        dt = max(int(dt), 1)
+        key = key_hash(key)
+        self._lock.acquire()
+        try:
+            try:
+                data = self._open()
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                try:
+                    offset, (key, window, previous, current, locked_until, expires) = self._find(data, key)
+                    this_window = now // dt
+                    if window != this_window:
+                        if window == this_window - 1:
+                            previous, current = current, 0
+                        else:
+                            previous = current = 0
+                        window = this_window
+                    # the part of the previous window still in the last dt seconds
+                    weight = float(dt - now % dt) / dt
+                    count = previous * weight + current
+                    locked = now < locked_until
+                    surge = surge or locked or count > maxnum
+                    if surge and not locked:
+                        locked_until = now + lockout_time
+                    current += 1
+                    expires = max(locked_until, (window + 2) * dt)
+                    _SLOT.pack_into(data, offset, key, window, previous, current, locked_until, expires)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(self._fd, fcntl.LOCK_UN)
+            except EnvironmentError, err:
+                logging.warning("rate table %r not usable (%s)" % (self.filename, str(err)))
+                return False
+        finally:
+            self._lock.release()
+        return surge
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._map = self._fd = None
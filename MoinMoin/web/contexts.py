@@ -21,6 +21,7 @@ from MoinMoin.config import multiconfig
 from MoinMoin.formatter import text_html
 from MoinMoin.theme import load_theme_fallback
 from MoinMoin.util.clock import Clock
+from MoinMoin.util.filesys import StatCache
 from MoinMoin.web.request import Request, MoinMoinFinish
 from MoinMoin.web.utils import UniqueIDGenerator
 from MoinMoin.web.exceptions import Forbidden, SurgeProtection
@@ -111,6 +112,7 @@ class BaseContext(Context):
     # first the trivial attributes
     action = EnvironProxy('action', lambda o: o.request.values.get('action', 'show'))
     clock = EnvironProxy('clock', lambda o: Clock())
+    stat_cache = EnvironProxy('stat_cache', lambda o: StatCache())
     user = EnvironProxy('user', lambda o: user.User(o, auth_method='request:invalid'))
 
     lang = EnvironProxy('lang')
@@ -311,16 +313,35 @@ class HTTPContext(BaseContext):
         else:
             self.write = self.writestack.pop()
 
-    def send_file(self, fileobj, bufsize=8192, do_flush=None):
+    def send_file(self, fileobj, bufsize=8192, do_flush=None, length=None):
         """ Send a file to the output stream.
 
+        The whole file is handed to the server's wsgi.file_wrapper (if it
+        has one), so it can use sendfile(2) or the like. Parts of files
+        (see length) are read and written by us.
+
         @param fileobj: a file-like object (supporting read, close)
         @param bufsize: size of chunks to read/write
         @param do_flush: call flush after writing?
+        @param length: only send that many bytes (from the current position)
         """
         def simple_wrapper(fileobj, bufsize):
             return iter(lambda: fileobj.read(bufsize), '')
-        file_wrapper = self.environ.get('wsgi.file_wrapper', simple_wrapper)
+        def limited_wrapper(fileobj, bufsize):
+            try:
+                left = length
+                while left > 0:
+                    data = fileobj.read(min(bufsize, left))
+                    if not data:
+                        break
+                    left -= len(data)
+                    yield data
+            finally:
+                fileobj.close()
+        if length is None:
+            file_wrapper = self.environ.get('wsgi.file_wrapper', simple_wrapper)
+        else:
+            file_wrapper = limited_wrapper
         self.request.direct_passthrough = True
         self.request.response = file_wrapper(fileobj, bufsize)
         raise MoinMoinFinish('sent file')
@@ -6,6 +6,7 @@
                 2008-2008 MoinMoin:FlorianKrupicka
     @license: GNU GPL, see COPYING for details.
 """
+import os
 import time
 
 from werkzeug.utils import redirect
@@ -17,6 +18,7 @@ from MoinMoin import caching
 from MoinMoin import log
 from MoinMoin import wikiutil
 from MoinMoin.Page import Page
+from MoinMoin.util.ratelimit import RateTable
 from MoinMoin.web.exceptions import Forbidden, SurgeProtection
 
 logging = log.getLogger(__name__)
@@ -45,11 +47,31 @@ def check_forbidden(request):
                 raise Forbidden()
     return False
 
+def get_surge_table(request):
+    """ Return the RateTable used for surge protection (kept in request.cfg.cache)
+
+    The table file is shared by all processes of the wiki (if we had common
+    farm users, we could also use scope='farm').
+    """
+    cache = request.cfg.cache
+    try:
+        return cache.surge_table
+    except AttributeError:
+        arena_dir = caching.get_arena_dir(request, 'surgeprotect', 'wiki')
+        cache.surge_table = RateTable(os.path.join(arena_dir, 'surge-table'))
+        return cache.surge_table
+
+
 def check_surge_protect(request, kick=False, action=None, username=None):
     """ Check for excessive requests
 
     Raises a SurgeProtection exception on wiki overuse.
 
+    For every id (user name or remote address) and action, the requests of
+    the last dt seconds are counted in a RateTable (O(1) per request, shared
+    by all processes). Getting over the limit locks out the id for
+    surge_lockout_time seconds.
+
     @param request: a moin request object
     @param kick: immediately ban this user
     @param action: specify the action explicitly (default: request.action)
@@ -86,66 +108,20 @@ def check_surge_protect(request, kick=False, action=None, username=None):
         current_id = validuser and request.user.name or remote_addr
 
     default_limit = limits.get('default', (30, 60))
+    lockout_time = request.cfg.surge_lockout_time
 
     now = int(time.time())
-    surgedict = {}
-    surge_detected = False
-
-    try:
-        # if we have common farm users, we could also use scope='farm':
-        cache = caching.CacheEntry(request, 'surgeprotect', 'surge-log', scope='wiki', use_encode=True)
-        if cache.exists():
-            data = cache.content()
-            data = data.split("\n")
-            for line in data:
-                try:
-                    id, t, action, surge_indicator = line.split("\t")
-                    t = int(t)
-                    maxnum, dt = limits.get(action, default_limit)
-                    if t >= now - dt:
-                        events = surgedict.setdefault(id, {})
-                        timestamps = events.setdefault(action, [])
-                        timestamps.append((t, surge_indicator))
-                except StandardError:
-                    pass
-
-        maxnum, dt = limits.get(current_action, default_limit)
-        events = surgedict.setdefault(current_id, {})
-        timestamps = events.setdefault(current_action, [])
-        surge_detected = len(timestamps) > maxnum
-
-        surge_indicator = surge_detected and "!" or ""
-        timestamps.append((now, surge_indicator))
-        if surge_detected:
-            if len(timestamps) < maxnum * 2:
-                timestamps.append((now + request.cfg.surge_lockout_time, surge_indicator)) # continue like that and get locked out
-
-        if current_action not in ('cache', 'AttachFile', ): # don't add cache/AttachFile accesses to all or picture galleries will trigger SP
-            action = 'all' # put a total limit on user's requests
-            maxnum, dt = limits.get(action, default_limit)
-            events = surgedict.setdefault(current_id, {})
-            timestamps = events.setdefault(action, [])
-
-            if kick: # ban this guy, NOW
-                timestamps.extend([(now + request.cfg.surge_lockout_time, "!")] * (2 * maxnum))
-
-            surge_detected = surge_detected or len(timestamps) > maxnum
+    table = get_surge_table(request)
 
-            surge_indicator = surge_detected and "!" or ""
-            timestamps.append((now, surge_indicator))
-            if surge_detected:
-                if len(timestamps) < maxnum * 2:
-                    timestamps.append((now + request.cfg.surge_lockout_time, surge_indicator)) # continue like that and get locked out
+    maxnum, dt = limits.get(current_action, default_limit)
+    surge_detected = table.hit(u'%s\t%s' % (current_id, current_action), maxnum, dt, lockout_time, now)
 
-        data = []
-        for id, events in surgedict.items():
-            for action, timestamps in events.items():
-                for t, surge_indicator in timestamps:
-                    data.append("%s\t%d\t%s\t%s" % (id, t, action, surge_indicator))
-        data = "\n".join(data)
-        cache.update(data)
-    except StandardError:
-        pass
+    if current_action not in ('cache', 'AttachFile', ): # don't add cache/AttachFile accesses to all or picture galleries will trigger SP
+        action = 'all' # put a total limit on user's requests
+        maxnum, dt = limits.get(action, default_limit)
+        # getting locked out for one action (or kick) locks out for all of them
+        surge_detected = table.hit(u'%s\t%s' % (current_id, action), maxnum, dt, lockout_time, now,
+                                   surge=surge_detected or kick)
 
     if surge_detected and validuser and request.user.auth_method in request.cfg.auth_methods_trusted:
         logging.info("Trusted user %s would have triggered surge protection if not trusted.", request.user.name)
@@ -444,8 +444,9 @@ class PickleTagStore(AbstractTagStore):
         self.page = page
         self.filename = page.getPagePath('synctags', use_underlay=0, check_create=1, isfile=1)
         lock_dir = os.path.join(page.getPagePath('cache', use_underlay=0, check_create=1), '__taglock__')
-        self.rlock = lock.ReadLock(lock_dir, 60.0)
-        self.wlock = lock.WriteLock(lock_dir, 60.0)
+        ReadLock, WriteLock = lock.getLockClasses(page.request.cfg.lock_mode)
+        self.rlock = ReadLock(lock_dir, 60.0)
+        self.wlock = WriteLock(lock_dir, 60.0)
 
         if not self.rlock.acquire(3.0):
             raise EnvironmentError("Could not lock in PickleTagStore")
@@ -353,14 +353,15 @@ INTEGER_METAS = ['current', 'revision', # for page storage (moin 2.0)
 class MetaDict(dict):
     """ store meta informations as a dict.
     """
-    def __init__(self, metafilename, cache_directory):
+    def __init__(self, metafilename, cache_directory, lock_mode='dir'):
         """ create a MetaDict from metafilename """
         dict.__init__(self)
         self.metafilename = metafilename
         self.dirty = False
         lock_dir = os.path.join(cache_directory, '__metalock__')
-        self.rlock = lock.ReadLock(lock_dir, 60.0)
-        self.wlock = lock.WriteLock(lock_dir, 60.0)
+        ReadLock, WriteLock = lock.getLockClasses(lock_mode)
+        self.rlock = ReadLock(lock_dir, 60.0)
+        self.wlock = WriteLock(lock_dir, 60.0)
 
         if not self.rlock.acquire(3.0):
             raise EnvironmentError("Could not lock in MetaDict")
@@ -2441,11 +2442,17 @@ def pagediff(request, pagename1, rev1, pagename2, rev2, **kw):
     @rtype: list
     @return: lines of diff output
     """
+    if pagename1 == pagename2 and 'engine' not in kw:
+        # diffs of revisions of the same page are cached
+        from MoinMoin import diffcache
+        return diffcache.get_diff(request, pagename1, rev1, rev2, 'text', kw.get('ignorews', 0))
+
     from MoinMoin.Page import Page
     from MoinMoin.util import diff_text
     lines1 = Page(request, pagename1, rev=rev1).getlines()
     lines2 = Page(request, pagename2, rev=rev2).getlines()
 
+    kw.setdefault('engine', request.cfg.diff_engine)
     lines = diff_text.diff(lines1, lines2, **kw)
     return lines
 
@@ -26,7 +26,7 @@ from MoinMoin.util import pysupport
 
 modules = pysupport.getPackageModules(__file__)
 
-import os, sys, time, xmlrpclib
+import os, sys, time, calendar, xmlrpclib
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
@@ -351,16 +351,16 @@ class XmlRpcBase:
 
         return_items = []
 
+        # read only the entries since "date" (newest first)
+        since_usecs = wikiutil.timestamp2version(calendar.timegm(date.timetuple()))
         edit_log = editlog.EditLog(self.request)
-        for log in edit_log.reverse():
+        logs = list(edit_log.since(since_usecs))
+        logs.reverse()
+        for log in logs:
             # get last-modified UTC (DateTime) from log
             gmtuple = tuple(time.gmtime(wikiutil.version2timestamp(log.ed_time_usecs)))
             lastModified_date = xmlrpclib.DateTime(gmtuple)
 
-            # skip if older than "date"
-            if lastModified_date < date:
-                break
-
             # skip if knowledge not permitted
             if not self.request.user.may.read(log.pagename):
                 continue
@@ -938,7 +938,7 @@ class XmlRpcBase:
 
         newcontents = newcontents()
         conflict = wikiutil.containsConflictMarker(newcontents)
-        diffblob = xmlrpclib.Binary(compress(textdiff(oldcontents(), newcontents)))
+        diffblob = xmlrpclib.Binary(compress(textdiff(oldcontents(), newcontents, self.request.cfg.diff_engine)))
 
         return {"conflict": conflict, "diff": diffblob, "diffversion": 1, "current": currentpage.get_real_rev()}
 
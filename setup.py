@@ -265,6 +265,7 @@ Topic :: Text Processing :: Markup""".splitlines(),
         'MoinMoin.parser',
         'MoinMoin.script',
         'MoinMoin.script.account',
+        'MoinMoin.script.benchmark',
         'MoinMoin.script.cli',
         'MoinMoin.script.export',
         'MoinMoin.script.import',